@@ -0,0 +1,342 @@
+import argparse
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import mysql.connector
+import db_pool
+
+# Precompiled patterns shared by every parse
+PART_SPLIT_RE = re.compile(r'[;,]+')
+PINCODE_RE = re.compile(r'(?<!\d)(\d{3})\s?(\d{3})(?!\d)')
+LOOSE_PINCODE_RE = re.compile(r'\d{6}')
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.'&-][a-z0-9]+)*")
+OFFICE_SUFFIX_RE = re.compile(r'\s+(?:b\.?o|s\.?o|h\.?o|g\.?p\.?o|p\.?o)\.?$', re.IGNORECASE)
+WHITESPACE_RE = re.compile(r'\s+')
+
+# States and union territories, used even when the directory is unavailable
+STATES = [
+    "Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar", "Chhattisgarh", "Goa",
+    "Gujarat", "Haryana", "Himachal Pradesh", "Jharkhand", "Karnataka", "Kerala",
+    "Madhya Pradesh", "Maharashtra", "Manipur", "Meghalaya", "Mizoram", "Nagaland",
+    "Odisha", "Punjab", "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana", "Tripura",
+    "Uttar Pradesh", "Uttarakhand", "West Bengal", "Andaman and Nicobar Islands",
+    "Chandigarh", "Dadra and Nagar Haveli and Daman and Diu", "Delhi", "Jammu and Kashmir",
+    "Ladakh", "Lakshadweep", "Puducherry"
+]
+
+STATE, DISTRICT, OFFICE = 'state', 'district', 'office'
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def tokenize_with_spans(text):
+    """Lower-cased tokens plus their (start, end) character offsets in text"""
+    matches = list(TOKEN_RE.finditer(text.lower()))
+    return [m.group(0) for m in matches], [m.span() for m in matches]
+
+
+def display_name(name):
+    """Title-case the upper-case names used in the India Post directory"""
+    return name.title() if name.isupper() else name
+
+
+class Gazetteer:
+    """Token trie of known place names for single-pass tagging.
+
+    Each node is a dict of next token -> child node; the ``None`` key holds
+    the (kind, canonical name) tags of a phrase ending at that node.
+    """
+
+    def __init__(self):
+        self.root = {}
+        self.max_depth = 0
+
+    def add(self, name, kind):
+        tokens = tokenize(name)
+        if not tokens:
+            return
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        tags = node.setdefault(None, {})
+        tags.setdefault(kind, display_name(name.strip()))
+        self.max_depth = max(self.max_depth, len(tokens))
+
+    def tag(self, tokens):
+        """Longest-match tagging: yields (start, end, tags) spans left to right"""
+        i = 0
+        while i < len(tokens):
+            node = self.root
+            match = None
+            for j in range(i, min(len(tokens), i + self.max_depth)):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                if None in node:
+                    match = (i, j + 1, node[None])
+            if match:
+                yield match
+                i = match[1]
+            else:
+                i += 1
+
+
+class AddressParser:
+    """Table-driven parser for free-form Indian addresses.
+
+    Patterns are compiled once at import; states, districts and post office
+    names from the ``pincodes`` table are loaded into a token trie so every
+    address part is tagged in one pass. The extracted pincode is then used
+    to fill in or cross-check the state and city via ``pincode_lookup``,
+    a callable returning ``(district, state_name)`` or None.
+    """
+
+    def __init__(self, gazetteer=None, pincode_lookup=None):
+        if gazetteer is None:
+            gazetteer = Gazetteer()
+            for state_name in STATES:
+                gazetteer.add(state_name, STATE)
+        self.gazetteer = gazetteer
+        self.pincode_lookup = pincode_lookup
+
+    @classmethod
+    def from_database(cls, pool=None, pincode_lookup=None):
+        """Build a parser whose gazetteer covers the whole pincodes directory"""
+        gazetteer = Gazetteer()
+        for state_name in STATES:
+            gazetteer.add(state_name, STATE)
+        try:
+            with (pool or db_pool.get_pool()).connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT DISTINCT state_name, district, office_name FROM pincodes")
+                for state_name, district, office_name in cursor:
+                    if state_name:
+                        gazetteer.add(state_name, STATE)
+                    if district:
+                        gazetteer.add(district, DISTRICT)
+                    if office_name:
+                        gazetteer.add(OFFICE_SUFFIX_RE.sub('', office_name), OFFICE)
+                cursor.close()
+        except mysql.connector.Error as err:
+            print(f"Failed to load gazetteer, using built-in states only: {err}")
+        return cls(gazetteer, pincode_lookup)
+
+    @staticmethod
+    def _extract_pincode(parts):
+        """Find and remove the first pincode; returns the pincode or None"""
+        for pattern in (PINCODE_RE, LOOSE_PINCODE_RE):
+            for i, part in enumerate(parts):
+                match = pattern.search(part)
+                if match:
+                    parts[i] = WHITESPACE_RE.sub(' ', part[:match.start()] + part[match.end():]).strip()
+                    return ''.join(match.groups()) if match.groups() else match.group(0)
+        return None
+
+    def parse(self, address_text):
+        """Parse address text into street, city, state and pincode"""
+        if not address_text or not isinstance(address_text, str):
+            raise ValueError("Invalid address text")
+
+        parts = [part.strip() for part in PART_SPLIT_RE.split(address_text.strip())]
+        parts = [part for part in parts if part]
+
+        pincode = self._extract_pincode(parts)
+
+        # Tag every part against the gazetteer in one pass
+        tagged = []
+        for i, part in enumerate(parts):
+            tokens, spans = tokenize_with_spans(part)
+            for start, end, tags in self.gazetteer.tag(tokens):
+                tagged.append((i, start, end, len(tokens), spans, tags))
+
+        # The state is usually written last, so take the last state mention
+        state = None
+        state_part = None
+        for i, start, end, token_count, spans, tags in reversed(tagged):
+            if STATE in tags:
+                state = tags[STATE]
+                state_part = i
+                # Drop the state phrase from the part, keep the rest
+                cut_start, cut_end = spans[start][0], spans[end - 1][1]
+                part = parts[i]
+                parts[i] = WHITESPACE_RE.sub(' ', part[:cut_start] + part[cut_end:]).strip(' -')
+                break
+
+        # A later part that is exactly a district/office name is the city
+        city_name = None
+        for i, start, end, token_count, spans, tags in tagged:
+            if i == 0 or i == state_part or start != 0 or end != token_count:
+                continue
+            if DISTRICT in tags or (OFFICE in tags and city_name is None):
+                city_name = parts[i]
+        parts = [part for part in parts if part]
+
+        # Remaining parts are street and city
+        street = city = None
+        if city_name and city_name in parts:
+            city = city_name
+            others = [part for part in parts if part != city_name]
+            street = others[0] if others else None
+        elif len(parts) >= 2:
+            street = parts[0]
+            city = parts[-1]
+        elif len(parts) == 1:
+            if len(parts[0].split()) >= 3:
+                street = parts[0]
+            else:
+                city = parts[0]
+
+        # Cross-validate against the pincode directory
+        if pincode and self.pincode_lookup:
+            details = self.pincode_lookup(pincode)
+            if details:
+                district, pincode_state = details
+                if pincode_state and not state:
+                    state = display_name(pincode_state)
+                if district and not city:
+                    city = display_name(district)
+
+        return {
+            "street": street,
+            "city": city,
+            "state": state,
+            "pincode": pincode
+        }
+
+    def validate(self, parsed):
+        """Check a parsed address against the directory entry of its pincode.
+
+        Returns ``{'state_matches_pincode': ..., 'city_matches_pincode': ...}``
+        with None where either side is unknown.
+        """
+        result = {'state_matches_pincode': None, 'city_matches_pincode': None}
+        if not (parsed.get('pincode') and self.pincode_lookup):
+            return result
+        details = self.pincode_lookup(parsed['pincode'])
+        if not details:
+            return result
+
+        district, pincode_state = details
+        if parsed.get('state') and pincode_state:
+            result['state_matches_pincode'] = parsed['state'].lower() == pincode_state.lower()
+        if parsed.get('city') and district:
+            result['city_matches_pincode'] = parsed['city'].lower() == district.lower()
+        return result
+
+
+# Worker processes for bulk parsing
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", 0)) or os.cpu_count() or 1
+
+# Parser used inside batch worker processes
+_worker_parser = None
+
+# Pool of parser worker processes used by the bulk parsing endpoint, and
+# the number of batches currently using each pool (current or retired)
+_executor = None
+_executor_leases = {}
+_executor_lock = threading.RLock()
+
+
+def _init_worker(gazetteer, pincode_details):
+    """Process pool initializer: rebuild the parser from picklable parts"""
+    global _worker_parser
+    _worker_parser = AddressParser(gazetteer, pincode_details.get if pincode_details else None)
+
+
+def parse_many(texts):
+    """Worker entry point: parse a chunk of addresses as (parsed, error) pairs"""
+    results = []
+    for text in texts:
+        try:
+            results.append((_worker_parser.parse(text), None))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
+
+
+def get_executor(parser, pincode_details=None):
+    """Return the parser process pool, starting it with this parser's gazetteer"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                initializer=_init_worker,
+                initargs=(parser.gazetteer, pincode_details)
+            )
+        return _executor
+
+
+@contextmanager
+def executor_lease(parser, pincode_details=None):
+    """Use the parser process pool for one batch.
+
+    A pool retired by ``shutdown_executor()`` while batches are using it is
+    only shut down when the last of them finishes, so they can keep
+    submitting chunks to it.
+    """
+    with _executor_lock:
+        executor = get_executor(parser, pincode_details)
+        _executor_leases[executor] = _executor_leases.get(executor, 0) + 1
+    try:
+        yield executor
+    finally:
+        with _executor_lock:
+            _executor_leases[executor] -= 1
+            idle = _executor_leases[executor] == 0
+            if idle:
+                del _executor_leases[executor]
+            retired = idle and executor is not _executor
+        if retired:
+            executor.shutdown(wait=False)
+
+
+def shutdown_executor():
+    """Retire the parser process pool so the next batch picks up a new gazetteer"""
+    global _executor
+    with _executor_lock:
+        executor = _executor
+        _executor = None
+        in_use = executor in _executor_leases
+    if executor is not None and not in_use:
+        executor.shutdown(wait=False)
+
+
+def benchmark(count, parser=None):
+    """Parse the synthetic corpus repeated up to count addresses; returns addresses/sec"""
+    from synthetic_data import synthetic_data
+
+    parser = parser or AddressParser()
+    corpus = [item['address_text'] for item in synthetic_data]
+    correct = 0
+    for item in synthetic_data:
+        parsed = parser.parse(item['address_text'])
+        if (parsed['pincode'] == item['expected_pincode'] and parsed['state'] == item['expected_state']
+                and parsed['city'] == item['expected_city']):
+            correct += 1
+
+    started = time.perf_counter()
+    for i in range(count):
+        parser.parse(corpus[i % len(corpus)])
+    elapsed = time.perf_counter() - started
+
+    rate = count / elapsed
+    print(f"Parsed {count:,} addresses in {elapsed:.2f}s ({rate:,.0f} addresses/sec)")
+    print(f"Corpus accuracy (pincode, state, city): {correct}/{len(synthetic_data)}")
+    return rate
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Address parser throughput benchmark")
+    arg_parser.add_argument("--count", type=int, default=1000000, help="Number of addresses to parse")
+    arg_parser.add_argument("--database", action="store_true",
+                            help="Load the gazetteer from the pincodes table")
+    args = arg_parser.parse_args()
+
+    benchmark(args.count, AddressParser.from_database() if args.database else None)
@@ -1,20 +1,39 @@
+import time
+# Import start, for the startup timing metrics
+APP_IMPORT_STARTED = time.perf_counter()
+
 from flask_cors import CORS
-from flask import Flask, request, jsonify, render_template, send_file
+from flask import Flask, request, jsonify, render_template, send_file, Response, stream_with_context
 import cv2
 import numpy as np
 import base64
 import re
-import nltk
-from nltk.tokenize import word_tokenize
 from dotenv import load_dotenv
 import os
-import easyocr
-import requests
 import mysql.connector
 from datetime import datetime
 import json
-import pandas as pd
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pincode_service import PincodeService
+from job_queue import JobQueue, QueueFullError
+from geocode_cache import GeocodeCache
+import geocoding
+from pincode_index import PincodeIndex
+from local_geocoder import LocalGeocoder
+from address_parser import AddressParser
+import db_pool
+import ocr
+import address_parser as address_parser_module
+import route_optimizer
+from distance_matrix import DistanceMatrix
+from nodal_assignment import NodalAssignment
+from dashboard_aggregates import DashboardAggregates
+from write_buffer import WriteBuffer
+from ocr_cache import OCRCache, content_hash, perceptual_hash
+from nodal_centers import NodalCenterRegistry, DEFAULT_NODAL_CENTERS
+from ocr import extract_address_from_image
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -24,7 +43,8 @@ CORS(app, resources={
     r"/api/*": {
         "origins": ["http://localhost:5174"],  # Your Vite frontend port
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type"]
+        "allow_headers": ["Content-Type", "If-None-Match"],
+        "expose_headers": ["ETag"]
     }
 })
 
@@ -51,62 +71,86 @@ MYSQL_DATABASE = os.getenv("DB_NAME")
 # Initialize PincodeService
 pincode_service = PincodeService()
 
-# Initialize NLTK
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
-
-try:
-    reader = easyocr.Reader(['en'], gpu=True)
-    print("EasyOCR initialized with GPU support")
-except Exception as e:
-    print(f"GPU not available, falling back to CPU: {str(e)}")
-    reader = easyocr.Reader(['en'], gpu=False)
-
-# Nodal centers data
-nodal_centers = {
-    "Pune Main Nodal Center": ["411001", "411002", "411003", "411004", "411005"],
-    "Mumbai Central Nodal Center": ["400001", "400016", "400020", "400021", "400022"],
-    "Nagpur Regional Nodal Center": ["440001", "440002", "440003", "440004", "440005"],
-    "Solapur Distribution Hub": ["413001", "413002", "413003", "413004", "413005"],
-    "Aurangabad Logistics Park": ["431001", "431002", "431003", "431004", "431005"],
-    "Kolhapur Delivery Center": ["416001", "416002", "416003", "416004", "416005"],
-    "Thane West Sorting Office": ["400601", "400602", "400603", "400604", "400605"],
-    "Nashik Main Post Office": ["422001", "422002", "422003", "422004", "422005"],
-    "Amravati Camp Hub": ["444601", "444602", "444603", "444604", "444605"],
-    "Akola City Dispatch": ["444001", "444002", "444003", "444004", "444005"],
-    "Latur City Post Office": ["413512", "413513", "413514", "413515", "413516"],
-    "Jalgaon City Delivery": ["425001", "425002", "425003", "425004", "425005"],
-    "Parbhani City Post": ["431401", "431402", "431403", "431404", "431405"],
-    "New Delhi Central Hub": ["110001", "110002", "110003", "110004", "110006"],
-    "Bangalore MG Road Center": ["560001", "560002", "560003", "560004", "560005"],
-    "Kolkata Park Street Hub": ["700001", "700016", "700017", "700018", "700019"],
-    "Jaipur JLN Marg Center": ["302001", "302002", "302003", "302004", "302005"],
-    "Ahmedabad MG Road Hub": ["380001", "380002", "380003", "380009", "380010"],
-    "Hyderabad Sarojini Devi Hub": ["500001", "500002", "500003", "500004", "500005"]
+# Geocoding results cache (in-process LRU + geocode_cache table)
+geocode_cache = GeocodeCache(
+    max_entries=int(os.getenv("GEOCODE_CACHE_SIZE", 10000)),
+    ttl=int(os.getenv("GEOCODE_CACHE_TTL", 30 * 86400)),
+    negative_ttl=int(os.getenv("GEOCODE_CACHE_NEGATIVE_TTL", 86400))
+)
+
+# Shared geocoding client (pooled session, rate limiting, retries, in-flight dedupe)
+geocoding_client = geocoding.client_from_env(GOOGLE_MAPS_API_KEY, cache=geocode_cache)
+# Capture requests wait on geocoding, so they get fewer retries than the client default
+GEOCODING_CAPTURE_RETRIES = int(os.getenv("GEOCODING_CAPTURE_RETRIES", 1))
+
+# Offline geocoding from the pincode directory.
+# GEOCODER_MODE: local_first (directory, then Google), fallback (Google, then
+# directory), local (directory only) or google (Google only). Results are stored
+# in the google_maps_* columns with geocoding_source saying which one answered.
+local_geocoder = LocalGeocoder()
+GEOCODER_MODE = os.getenv("GEOCODER_MODE", "fallback")
+
+# The OCR model is loaded on first use; OCR_WARMUP loads it in the background at startup
+OCR_WARMUP = os.getenv("OCR_WARMUP", "false").lower() in ("1", "true", "yes")
+
+# OCR results by image content (in-process LRU + ocr_cache table)
+ocr_cache = OCRCache(
+    max_entries=int(os.getenv("OCR_CACHE_MAX_ENTRIES", 5000)),
+    ttl=int(os.getenv("OCR_CACHE_TTL", 7 * 86400)),
+    # Bits of perceptual-hash difference still treated as the same photo; 0 = exact matches only
+    near_distance=int(os.getenv("OCR_CACHE_NEAR_DISTANCE", 0))
+)
+
+# Startup timings, see /api/admin/startup_metrics
+startup_metrics = {
+    'pid': os.getpid(),
+    'import_seconds': None,
+    'first_request': None
 }
 
-def get_db_connection():
-    try:
-        return mysql.connector.connect(
-            host=os.getenv("DB_HOST"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            database=os.getenv("DB_NAME"),
-            port=3306,  # Explicitly set port
-            auth_plugin='mysql_native_password',  # Important for MySQL 8+
-            use_pure=True  # Force pure Python connector
-        )
-    except mysql.connector.Error as err:
-        print(f"Database connection error: {err}")
-        raise
-
+# Batch capture limits
+BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", 500))
+BATCH_GEOCODE_WORKERS = int(os.getenv("BATCH_GEOCODE_WORKERS", 8))
+PARSE_CHUNK_SIZE = int(os.getenv("PARSE_CHUNK_SIZE", 1000))
+
+# Route solver time budget per request (seconds) and the most a caller may ask for
+ROUTE_TIME_BUDGET = float(os.getenv("ROUTE_TIME_BUDGET", 2.0))
+ROUTE_MAX_TIME_BUDGET = float(os.getenv("ROUTE_MAX_TIME_BUDGET", 10.0))
+
+# Memory-mapped pincode/nodal center distance matrix, rebuilt after imports
+distance_matrix = DistanceMatrix(os.getenv("DISTANCE_MATRIX_DIR", os.path.join(app.root_path, 'data')))
+
+# Closest nodal center for pincodes outside the explicit center lists
+nodal_assignment = NodalAssignment()
+# 'buffered' queues single-row inserts for batched writes; 'sync' writes them in the request
+WRITE_BUFFER_MODE = os.getenv("WRITE_BUFFER_MODE", "buffered").lower()
+write_buffer = WriteBuffer(
+    max_rows=int(os.getenv("WRITE_BUFFER_MAX_ROWS", 500)),
+    max_delay=float(os.getenv("WRITE_BUFFER_MAX_DELAY_MS", 200)) / 1000,
+    spool_dir=os.getenv("WRITE_BUFFER_SPOOL_DIR", os.path.join(app.root_path, 'data', 'spool')),
+    replay_interval=float(os.getenv("WRITE_BUFFER_REPLAY_INTERVAL", 60))
+)
+dashboard_aggregates = DashboardAggregates(
+    ttl=int(os.getenv("DASHBOARD_CACHE_TTL", 15)),
+    settle_seconds=int(os.getenv("DASHBOARD_ROLLUP_SETTLE", 10))
+)
+
+# Nodal centers and their coverage (MySQL, cached per worker)
+nodal_center_registry = NodalCenterRegistry(
+    check_interval=int(os.getenv("NODAL_CENTERS_CHECK_INTERVAL", 30))
+)
+
+# Pincode -> nodal center / directory lookups
+pincode_index = PincodeIndex(DEFAULT_NODAL_CENTERS)
+
+# Gazetteer-backed address parser (see get_address_parser)
+address_parser = None
 
 # Database initialization
 def initialize_db():
     """Initialize database and create tables if they don't exist"""
     try:
+        # Not pooled: the database may not exist yet
         conn = mysql.connector.connect(
             host=MYSQL_HOST,
             user=MYSQL_USER,
@@ -131,10 +175,22 @@ def initialize_db():
                 google_maps_city VARCHAR(100),
                 google_maps_state VARCHAR(100),
                 google_maps_street VARCHAR(255),
+                geocoding_source VARCHAR(16),
                 nodal_delivery_center VARCHAR(255),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_created_at (created_at),
+                INDEX idx_center_created (nodal_delivery_center, created_at)
             )
         """)
+
+        # Tables created before the geocoding source was recorded
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = 'addresses'
+              AND column_name = 'geocoding_source'
+        """)
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("ALTER TABLE addresses ADD COLUMN geocoding_source VARCHAR(16) AFTER google_maps_street")
         
         # Create wrong_pincodes table
         cursor.execute("""
@@ -178,6 +234,21 @@ def initialize_db():
 
         # Initialize pincodes table
         pincode_service.initialize_pincodes_table()
+
+        # Initialize geocoding cache table
+        geocode_cache.initialize_table()
+
+        # Initialize OCR results cache table
+        ocr_cache.initialize_table()
+
+        # Initialize nodal center tables (seeded on first run)
+        nodal_center_registry.initialize_tables()
+
+        # Initialize pincode -> closest nodal center table
+        nodal_assignment.initialize_table()
+
+        # Initialize dashboard counters and indexes
+        dashboard_aggregates.initialize_tables()
         
         conn.commit()
         print("Database initialized successfully")
@@ -191,114 +262,51 @@ def initialize_db():
         if 'conn' in locals():
             conn.close()
 # Address Processing Functions
-def extract_address_from_image(image_data):
-    """Extracts address text from base64 image data using EasyOCR."""
-    try:
-        if not image_data or not isinstance(image_data, str):
-            raise ValueError("Invalid image data format")
-            
-        if not image_data.startswith('data:image'):
-            raise ValueError("Invalid image format, expected base64 encoded image")
-            
-        try:
-            header, encoded = image_data.split(',', 1)
-            image_data = base64.b64decode(encoded)
-        except Exception as e:
-            raise ValueError(f"Invalid base64 encoding: {str(e)}")
-            
-        nparr = np.frombuffer(image_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-        if img is None:
-            raise ValueError("Failed to decode image")
-
-        # Preprocess image
-        if len(img.shape) == 2:
-            img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
-            
-        img = cv2.resize(img, (min(800, img.shape[1]), min(600, img.shape[0])))
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        gray = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
-
-        # Perform OCR
-        try:
-            results = reader.readtext(gray, detail=0)
-            address_text = ' '.join(results).strip()
-            
-            if not address_text:
-                raise ValueError("No text detected in image")
-                
-            return address_text
-        except Exception as e:
-            raise ValueError(f"OCR processing failed: {str(e)}")
-
-    except Exception as e:
-        print(f"Error during EasyOCR: {str(e)}")
-        raise
+def get_address_parser():
+    """Shared address parser, built from the pincodes directory on first use"""
+    global address_parser
+    if address_parser is None:
+        address_parser = AddressParser.from_database(pincode_lookup=pincode_index.details)
+    return address_parser
+
+def rebuild_address_parser():
+    """Reload the parser gazetteer after the pincode directory changes"""
+    global address_parser
+    address_parser = AddressParser.from_database(pincode_lookup=pincode_index.details)
+    address_parser_module.shutdown_executor()
 
 def parse_address_text(address_text):
     """Parses address text with flexible pattern matching."""
     try:
-        if not address_text or not isinstance(address_text, str):
-            raise ValueError("Invalid address text")
-
-        # Split using commas or semicolons
-        parts = re.split(r'[;,]+', address_text.strip())
-        parts = [part.strip() for part in parts if part.strip()]
-
-        street = city = state = pincode = None
-
-        # Find pincode (6 digits)
-        for i, part in enumerate(parts):
-            pincode_match = re.search(r'\d{6}', part)
-            if pincode_match:
-                pincode = pincode_match.group(0)
-                parts[i] = re.sub(r'\d{6}', '', parts[i]).strip()
-                if not parts[i]:
-                    parts.pop(i)
-                break
-
-        # Find State - common Indian states
-        states = ["Maharashtra", "Delhi", "Karnataka", "West Bengal", "Rajasthan", 
-                 "Gujarat", "Telangana", "Tamil Nadu", "Uttar Pradesh", "Kerala"]
-        for i, part in enumerate(parts):
-            for state_name in states:
-                if state_name.lower() in part.lower():
-                    state = state_name
-                    parts[i] = part.replace(state_name, "").strip()
-                    if not parts[i]:
-                        parts.pop(i)
-                    break
-            if state:
-                break
-
-        # Remaining parts are street and city
-        if len(parts) >= 2:
-            street = parts[0]
-            city = parts[-1]
-        elif len(parts) == 1:
-            if len(parts[0].split()) >= 3:
-                street = parts[0]
-            else:
-                city = parts[0]
-
-        return {
-            "street": street,
-            "city": city,
-            "state": state,
-            "pincode": pincode
-        }
+        return get_address_parser().parse(address_text)
 
     except Exception as e:
         print(f"Error during address parsing: {str(e)}")
         raise
 
 def geocode_address(address_data):
-    """Geocodes the address using the Google Maps Geocoding API."""
+    """Geocodes the address locally and/or with Google, according to GEOCODER_MODE."""
     try:
         if not address_data or not isinstance(address_data, dict):
             raise ValueError("Invalid address data")
 
+        if GEOCODER_MODE in ('local', 'local_first'):
+            result = local_geocoder.geocode(address_data)
+            if result or GEOCODER_MODE == 'local':
+                return result
+
+        local_result = local_geocoder.geocode(address_data) if GEOCODER_MODE == 'fallback' else None
+        # With a directory answer to fall back on, don't spend time retrying Google
+        result = google_geocode(address_data, max_retries=0 if local_result else GEOCODING_CAPTURE_RETRIES)
+        return result or local_result
+
+    except Exception as e:
+        print(f"Geocoding general error: {str(e)}")
+        return None
+
+def google_geocode(address_data, max_retries=GEOCODING_CAPTURE_RETRIES):
+    """Geocodes the address using the Google Maps Geocoding API."""
+    try:
         # Build address string, handling None values
         address_parts = []
         if address_data.get('street'):
@@ -313,306 +321,359 @@ def geocode_address(address_data):
         if not address_parts:
             return None
             
-        address = ', '.join(address_parts)
-        url = f"https://maps.googleapis.com/maps/api/geocode/json?address={address}&key={GOOGLE_MAPS_API_KEY}"
-        
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
-        if data['status'] == 'OK':
-            result = data['results'][0]['address_components']
-            return {
-                'google_maps_pincode': next((c['long_name'] for c in result if 'postal_code' in c['types']), None),
-                'google_maps_city': next((c['long_name'] for c in result if 'locality' in c['types']), None),
-                'google_maps_state': next((c['long_name'] for c in result if 'administrative_area_level_1' in c['types']), None),
-                'google_maps_street': next((c['long_name'] for c in result if 'route' in c['types']), None),
-            }
-        elif data['status'] == 'ZERO_RESULTS':
-            print("Geocoding failed: Address not found")
-            return None
-        else:
-            print(f"Geocoding failed: {data.get('error_message', data['status'])}")
-            return None
+        result = geocoding_client.geocode(', '.join(address_parts), max_retries=max_retries)
+        return dict(result, geocoding_source='google') if result else None
 
-    except requests.exceptions.RequestException as e:
-        print(f"Geocoding request error: {str(e)}")
-        return None
-    except (KeyError, IndexError) as e:
-        print(f"Geocoding response parsing error: {str(e)}")
-        return None
     except Exception as e:
         print(f"Geocoding general error: {str(e)}")
         return None
 
+def apply_nodal_centers(snapshot):
+    """Point the in-memory indexes at a new nodal centers snapshot"""
+    pincode_index.set_nodal_centers(snapshot.centers)
+    nodal_assignment.set_centers(nodal_center_locations(snapshot))
+    nodal_assignment.load()
+    # The worker that bumped the version rebuilt the matrix first
+    distance_matrix.load()
+    # Imports bump the version too; drop parsed addresses cached from the old directory
+    ocr_cache.clear_parsed(persistent=False)
+
+nodal_center_registry.on_change(apply_nodal_centers)
+
 def get_nodal_center(pincode):
     """Retrieves the nodal delivery center based on the pincode."""
     if not pincode or not isinstance(pincode, str):
         return "Nodal Center Not Found"
-        
-    for center, pincode_list in nodal_centers.items():
-        if pincode in pincode_list:
-            return center
-    return "Nodal Center Not Found"
+
+    # Picks up center changes made by other workers (version check, not per request)
+    nodal_center_registry.snapshot()
+
+    return (pincode_index.center_for(pincode) or nodal_assignment.center_for(pincode)
+            or "Nodal Center Not Found")
 
 def verify_pincode(pincode):
-    """Verify if a pincode is valid (exists in our nodal centers)"""
+    """Verify if a pincode is valid (exists in the pincode directory)"""
     if not pincode or not isinstance(pincode, str) or not pincode.isdigit() or len(pincode) != 6:
         return False, None
-        
-    for center, pincode_list in nodal_centers.items():
-        if pincode in pincode_list:
-            return True, center
+
+    nodal_center_registry.snapshot()
+    if pincode_index.is_known(pincode):
+        return True, pincode_index.center_for(pincode) or nodal_assignment.center_for(pincode)
     return False, None
 
-def suggest_correct_pincode(incorrect_pincode):
-    """Suggest a correct pincode based on similarity to existing pincodes"""
+def suggest_pincodes(incorrect_pincode, k=5, state=None, district=None):
+    """Top-k correction candidates for a misread pincode, as (pincode, score) pairs"""
     if not incorrect_pincode or len(incorrect_pincode) < 4:
-        return None, 0
-        
-    # Flatten all pincodes from nodal centers
-    all_pincodes = [pincode for pincode_list in nodal_centers.values() for pincode in pincode_list]
-    
-    best_match = None
-    highest_score = 0
-    
-    for correct_pincode in all_pincodes:
-        # Simple similarity score: count matching digits in same position
-        score = sum(1 for a, b in zip(incorrect_pincode, correct_pincode) if a == b)
-        score = score / max(len(incorrect_pincode), len(correct_pincode))  # Normalize
-        
-        if score > highest_score:
-            highest_score = score
-            best_match = correct_pincode
-    
+        return []
+    return pincode_index.suggest(incorrect_pincode, k=k, state=state, district=district)
+
+def suggest_correct_pincode(incorrect_pincode, state=None, district=None):
+    """Suggest a correct pincode based on similarity to existing pincodes"""
+    candidates = suggest_pincodes(incorrect_pincode, k=1, state=state, district=district)
+
     # Only return a suggestion if the confidence is above a threshold
-    if highest_score >= 0.5:
-        return best_match, highest_score
+    if candidates and candidates[0][1] >= 0.5:
+        return candidates[0]
     return None, 0
 
+def read_address_image(image_data):
+    """OCR an image with the content-hash cache in front.
+
+    Returns (address_text, parsed_address, cache_info). On a miss the text is
+    extracted, parsed and cached; on a hit no OCR (or, for exact matches,
+    even image decoding) happens.
+    """
+    raw = ocr.image_bytes(image_data)
+    key = content_hash(raw)
+    decoded = []
+
+    def compute_dhash():
+        decoded.append(ocr.decode_image(raw))
+        return perceptual_hash(decoded[0])
+
+    entry, cache_info = ocr_cache.get(key, compute_dhash)
+    if entry is not None:
+        parsed_address = entry['parsed_address']
+        if parsed_address is None:
+            # Cleared by a pincode import: re-parse the cached text against the new directory
+            parsed_address = parse_address_text(entry['address_text'])
+            ocr_cache.set(key, entry['address_text'], parsed_address, cache_info.get('dhash'))
+        return entry['address_text'], parsed_address, cache_info
+
+    address_text = extract_address_from_image(decoded[0] if decoded else raw)
+    parsed_address = parse_address_text(address_text)
+    ocr_cache.set(key, address_text, parsed_address, cache_info.get('dhash'))
+    return address_text, parsed_address, cache_info
+
+def ocr_cache_report(cache_info):
+    """The cache lookup details returned to clients"""
+    return {k: v for k, v in cache_info.items() if k != 'dhash'}
+
+def enrich_address_text(address_text, parsed_address=None):
+    """Parse, geocode and resolve the nodal center for extracted address text.
+
+    Returns (address, error) where error is None on success.
+    """
+    expected_address = dict(parsed_address) if parsed_address else parse_address_text(address_text)
+    if not expected_address:
+        return None, 'Address parsing failed'
+
+    geocode_result = geocode_address(expected_address)
+    if not geocode_result:
+        return None, 'Invalid address (geocoding failed)'
+
+    expected_address.update(geocode_result)
+    expected_address['address_text'] = address_text
+    expected_address['nodal_delivery_center'] = get_nodal_center(expected_address['pincode'])
+    return expected_address, None
+
+def format_address_result(expected_address):
+    """Shape a processed address the way the capture endpoints return it"""
+    return {
+        'extracted_address': {
+            'address_text': expected_address.get('address_text'),
+            'street': expected_address.get('street'),
+            'city': expected_address.get('city'),
+            'state': expected_address.get('state'),
+            'pincode': expected_address.get('pincode')
+        },
+        'geocoding_results': {
+            'google_maps_street': expected_address.get('google_maps_street'),
+            'google_maps_city': expected_address.get('google_maps_city'),
+            'google_maps_state': expected_address.get('google_maps_state'),
+            'google_maps_pincode': expected_address.get('google_maps_pincode'),
+            'latitude': expected_address.get('latitude'),
+            'longitude': expected_address.get('longitude'),
+            'source': expected_address.get('geocoding_source', 'google')
+        },
+        'nodal_delivery_center': expected_address['nodal_delivery_center']
+    }
+
 # Database Operations
-def insert_address(address_data):
-    """Inserts address data into the database."""
+INSERT_ADDRESS_QUERY = """
+INSERT INTO addresses (address_text, pincode, city, state, street,
+                       google_maps_pincode, google_maps_city, google_maps_state, google_maps_street,
+                       geocoding_source, nodal_delivery_center)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+def address_values(address_data):
+    """Row values for INSERT_ADDRESS_QUERY"""
+    return (
+        address_data.get('address_text'),
+        address_data.get('pincode'),
+        address_data.get('city'),
+        address_data.get('state'),
+        address_data.get('street'),
+        address_data.get('google_maps_pincode'),
+        address_data.get('google_maps_city'),
+        address_data.get('google_maps_state'),
+        address_data.get('google_maps_street'),
+        address_data.get('geocoding_source'),
+        address_data.get('nodal_delivery_center')
+    )
+
+INSERT_WRONG_PINCODE_QUERY = """
+INSERT INTO wrong_pincodes (original_pincode, corrected_pincode, address_text, confidence_score)
+VALUES (%s, %s, %s, %s)
+"""
+
+INSERT_VOICE_ADDRESS_QUERY = """
+INSERT INTO voice_addresses (audio_file_path, transcribed_text, pincode, city, state, nodal_delivery_center)
+VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+write_buffer.register('addresses', INSERT_ADDRESS_QUERY)
+write_buffer.register('wrong_pincodes', INSERT_WRONG_PINCODE_QUERY)
+write_buffer.register('voice_addresses', INSERT_VOICE_ADDRESS_QUERY)
+
+def use_write_buffer(sync):
+    """Whether a single-row insert should be queued rather than written now"""
+    return not sync and WRITE_BUFFER_MODE != 'sync'
+
+def insert_address(address_data, sync=False):
+    """Inserts address data into the database.
+
+    Queued on the write buffer unless sync=True (or WRITE_BUFFER_MODE=sync),
+    in which case the row is committed before returning.
+    """
     try:
         if not address_data or not isinstance(address_data, dict):
             raise ValueError("Invalid address data")
 
-        conn = mysql.connector.connect(
-            host=MYSQL_HOST,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            database=MYSQL_DATABASE
-        )
-        cursor = conn.cursor()
+        if use_write_buffer(sync):
+            write_buffer.add('addresses', address_values(address_data))
+            return True
+
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(INSERT_ADDRESS_QUERY, address_values(address_data))
+                conn.commit()
+            finally:
+                cursor.close()
+        return True
 
-        query = """
-        INSERT INTO addresses (address_text, pincode, city, state, street,
-                               google_maps_pincode, google_maps_city, google_maps_state, google_maps_street,
-                               nodal_delivery_center)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        values = (
-            address_data.get('address_text'),
-            address_data.get('pincode'),
-            address_data.get('city'),
-            address_data.get('state'),
-            address_data.get('street'),
-            address_data.get('google_maps_pincode'),
-            address_data.get('google_maps_city'),
-            address_data.get('google_maps_state'),
-            address_data.get('google_maps_street'),
-            address_data.get('nodal_delivery_center')
-        )
-        cursor.execute(query, values)
-        conn.commit()
+    except mysql.connector.Error as err:
+        print(f"Database error: {err}")
+        return False
+
+def insert_addresses(addresses):
+    """Inserts many addresses with a single multi-row INSERT."""
+    if not addresses:
+        return True
+    try:
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                # executemany() folds simple INSERT ... VALUES into one multi-row statement
+                cursor.executemany(INSERT_ADDRESS_QUERY, [address_values(a) for a in addresses])
+                conn.commit()
+            finally:
+                cursor.close()
         return True
 
     except mysql.connector.Error as err:
         print(f"Database error: {err}")
         return False
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals():
-            conn.close()
 
-def insert_wrong_pincode(original, corrected, address_text, confidence):
+def insert_wrong_pincode(original, corrected, address_text, confidence, sync=False):
     """Record wrong pincodes and their corrections in the database"""
     try:
-        conn = mysql.connector.connect(
-            host=MYSQL_HOST,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            database=MYSQL_DATABASE
-        )
-        cursor = conn.cursor()
-
-        query = """
-        INSERT INTO wrong_pincodes (original_pincode, corrected_pincode, address_text, confidence_score)
-        VALUES (%s, %s, %s, %s)
-        """
         values = (original, corrected, address_text, confidence)
-        cursor.execute(query, values)
-        conn.commit()
+        if use_write_buffer(sync):
+            write_buffer.add('wrong_pincodes', values)
+            return True
+
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(INSERT_WRONG_PINCODE_QUERY, values)
+                conn.commit()
+            finally:
+                cursor.close()
         return True
 
     except mysql.connector.Error as err:
         print(f"Database error: {err}")
         return False
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals():
-            conn.close()
 
 def get_wrong_pincodes():
     """Fetch wrong pincodes from the database"""
     try:
-        conn = mysql.connector.connect(
-            host=MYSQL_HOST,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            database=MYSQL_DATABASE
-        )
-        cursor = conn.cursor(dictionary=True)
-        
         query = """
         SELECT * FROM wrong_pincodes 
         ORDER BY created_at DESC
         """
-        cursor.execute(query)
-        return cursor.fetchall()
+        with db_pool.connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                cursor.execute(query)
+                return cursor.fetchall()
+            finally:
+                cursor.close()
 
     except mysql.connector.Error as err:
         print(f"Database error: {err}")
         return []
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals():
-            conn.close()
 
-def insert_voice_address(audio_path, transcribed_text, pincode, city, state, nodal_center):
+def insert_voice_address(audio_path, transcribed_text, pincode, city, state, nodal_center, sync=False):
     """Record voice recognized addresses in the database"""
     try:
-        conn = mysql.connector.connect(
-            host=MYSQL_HOST,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            database=MYSQL_DATABASE
-        )
-        cursor = conn.cursor()
-
-        query = """
-        INSERT INTO voice_addresses (audio_file_path, transcribed_text, pincode, city, state, nodal_delivery_center)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        """
         values = (audio_path, transcribed_text, pincode, city, state, nodal_center)
-        cursor.execute(query, values)
-        conn.commit()
+        if use_write_buffer(sync):
+            write_buffer.add('voice_addresses', values)
+            return True
+
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(INSERT_VOICE_ADDRESS_QUERY, values)
+                conn.commit()
+            finally:
+                cursor.close()
         return True
 
     except mysql.connector.Error as err:
         print(f"Database error: {err}")
         return False
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals():
-            conn.close()
+
+INSERT_ROUTE_QUERY = """
+INSERT INTO route_optimization (route_name, nodal_center, start_location, stops,
+                               total_distance, estimated_time)
+VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+def route_values(route_data):
+    """Row values for INSERT_ROUTE_QUERY"""
+    return (
+        route_data.get('route_name'),
+        route_data.get('nodal_center'),
+        route_data.get('start_location'),
+        json.dumps(route_data.get('stops', [])),
+        route_data.get('total_distance'),
+        route_data.get('estimated_time')
+    )
 
 def save_route_optimization(route_data):
     """Save route optimization data to the database"""
-    try:
-        conn = mysql.connector.connect(
-            host=MYSQL_HOST,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            database=MYSQL_DATABASE
-        )
-        cursor = conn.cursor()
+    return save_route_optimizations([route_data])
 
-        query = """
-        INSERT INTO route_optimization (route_name, nodal_center, start_location, stops, 
-                                       total_distance, estimated_time)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        values = (
-            route_data.get('route_name'),
-            route_data.get('nodal_center'),
-            route_data.get('start_location'),
-            json.dumps(route_data.get('stops', [])),
-            route_data.get('total_distance'),
-            route_data.get('estimated_time')
-        )
-        cursor.execute(query, values)
-        conn.commit()
+def save_route_optimizations(routes):
+    """Save several routes (e.g. one per vehicle) with a single multi-row INSERT"""
+    if not routes:
+        return True
+    try:
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.executemany(INSERT_ROUTE_QUERY, [route_values(r) for r in routes])
+                conn.commit()
+            finally:
+                cursor.close()
         return True
 
     except mysql.connector.Error as err:
         print(f"Database error: {err}")
         return False
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals():
-            conn.close()
+
+def get_addresses_for_center(nodal_center, day):
+    """Addresses assigned to a nodal center on a given date"""
+    try:
+        with db_pool.connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                cursor.execute("""
+                    SELECT id, pincode, street, city, state FROM addresses
+                    WHERE nodal_delivery_center = %s
+                      AND created_at >= %s AND created_at < %s + INTERVAL 1 DAY
+                    ORDER BY id
+                """, (nodal_center, day, day))
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
+    except mysql.connector.Error as err:
+        print(f"Database error: {err}")
+        return []
 
 def get_dashboard_data():
-    """Get aggregate data for the dashboard"""
+    """Get aggregate data for the dashboard as (data, etag)"""
     try:
-        conn = mysql.connector.connect(
-            host=MYSQL_HOST,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            database=MYSQL_DATABASE
-        )
-        cursor = conn.cursor(dictionary=True)
-        
-        # Get total addresses processed
-        cursor.execute("SELECT COUNT(*) as total_addresses FROM addresses")
-        total_addresses = cursor.fetchone()['total_addresses']
-        
-        # Get total wrong pincodes
-        cursor.execute("SELECT COUNT(*) as total_wrong_pincodes FROM wrong_pincodes")
-        total_wrong_pincodes = cursor.fetchone()['total_wrong_pincodes']
-        
-        # Get total voice addresses
-        cursor.execute("SELECT COUNT(*) as total_voice_addresses FROM voice_addresses")
-        total_voice_addresses = cursor.fetchone()['total_voice_addresses']
-        
-        # Get addresses by nodal center
-        cursor.execute("""
-            SELECT nodal_delivery_center, COUNT(*) as count 
-            FROM addresses 
-            GROUP BY nodal_delivery_center
-        """)
-        nodal_centers_data = cursor.fetchall()
-        
-        # Get recent addresses
-        cursor.execute("""
-            SELECT * FROM addresses 
-            ORDER BY created_at DESC 
-            LIMIT 10
-        """)
-        recent_addresses = cursor.fetchall()
-        
-        return {
-            "total_addresses": total_addresses,
-            "total_wrong_pincodes": total_wrong_pincodes,
-            "total_voice_addresses": total_voice_addresses,
-            "nodal_centers_data": nodal_centers_data,
-            "recent_addresses": recent_addresses
-        }
+        return dashboard_aggregates.get()
 
     except mysql.connector.Error as err:
         print(f"Database error: {err}")
-        return {}
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals():
-            conn.close()
+        return {}, None
+
+@app.before_request
+def record_first_request():
+    """Record how long after import started this process served its first request"""
+    if startup_metrics['first_request'] is None:
+        startup_metrics['first_request'] = {
+            'path': request.path,
+            'seconds_since_import': round(time.perf_counter() - APP_IMPORT_STARTED, 3)
+        }
 
 @app.errorhandler(Exception)
 def handle_exception(e):
@@ -640,65 +701,195 @@ def batch_address_capture():
     return render_template('batch_address_capture.html')
 
 # API Endpoints
-@app.route('/api/capture_and_process', methods=['POST'])
-def capture_and_process():
-    """Process handwritten address image"""
-    try:
-        data = request.get_json()
-        if not data or 'image' not in data:
-            return jsonify({'error': 'No image data provided'}), 400
+def process_address_image(image_data):
+    """Run the full capture pipeline on one image.
 
-        # Extract text from image
-        address_text = extract_address_from_image(data['image'])
+    Returns a (payload, status_code) tuple shared by the synchronous endpoint
+    and the async job workers.
+    """
+    try:
+        # Extract text from image (or reuse the result for an identical image)
+        address_text, parsed_address, cache_info = read_address_image(image_data)
         if not address_text:
-            return jsonify({'error': 'OCR extraction failed'}), 400
-
-        # Parse address text
-        expected_address = parse_address_text(address_text)
-        if not expected_address:
-            return jsonify({'error': 'Address parsing failed'}), 400
+            return {'error': 'OCR extraction failed'}, 400
 
-        # Geocode address
-        geocode_result = geocode_address(expected_address)
-        if not geocode_result:
-            return jsonify({'error': 'Invalid address (Google Maps API)'}), 400
-
-        # Combine results
-        expected_address.update(geocode_result)
-        expected_address['address_text'] = address_text
-        expected_address['nodal_delivery_center'] = get_nodal_center(expected_address['pincode'])
+        # Parse, geocode and resolve nodal center
+        expected_address, error = enrich_address_text(address_text, parsed_address)
+        if error:
+            return {'error': error, 'ocr_cache': ocr_cache_report(cache_info)}, 400
 
         # Insert into database
         if not insert_address(expected_address):
-            return jsonify({'error': 'Database insertion failed'}), 500
+            return {'error': 'Database insertion failed'}, 500
 
-        return jsonify({
+        return {
             'message': 'Address processed and stored successfully',
-            'extracted_address': {
-                'address_text': expected_address.get('address_text'),
-                'street': expected_address.get('street'),
-                'city': expected_address.get('city'),
-                'state': expected_address.get('state'),
-                'pincode': expected_address.get('pincode')
-            },
-            'geocoding_results': {
-                'google_maps_street': expected_address.get('google_maps_street'),
-                'google_maps_city': expected_address.get('google_maps_city'),
-                'google_maps_state': expected_address.get('google_maps_state'),
-                'google_maps_pincode': expected_address.get('google_maps_pincode')
-            },
-            'nodal_delivery_center': expected_address['nodal_delivery_center']
-        })
+            **format_address_result(expected_address),
+            'ocr_cache': ocr_cache_report(cache_info)
+        }, 200
 
     except Exception as e:
         print(f"Error during capture and process: {str(e)}")
-        return jsonify({'error': 'Internal server error'}), 500
+        return {'error': 'Internal server error'}, 500
+
+def run_capture_job(payload):
+    """Job queue handler for asynchronous captures"""
+    return process_address_image(payload['image'])
+
+# Asynchronous capture queue
+job_queue = JobQueue(
+    os.getenv("JOB_DB_PATH", os.path.join(app.root_path, 'jobs.sqlite3')),
+    run_capture_job,
+    workers=int(os.getenv("JOB_WORKERS", 2)),
+    max_depth=int(os.getenv("JOB_QUEUE_MAX_DEPTH", 100))
+)
+
+@app.route('/api/capture_and_process', methods=['POST'])
+def capture_and_process():
+    """Process handwritten address image.
+
+    Pass ``"async": true`` (or ``?async=1``) to queue the image and get a job
+    id back immediately; poll ``/api/jobs/<id>`` for the result.
+    """
+    data = request.get_json(silent=True)
+    if not data or 'image' not in data:
+        return jsonify({'error': 'No image data provided'}), 400
+
+    if data.get('async') or request.args.get('async') in ('1', 'true'):
+        try:
+            job_id = job_queue.submit({'image': data['image']})
+        except QueueFullError as e:
+            response = jsonify({'error': str(e)})
+            response.headers['Retry-After'] = '5'
+            return response, 429
+        return jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f'/api/jobs/{job_id}'
+        }), 202
+
+    payload, status_code = process_address_image(data['image'])
+    return jsonify(payload), status_code
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status and result of an asynchronous capture job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
 
 @app.route('/capture_and_process', methods=['POST'])
 def legacy_capture_and_process():
     """Legacy endpoint for backward compatibility"""
     return capture_and_process()
 
+def read_batch_images():
+    """Collect batch images from a multipart upload or a JSON array"""
+    if request.files:
+        return [f.read() for f in request.files.getlist('images')]
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('images')
+    return data if isinstance(data, list) else []
+
+@app.route('/api/capture_and_process/batch', methods=['POST'])
+def capture_and_process_batch():
+    """Process many address images, streaming one NDJSON result per image.
+
+    Images already in the OCR cache, and repeats within the batch, skip OCR.
+    OCR runs on the process pool; each finished image is parsed, geocoded and
+    mapped to its nodal center on a thread pool while the remaining images are
+    still being read. Results are streamed in completion order, then all
+    successful rows are stored with one multi-row insert and a summary line
+    closes the stream.
+    """
+    images = read_batch_images()
+    if not images:
+        return jsonify({'error': 'No image data provided'}), 400
+    if len(images) > BATCH_MAX_IMAGES:
+        return jsonify({'error': f'Too many images, at most {BATCH_MAX_IMAGES} per batch'}), 413
+
+    def generate():
+        processed = []
+        failed = 0
+        pending = {}
+        # Content hash -> indexes of the images waiting for its OCR, so duplicates run once
+        waiting = {}
+        ocr_pool = ocr.get_executor()
+        with ThreadPoolExecutor(max_workers=BATCH_GEOCODE_WORKERS) as enrich_pool:
+            for index, image in enumerate(images):
+                try:
+                    raw = ocr.image_bytes(image)
+                    key = content_hash(raw)
+                    if key in waiting:
+                        waiting[key].append(index)
+                        continue
+                    # Same lookup as the single-image path, near duplicates included
+                    entry, cache_info = ocr_cache.get(key, lambda: perceptual_hash(ocr.decode_image(raw)))
+                except ValueError as e:
+                    failed += 1
+                    yield json.dumps({'index': index, 'success': False, 'error': str(e)}) + '\n'
+                    continue
+
+                if entry is not None:
+                    future = enrich_pool.submit(enrich_address_text, entry['address_text'], entry['parsed_address'])
+                    pending[future] = ('enrich', index, cache_info)
+                    continue
+                waiting[key] = [index]
+                pending[ocr_pool.submit(extract_address_from_image, raw)] = ('ocr', key, cache_info)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, target, cache_info = pending.pop(future)
+                    indexes = waiting.pop(target) if stage == 'ocr' else [target]
+                    try:
+                        result = future.result()
+                        if stage == 'ocr':
+                            parsed_address = parse_address_text(result)
+                    except Exception as e:
+                        failed += len(indexes)
+                        for index in indexes:
+                            yield json.dumps({'index': index, 'success': False, 'error': str(e)}) + '\n'
+                        continue
+
+                    if stage == 'ocr':
+                        # Stored like the single-image path, so later near duplicates match too
+                        ocr_cache.set(target, result, parsed_address, cache_info.get('dhash'))
+                        for position, index in enumerate(indexes):
+                            # Later copies of the same image in this batch count as cache hits
+                            info = cache_info if position == 0 else {'hit': True, 'tier': 'batch',
+                                                                     'near_duplicate': False}
+                            future = enrich_pool.submit(enrich_address_text, result, parsed_address)
+                            pending[future] = ('enrich', index, info)
+                        continue
+
+                    expected_address, error = result
+                    if error:
+                        failed += 1
+                        yield json.dumps({'index': target, 'success': False, 'error': error}) + '\n'
+                        continue
+
+                    processed.append(expected_address)
+                    yield json.dumps({
+                        'index': target,
+                        'success': True,
+                        **format_address_result(expected_address),
+                        'ocr_cache': ocr_cache_report(cache_info)
+                    }) + '\n'
+
+        stored = insert_addresses(processed)
+        yield json.dumps({'summary': {
+            'total': len(images),
+            'processed': len(processed),
+            'failed': failed,
+            'stored': stored
+        }}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/validate_pincode', methods=['POST'])
 def validate_pincode_api():
     """Validate and suggest corrections for pincodes"""
@@ -718,11 +909,23 @@ def validate_pincode_api():
                 'is_valid': True,
                 'pincode': pincode,
                 'nodal_center': nodal_center,
-                'message': f'Valid pincode for {nodal_center}'
+                'distance_to_nodal_center_km': distance_matrix.distance(pincode, f"center:{nodal_center}")
+                                               if nodal_center else None,
+                'message': f'Valid pincode for {nodal_center}' if nodal_center else 'Valid pincode'
             })
         
+        # Narrow suggestions to the state/district given or parsed from the address
+        state = data.get('state')
+        district = data.get('district')
+        if address_text and not (state or district):
+            parsed_address = parse_address_text(address_text)
+            state = parsed_address.get('state')
+            district = parsed_address.get('city')
+
         # Suggest correction if invalid
-        suggestion, confidence = suggest_correct_pincode(pincode)
+        candidates = [c for c in suggest_pincodes(pincode, k=int(data.get('k', 5)), state=state, district=district)
+                      if c[1] >= 0.5]
+        suggestion, confidence = candidates[0] if candidates else (None, 0)
         
         if suggestion:
             # Record the wrong pincode
@@ -734,6 +937,10 @@ def validate_pincode_api():
                 'suggestion': suggestion,
                 'confidence': confidence,
                 'suggested_nodal_center': suggested_nodal_center,
+                'candidates': [
+                    {'pincode': candidate, 'score': score, 'nodal_center': get_nodal_center(candidate)}
+                    for candidate, score in candidates
+                ],
                 'message': f'Invalid pincode. Did you mean {suggestion} for {suggested_nodal_center}?'
             })
         
@@ -810,6 +1017,34 @@ def get_wrong_pincodes_api():
         print(f"Error fetching wrong pincodes: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+def resolve_route_point(point):
+    """(lat, lng) for a route point: a pincode, "lat,lng" text or a dict with either"""
+    if isinstance(point, dict):
+        if point.get('latitude') is not None and point.get('longitude') is not None:
+            return float(point['latitude']), float(point['longitude'])
+        point = point.get('pincode')
+    if not isinstance(point, str):
+        return None
+
+    point = point.strip()
+    if ',' in point:
+        try:
+            latitude, longitude = (float(value) for value in point.split(','))
+            return latitude, longitude
+        except ValueError:
+            return None
+    return local_geocoder.directory().center_by_pincode.get(point)
+
+def route_point_key(point):
+    """Distance matrix key of a route point located by pincode, else None"""
+    if isinstance(point, dict):
+        if point.get('latitude') is not None and point.get('longitude') is not None:
+            return None
+        point = point.get('pincode')
+    if not isinstance(point, str) or ',' in point:
+        return None
+    return point.strip()
+
 @app.route('/api/optimize_route', methods=['POST'])
 def optimize_route():
     """Optimize delivery routes for a nodal center"""
@@ -822,18 +1057,46 @@ def optimize_route():
         start_location = data.get('start_location')
         delivery_points = data.get('delivery_points', [])
         
+        if data.get('mode') == 'vrp':
+            return optimize_fleet_routes(data)
+
         if not nodal_center or not start_location:
             return jsonify({'error': 'Missing required parameters'}), 400
         
-        # TODO: Implement actual route optimization
-        # Simulated result for now
+        start_coords = resolve_route_point(start_location)
+        if start_coords is None:
+            return jsonify({'error': 'Could not locate start_location'}), 400
+
+        located = []
+        unresolved = []
+        for point in delivery_points:
+            coords = resolve_route_point(point)
+            if coords is None:
+                unresolved.append(point)
+            else:
+                located.append((point, coords))
+
+        # Precomputed distances when every point is a pincode in the matrix
+        keys = [route_point_key(start_location)] + [route_point_key(point) for point, _ in located]
+        dist = distance_matrix.submatrix(keys) if None not in keys else None
+
+        solution = route_optimizer.solve_route(
+            [start_coords] + [coords for _, coords in located],
+            return_to_start=data.get('return_to_start', True),
+            time_budget=min(float(data.get('time_budget', ROUTE_TIME_BUDGET)), ROUTE_MAX_TIME_BUDGET),
+            dist=dist
+        )
+        stops = [located[index - 1][0] for index in solution['order']]
+        minutes = route_optimizer.estimate_minutes(solution['distance_km'], len(stops))
+
         optimized_route = {
             'route_name': f"Route for {nodal_center}",
             'nodal_center': nodal_center,
-            'start_location': start_location,
-            'stops': delivery_points,
-            'total_distance': 15.7,  # km
-            'estimated_time': "2 hours 15 minutes"
+            'start_location': start_location if isinstance(start_location, str) else json.dumps(start_location),
+            'stops': stops,
+            'total_distance': round(solution['distance_km'], 2),  # km
+            'estimated_time': route_optimizer.format_duration(minutes),
+            'unresolved_stops': unresolved
         }
         
         # Save to database
@@ -841,19 +1104,161 @@ def optimize_route():
         
         return jsonify({
             'success': True,
-            'optimized_route': optimized_route
+            'optimized_route': optimized_route,
+            'solver': {
+                'initial_distance': round(solution['initial_distance_km'], 2),
+                'moves': solution['moves'],
+                'solve_time': round(solution['solve_time'], 3)
+            }
         })
         
     except Exception as e:
         print(f"Error optimizing route: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+def nodal_center_location(nodal_center, snapshot=None):
+    """Configured location of a nodal center, else the centroid of the pincodes it serves"""
+    snapshot = snapshot or nodal_center_registry.snapshot()
+    if nodal_center in snapshot.locations:
+        return snapshot.locations[nodal_center]
+    centers = local_geocoder.directory().center_by_pincode
+    points = [centers[p] for p in snapshot.centers.get(nodal_center, []) if p in centers]
+    if not points:
+        return None
+    return (sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points))
+
+def optimize_fleet_routes(data):
+    """Capacitated multi-vehicle routing over a nodal center's addresses for one day.
+
+    Expects ``nodal_center``, ``vehicles`` and ``capacity`` (one number or a
+    list per vehicle); ``date`` defaults to today and ``start_location`` to
+    the centroid of the center's pincodes. Stores one route_optimization
+    row per vehicle.
+    """
+    nodal_center = data.get('nodal_center')
+    vehicles = int(data.get('vehicles', 1))
+    capacity = data.get('capacity')
+    if not nodal_center or vehicles < 1 or capacity is None:
+        return jsonify({'error': 'nodal_center, vehicles and capacity are required'}), 400
+
+    capacities = [int(c) for c in capacity] if isinstance(capacity, list) else [int(capacity)] * vehicles
+    if len(capacities) != vehicles or min(capacities) < 0:
+        return jsonify({'error': 'capacity must be one non-negative number or one per vehicle'}), 400
+
+    start_location = data.get('start_location')
+    depot = resolve_route_point(start_location) if start_location else nodal_center_location(nodal_center)
+    if depot is None:
+        return jsonify({'error': 'Could not locate start_location'}), 400
+
+    day = data.get('date') or datetime.now().strftime('%Y-%m-%d')
+    located = []
+    unresolved = []
+    for address in get_addresses_for_center(nodal_center, day):
+        coords = resolve_route_point(address['pincode'])
+        if coords is None:
+            unresolved.append(address['id'])
+        else:
+            located.append((address, coords))
+
+    depot_key = route_point_key(start_location) if start_location else f"center:{nodal_center}"
+    routes, unassigned = route_optimizer.solve_vrp(
+        depot,
+        [coords for _, coords in located],
+        capacities,
+        return_to_start=data.get('return_to_start', True),
+        time_budget=min(float(data.get('time_budget', ROUTE_TIME_BUDGET)), ROUTE_MAX_TIME_BUDGET),
+        keys=[address['pincode'] for address, _ in located],
+        depot_key=depot_key,
+        matrix_dir=distance_matrix.directory if distance_matrix.stats()['loaded'] else None
+    )
+
+    vehicle_routes = []
+    for vehicle, solution in enumerate(routes, 1):
+        stops = [{'address_id': located[index][0]['id'], 'pincode': located[index][0]['pincode']}
+                 for index in solution['order']]
+        minutes = route_optimizer.estimate_minutes(solution['distance_km'], len(stops))
+        vehicle_routes.append({
+            'route_name': f"Route for {nodal_center} - Vehicle {vehicle} ({day})",
+            'nodal_center': nodal_center,
+            'start_location': start_location if isinstance(start_location, str) else f"{depot[0]:.6f},{depot[1]:.6f}",
+            'stops': stops,
+            'total_distance': round(solution['distance_km'], 2),  # km
+            'estimated_time': route_optimizer.format_duration(minutes)
+        })
+
+    save_route_optimizations(vehicle_routes)
+
+    return jsonify({
+        'success': True,
+        'date': day,
+        'routes': vehicle_routes,
+        'total_distance': round(sum(r['total_distance'] for r in vehicle_routes), 2),
+        'unassigned_address_ids': [located[index][0]['id'] for index in unassigned],
+        'unresolved_address_ids': unresolved
+    })
+
+def nodal_center_locations(snapshot=None):
+    """Locations of every nodal center that can be placed"""
+    snapshot = snapshot or nodal_center_registry.snapshot()
+    locations = {}
+    for nodal_center in snapshot.centers:
+        location = nodal_center_location(nodal_center, snapshot)
+        if location:
+            locations[nodal_center] = location
+    return locations
+
+def distance_matrix_points():
+    """Coordinates of every pincode and nodal center for the distance matrix"""
+    points = dict(local_geocoder.directory().center_by_pincode)
+    for nodal_center, location in nodal_center_locations().items():
+        points[f"center:{nodal_center}"] = location
+    return points
+
+def run_in_background(name, *steps):
+    """Run steps one after another on a daemon thread, logging failures; returns the thread"""
+    def run():
+        for step in steps:
+            try:
+                step()
+            except Exception as e:
+                print(f"{name} failed in {step.__name__}: {str(e)}")
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return thread
+
+def update_distance_matrix():
+    distance_matrix.update(distance_matrix_points())
+
+def rebuild_nodal_assignments():
+    nodal_assignment.rebuild(nodal_center_locations(), local_geocoder.directory().center_by_pincode)
+
+def rebuild_distance_matrix():
+    """Update the distance matrix in a background thread"""
+    run_in_background('distance-matrix', update_distance_matrix)
+
+def rebuild_spatial_indexes():
+    """Reassign pincodes to their closest centers, then update the distance matrix.
+
+    Bumping the nodal centers version afterwards makes every worker load the
+    new assignments.
+    """
+    return run_in_background('spatial-indexes', rebuild_nodal_assignments, update_distance_matrix,
+                             nodal_center_registry.bump_version)
+
 @app.route('/api/dashboard_data', methods=['GET'])
 def dashboard_data():
     """Get dashboard statistics"""
     try:
-        data = get_dashboard_data()
-        return jsonify(data)
+        data, etag = get_dashboard_data()
+        if etag and request.if_none_match.contains(etag.strip('"')):
+            return Response(status=304, headers={'ETag': etag})
+
+        response = jsonify(data)
+        if etag:
+            response.headers['ETag'] = etag
+            response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
         print(f"Error fetching dashboard data: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -874,6 +1279,7 @@ def parse_address():
             return jsonify({
                 'success': True,
                 'parsed_address': parsed_address,
+                'validation': get_address_parser().validate(parsed_address),
                 'nodal_center': nodal_center
             })
         
@@ -886,6 +1292,88 @@ def parse_address():
         print(f"Error parsing address: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+def read_address_batch():
+    """Yield address texts from a JSON array or an NDJSON request stream"""
+    if request.mimetype == 'application/x-ndjson':
+        for line in request.stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                yield None
+                continue
+            yield item.get('address_text') if isinstance(item, dict) else item
+        return
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('addresses')
+    for item in data or []:
+        yield item.get('address_text') if isinstance(item, dict) else item
+
+@app.route('/api/address_parsing/batch', methods=['POST'])
+def parse_address_batch():
+    """Parse many text addresses, streaming one NDJSON result per address.
+
+    Accepts a JSON array (or ``{"addresses": [...]}``) or an NDJSON body of
+    strings / ``{"address_text": ...}`` objects. Addresses are parsed in
+    chunks on the parser process pool with a bounded number of chunks in
+    flight, and results are streamed back in input order. For NDJSON bodies
+    memory stays flat regardless of batch size; a JSON array body is loaded
+    whole before parsing starts.
+    """
+    parser = get_address_parser()
+    pincode_details = pincode_index.snapshot().details_by_pincode
+    max_in_flight = address_parser_module.PARSE_WORKERS * 2
+    counts = {'total': 0, 'succeeded': 0, 'failed': 0}
+
+    def emit(start, future):
+        results = future.result()
+        # Resolve each distinct pincode once per chunk
+        centers = {parsed['pincode']: get_nodal_center(parsed['pincode'])
+                   for parsed, _ in results if parsed and parsed['pincode']}
+        lines = []
+        for offset, (parsed, error) in enumerate(results):
+            counts['total'] += 1
+            if error:
+                counts['failed'] += 1
+                item = {'index': start + offset, 'success': False, 'error': error}
+            else:
+                counts['succeeded'] += 1
+                item = {
+                    'index': start + offset,
+                    'success': True,
+                    'parsed_address': parsed,
+                    'nodal_center': centers.get(parsed['pincode'])
+                }
+            lines.append(json.dumps(item))
+        return '\n'.join(lines) + '\n'
+
+    def generate():
+        # The lease keeps this pool running even if rebuild_address_parser()
+        # retires it while the batch is still streaming
+        with address_parser_module.executor_lease(parser, pincode_details) as executor:
+            in_flight = deque()
+            chunk = []
+            start = 0
+            for text in read_address_batch():
+                chunk.append(text)
+                if len(chunk) >= PARSE_CHUNK_SIZE:
+                    in_flight.append((start, executor.submit(address_parser_module.parse_many, chunk)))
+                    start += len(chunk)
+                    chunk = []
+                    if len(in_flight) >= max_in_flight:
+                        yield emit(*in_flight.popleft())
+            if chunk:
+                in_flight.append((start, executor.submit(address_parser_module.parse_many, chunk)))
+            while in_flight:
+                yield emit(*in_flight.popleft())
+        yield json.dumps({'summary': counts}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/import_pincodes', methods=['POST'])
 def import_pincodes():
     if 'file' not in request.files:
@@ -895,18 +1383,41 @@ def import_pincodes():
     if not file.filename.endswith('.csv'):
         return jsonify({'error': 'Only CSV files are allowed'}), 400
     
-    success, message = pincode_service.import_from_csv(file)
+    success, message, report = pincode_service.import_from_csv(file)
     if success:
-        return jsonify({'message': message}), 200
+        pincode_index.rebuild()
+        local_geocoder.rebuild()
+        rebuild_spatial_indexes()
+        rebuild_address_parser()
+        try:
+            # Cached parsed addresses were resolved against the old directory
+            ocr_cache.clear_parsed()
+        except mysql.connector.Error as err:
+            print(f"Database error: {err}")
+        return jsonify({'message': message, 'report': report}), 200
+    elif report is None:
+        return jsonify({'error': message}), 409
     else:
-        return jsonify({'error': message}), 500
+        return jsonify({'error': message, 'report': report}), 500
+
+@app.route('/api/import_pincodes/status', methods=['GET'])
+def import_pincodes_status():
+    """Progress of the running (or last) pincode import in this worker"""
+    return jsonify({'import': pincode_service.import_progress})
 
 @app.route('/api/pincodes', methods=['GET'])
 def get_pincodes():
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 50))
-        result = pincode_service.get_pincodes(page, per_page)
+        page = int(request.args['page']) if 'page' in request.args else None
+        per_page = min(int(request.args.get('per_page', 50)), 500)
+        result = pincode_service.get_pincodes(
+            page,
+            per_page,
+            cursor=request.args.get('cursor'),
+            sort=request.args.get('sort', 'id'),
+            state=request.args.get('state'),
+            district=request.args.get('district')
+        )
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -915,26 +1426,228 @@ def get_pincodes():
 def search_pincodes():
     try:
         query = request.args.get('q', '')
-        limit = int(request.args.get('limit', 10))
-        results = pincode_service.search_pincodes(query, limit)
+        limit = min(int(request.args.get('limit', 10)), 100)
+        typeahead = request.args.get('typeahead') in ('1', 'true')
+        results = pincode_service.search_pincodes(query, limit, typeahead=typeahead)
         return jsonify(results)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/db_pool_stats', methods=['GET'])
+def db_pool_stats():
+    """Connection pool usage for monitoring"""
+    return jsonify(db_pool.get_pool().stats())
+
+@app.route('/api/nodal_centers', methods=['GET'])
+def list_nodal_centers():
+    """All nodal centers with their coverage; supports If-None-Match"""
+    snapshot = nodal_center_registry.snapshot()
+    if request.if_none_match.contains(snapshot.etag.strip('"')):
+        return Response(status=304, headers={'ETag': snapshot.etag})
+
+    response = jsonify({
+        'version': snapshot.version,
+        'nodal_centers': [{
+            'name': name,
+            'pincodes': pincodes,
+            'location': snapshot.locations.get(name)
+        } for name, pincodes in snapshot.centers.items()]
+    })
+    response.headers['ETag'] = snapshot.etag
+    return response
+
+@app.route('/api/admin/nodal_centers', methods=['POST'])
+def upsert_nodal_center():
+    """Create or replace a nodal center and the pincodes it covers"""
+    data = request.get_json(silent=True) or {}
+    name = (data.get('name') or '').strip()
+    pincodes = data.get('pincodes') or []
+    if not name or not isinstance(pincodes, list):
+        return jsonify({'error': 'name and a pincodes list are required'}), 400
+    if any(not (isinstance(p, str) and p.isdigit() and len(p) == 6) for p in pincodes):
+        return jsonify({'error': 'pincodes must be 6-digit strings'}), 400
+
+    try:
+        nodal_center_registry.upsert_center(name, pincodes, data.get('latitude'), data.get('longitude'))
+    except mysql.connector.Error as err:
+        print(f"Database error: {err}")
+        return jsonify({'error': 'Failed to save nodal center'}), 500
+
+    snapshot = nodal_center_registry.reload()
+    rebuild_spatial_indexes()
+    return jsonify({'success': True, 'version': snapshot.version})
+
+@app.route('/api/admin/nodal_centers/<path:name>', methods=['DELETE'])
+def delete_nodal_center(name):
+    """Remove a nodal center"""
+    try:
+        deleted = nodal_center_registry.delete_center(name)
+    except mysql.connector.Error as err:
+        print(f"Database error: {err}")
+        return jsonify({'error': 'Failed to delete nodal center'}), 500
+    if not deleted:
+        return jsonify({'error': 'Nodal center not found'}), 404
+
+    snapshot = nodal_center_registry.reload()
+    rebuild_spatial_indexes()
+    return jsonify({'success': True, 'version': snapshot.version})
+
+@app.route('/api/admin/nodal_centers/reload', methods=['POST'])
+def reload_nodal_centers():
+    """Reload nodal centers in this worker without waiting for the version check"""
+    snapshot = nodal_center_registry.reload()
+    return jsonify({'success': True, 'version': snapshot.version, 'nodal_centers': len(snapshot.centers)})
+
+@app.route('/api/nodal_centers/nearest', methods=['GET'])
+def nearest_nodal_centers():
+    """k nearest nodal centers (with distances in km) to a coordinate or pincode"""
+    try:
+        k = min(request.args.get('k', 3, type=int), 50)
+        pincode = request.args.get('pincode')
+        if pincode:
+            location = local_geocoder.directory().center_by_pincode.get(pincode)
+            if location is None:
+                return jsonify({'error': 'Unknown pincode'}), 404
+        else:
+            latitude = request.args.get('lat', type=float)
+            longitude = request.args.get('lng', type=float)
+            if latitude is None or longitude is None:
+                return jsonify({'error': 'Provide pincode or lat and lng'}), 400
+            location = (latitude, longitude)
+
+        if not nodal_assignment.stats()['centers']:
+            nodal_assignment.set_centers(nodal_center_locations())
+
+        return jsonify({
+            'location': {'latitude': location[0], 'longitude': location[1]},
+            'nearest': [{'nodal_center': name, 'distance_km': round(distance, 3)}
+                        for name, distance in nodal_assignment.nearest(location[0], location[1], k)]
+        })
+    except Exception as e:
+        print(f"Error finding nearest nodal centers: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/admin/nodal_assignment', methods=['GET'])
+def nodal_assignment_stats():
+    """Pincode to nearest nodal center assignment status"""
+    return jsonify(nodal_assignment.stats())
+
+@app.route('/api/admin/distance_matrix', methods=['GET'])
+def distance_matrix_stats():
+    """Distance matrix size and last build"""
+    return jsonify(distance_matrix.stats())
+
+@app.route('/api/admin/distance_matrix/rebuild', methods=['POST'])
+def rebuild_distance_matrix_api():
+    """Start an incremental distance matrix build"""
+    rebuild_distance_matrix()
+    return jsonify({'success': True, 'message': 'Distance matrix build started'}), 202
+
+@app.route('/api/admin/write_buffer', methods=['GET'])
+def write_buffer_stats():
+    """Write-behind buffer counters"""
+    return jsonify({'mode': WRITE_BUFFER_MODE, **write_buffer.stats()})
+
+@app.route('/api/admin/write_buffer/flush', methods=['POST'])
+def flush_write_buffer():
+    """Write queued rows now and retry anything spooled"""
+    written = write_buffer.flush()
+    replayed = write_buffer.replay_spool()
+    return jsonify({'written': written, 'replayed': replayed})
+
+@app.route('/api/admin/dashboard_stats', methods=['GET'])
+def dashboard_cache_stats():
+    """Dashboard response cache and rollup counters"""
+    return jsonify(dashboard_aggregates.stats())
+
+@app.route('/api/admin/startup_metrics', methods=['GET'])
+def get_startup_metrics():
+    """Import, first request and OCR model load timings for this process"""
+    return jsonify({**startup_metrics, 'ocr': ocr.startup_metrics()})
+
+@app.route('/api/admin/ocr/warm_up', methods=['POST'])
+def warm_up_ocr():
+    """Load the OCR model now instead of on the first OCR request"""
+    background = request.args.get('background', 'false').lower() in ('1', 'true', 'yes')
+    seconds = ocr.warm_up(background=background)
+    return jsonify({'started': background, 'warm_up_seconds': seconds, 'ocr': ocr.startup_metrics()})
+
+@app.route('/api/admin/ocr_stats', methods=['GET'])
+def ocr_stats():
+    """OCR preprocessing and batching metrics (this process only)"""
+    return jsonify({'preprocessing': ocr.preprocessing_stats(), 'batching': ocr.batching_stats()})
+
+@app.route('/api/admin/geocoding_stats', methods=['GET'])
+def geocoding_stats():
+    """Geocoding counters: Google client calls/retries/dedupe and local matches"""
+    return jsonify({
+        'mode': GEOCODER_MODE,
+        'google': geocoding_client.stats(),
+        'local': local_geocoder.stats()
+    })
+
+@app.route('/api/admin/ocr_cache', methods=['GET'])
+def ocr_cache_stats():
+    """OCR result cache hit/miss counters"""
+    return jsonify(ocr_cache.stats())
+
+@app.route('/api/admin/ocr_cache', methods=['DELETE'])
+def invalidate_ocr_cache():
+    """Drop every cached OCR result"""
+    try:
+        removed = ocr_cache.invalidate()
+    except mysql.connector.Error as err:
+        print(f"Database error: {err}")
+        return jsonify({'error': 'Failed to clear OCR cache'}), 500
+    return jsonify({'success': True, 'removed': removed})
+
+@app.route('/api/admin/geocode_cache', methods=['GET'])
+def geocode_cache_stats():
+    """Geocoding cache hit/miss counters"""
+    return jsonify(geocode_cache.stats())
+
+@app.route('/api/admin/geocode_cache', methods=['DELETE'])
+def invalidate_geocode_cache():
+    """Invalidate one cached address (``address`` param) or the whole cache"""
+    try:
+        data = request.get_json(silent=True) or {}
+        address = data.get('address') or request.args.get('address')
+        removed = geocode_cache.invalidate(address)
+        return jsonify({'success': True, 'removed': removed})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
     
 
 
-def initialize_services():
-    """Initialize all required services"""
+def initialize_services(wait=False):
+    """Initialize all required services.
+
+    With ``wait`` the first spatial index build finishes before returning,
+    so a preloading master never forks while it is still running.
+    """
     try:
         initialize_db()
+        pincode_index.rebuild()
+        local_geocoder.rebuild()
+        distance_matrix.load()
+        nodal_center_registry.reload()
+        if not nodal_assignment.stats()['assigned_pincodes']:
+            build = rebuild_spatial_indexes()
+            if wait:
+                build.join()
+        write_buffer.replay_spool()
         print("All services initialized successfully")
         return True
     except Exception as e:
         print(f"Failed to initialize services: {str(e)}")
         return False
 
+startup_metrics['import_seconds'] = round(time.perf_counter() - APP_IMPORT_STARTED, 3)
+
 if __name__ == '__main__':
     if initialize_services():
+        if OCR_WARMUP:
+            ocr.warm_up(background=True)
         app.run(debug=True, host='0.0.0.0', port=5000)
     else:
         print("Failed to start application due to initialization errors")
\ No newline at end of file
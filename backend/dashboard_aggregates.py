@@ -0,0 +1,192 @@
+import hashlib
+import json
+import threading
+import time
+
+import db_pool
+
+# Tables whose row counts the dashboard shows
+COUNTED_TABLES = ('addresses', 'wrong_pincodes', 'voice_addresses')
+# Secondary indexes on addresses (also declared in init_db for new databases)
+ADDRESS_INDEXES = {
+    'idx_created_at': '(created_at)',
+    'idx_center_created': '(nodal_delivery_center, created_at)'
+}
+
+
+class DashboardAggregates:
+    """Dashboard totals maintained by incremental rollups.
+
+    ``dashboard_counters`` holds, per counted table, the number of rows up to
+    a ``last_id`` watermark; ``dashboard_center_counts`` holds addresses per
+    nodal center up to the addresses watermark. A rollup only reads rows
+    above the watermark (a primary key range), and rows newer than
+    ``settle_seconds`` are left for the next rollup so inserts still being
+    committed are not skipped. Reads add the small tail above the watermark,
+    so totals are exact without scanning the tables.
+
+    Responses are cached in memory for ``ttl`` seconds with an ETag.
+    """
+
+    def __init__(self, pool=None, ttl=15, settle_seconds=10, recent_limit=10):
+        self._pool = pool
+        self.ttl = ttl
+        self.settle_seconds = settle_seconds
+        self.recent_limit = recent_limit
+        self._cached = None
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'rolled_up_rows': 0}
+
+    @property
+    def pool(self):
+        return self._pool or db_pool.get_pool()
+
+    def initialize_tables(self):
+        """Create the aggregate tables and the addresses indexes"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS dashboard_counters (
+                    source VARCHAR(64) PRIMARY KEY,
+                    total BIGINT NOT NULL DEFAULT 0,
+                    last_id BIGINT NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS dashboard_center_counts (
+                    nodal_center VARCHAR(255) PRIMARY KEY,
+                    count BIGINT NOT NULL DEFAULT 0
+                )
+            """)
+            cursor.executemany(
+                "INSERT IGNORE INTO dashboard_counters (source) VALUES (%s)",
+                [(source,) for source in COUNTED_TABLES]
+            )
+
+            # Databases created before these indexes existed
+            cursor.execute("""
+                SELECT DISTINCT index_name FROM information_schema.statistics
+                WHERE table_schema = DATABASE() AND table_name = 'addresses'
+            """)
+            existing = {row[0] for row in cursor.fetchall()}
+            for name, columns in ADDRESS_INDEXES.items():
+                if name not in existing:
+                    cursor.execute(f"ALTER TABLE addresses ADD INDEX {name} {columns}")
+                    print(f"Added index {name} on addresses")
+
+            conn.commit()
+            cursor.close()
+
+    def rollup(self, cursor):
+        """Fold settled rows above each watermark into the counters"""
+        rolled_up = 0
+        for source in COUNTED_TABLES:
+            # Serializes concurrent rollups from other workers
+            cursor.execute("SELECT last_id FROM dashboard_counters WHERE source = %s FOR UPDATE", (source,))
+            row = cursor.fetchone()
+            last_id = row[0] if row else 0
+            cursor.execute(f"""
+                SELECT MAX(id) FROM {source}
+                WHERE id > %s AND created_at < NOW() - INTERVAL %s SECOND
+            """, (last_id, self.settle_seconds))
+            upper = cursor.fetchone()[0]
+            if upper is None:
+                continue
+
+            cursor.execute(f"SELECT COUNT(*) FROM {source} WHERE id > %s AND id <= %s", (last_id, upper))
+            count = cursor.fetchone()[0]
+            if source == 'addresses':
+                cursor.execute("""
+                    SELECT COALESCE(nodal_delivery_center, ''), COUNT(*) FROM addresses
+                    WHERE id > %s AND id <= %s
+                    GROUP BY nodal_delivery_center
+                """, (last_id, upper))
+                cursor.executemany("""
+                    INSERT INTO dashboard_center_counts (nodal_center, count) VALUES (%s, %s)
+                    ON DUPLICATE KEY UPDATE count = count + VALUES(count)
+                """, cursor.fetchall())
+            cursor.execute("""
+                UPDATE dashboard_counters SET total = total + %s, last_id = %s WHERE source = %s
+            """, (count, upper, source))
+            rolled_up += count
+        return rolled_up
+
+    def _read(self, cursor):
+        cursor.execute("SELECT source, total, last_id FROM dashboard_counters")
+        counters = {source: (total, last_id) for source, total, last_id in cursor.fetchall()}
+
+        totals = {}
+        for source in COUNTED_TABLES:
+            total, last_id = counters.get(source, (0, 0))
+            cursor.execute(f"SELECT COUNT(*) FROM {source} WHERE id > %s", (last_id,))
+            totals[source] = int(total) + cursor.fetchone()[0]
+
+        centers = {}
+        cursor.execute("SELECT nodal_center, count FROM dashboard_center_counts")
+        for nodal_center, count in cursor.fetchall():
+            centers[nodal_center] = int(count)
+        cursor.execute("""
+            SELECT COALESCE(nodal_delivery_center, ''), COUNT(*) FROM addresses
+            WHERE id > %s GROUP BY nodal_delivery_center
+        """, (counters.get('addresses', (0, 0))[1],))
+        for nodal_center, count in cursor.fetchall():
+            centers[nodal_center] = centers.get(nodal_center, 0) + count
+        return totals, centers
+
+    def _recent_addresses(self, conn):
+        cursor = conn.cursor(dictionary=True)
+        try:
+            # The primary key follows insertion order, so no sort is needed
+            cursor.execute("SELECT * FROM addresses ORDER BY id DESC LIMIT %s", (self.recent_limit,))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def compute(self):
+        """Roll up, then build the dashboard payload"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                rolled_up = self.rollup(cursor)
+                conn.commit()
+                totals, centers = self._read(cursor)
+            finally:
+                cursor.close()
+            recent_addresses = self._recent_addresses(conn)
+
+        with self._lock:
+            self._counters['rolled_up_rows'] += rolled_up
+        return {
+            "total_addresses": totals['addresses'],
+            "total_wrong_pincodes": totals['wrong_pincodes'],
+            "total_voice_addresses": totals['voice_addresses'],
+            "nodal_centers_data": [
+                {"nodal_delivery_center": nodal_center or None, "count": count}
+                for nodal_center, count in sorted(centers.items()) if count
+            ],
+            "recent_addresses": recent_addresses
+        }
+
+    def get(self):
+        """(payload, etag), served from the response cache while it is fresh"""
+        cached = self._cached
+        if cached and time.time() < cached[2]:
+            with self._lock:
+                self._counters['hits'] += 1
+            return cached[0], cached[1]
+
+        payload = self.compute()
+        digest = hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        etag = f'"dashboard-{digest[:16]}"'
+        with self._lock:
+            self._cached = (payload, etag, time.time() + self.ttl)
+            self._counters['misses'] += 1
+        return payload, etag
+
+    def invalidate(self):
+        self._cached = None
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, ttl=self.ttl)
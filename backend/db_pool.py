@@ -0,0 +1,222 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector.errors import PoolError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class PoolTimeoutError(PoolError):
+    """Raised when no connection could be checked out before the timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe MySQL connection pool shared by every DB helper.
+
+    Keeps up to ``pool_size`` idle connections around, allows up to
+    ``max_overflow`` extra connections during bursts (closed again on return)
+    and makes callers wait at most ``timeout`` seconds for a free connection.
+    """
+
+    def __init__(self, db_config, pool_size=10, max_overflow=5, timeout=30.0, pre_ping=True):
+        self.db_config = db_config
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+
+        self._idle = []
+        self._opened = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._timeouts = 0
+        self._reconnects = 0
+
+    def _connect(self):
+        return mysql.connector.connect(**self.db_config)
+
+    def _ping(self, conn):
+        """Make sure a borrowed connection is still alive, reconnecting if needed"""
+        try:
+            conn.ping(reconnect=False)
+            return conn
+        except mysql.connector.Error:
+            with self._cond:
+                self._reconnects += 1
+            try:
+                conn.close()
+            except mysql.connector.Error:
+                pass
+            return self._connect()
+
+    def checkout(self):
+        """Borrow a connection, waiting up to ``timeout`` seconds for one"""
+        started = None
+        deadline = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._opened < self.pool_size + self.max_overflow:
+                    conn = None
+                    self._opened += 1
+                    break
+                if started is None:
+                    started = time.monotonic()
+                    deadline = started + self.timeout
+                    self._waits += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    self._record_wait(started)
+                    raise PoolTimeoutError(
+                        f"Timed out after {self.timeout}s waiting for a database connection"
+                    )
+                self._cond.wait(remaining)
+            self._in_use += 1
+            self._checkouts += 1
+            if started is not None:
+                self._record_wait(started)
+
+        try:
+            if conn is None:
+                conn = self._connect()
+            elif self.pre_ping:
+                conn = self._ping(conn)
+        except Exception:
+            with self._cond:
+                self._opened -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def checkin(self, conn, discard=False):
+        """Return a borrowed connection to the pool"""
+        if not discard:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except mysql.connector.Error:
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            keep = not discard and len(self._idle) < self.pool_size
+            if keep:
+                self._idle.append(conn)
+            else:
+                self._opened -= 1
+            self._cond.notify()
+
+        if not keep:
+            try:
+                conn.close()
+            except mysql.connector.Error:
+                pass
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding a pooled connection"""
+        conn = self.checkout()
+        discard = False
+        try:
+            yield conn
+        except mysql.connector.Error:
+            discard = True
+            raise
+        finally:
+            self.checkin(conn, discard=discard)
+
+    def _record_wait(self, started):
+        waited = time.monotonic() - started
+        self._wait_time += waited
+        self._max_wait_time = max(self._max_wait_time, waited)
+
+    def stats(self):
+        """Snapshot of pool usage for monitoring"""
+        with self._cond:
+            return {
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'opened': self._opened,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'overflow': max(0, self._opened - self.pool_size),
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time_total': round(self._wait_time, 6),
+                'wait_time_max': round(self._max_wait_time, 6),
+                'timeouts': self._timeouts,
+                'reconnects': self._reconnects
+            }
+
+    def close(self):
+        """Close all idle connections"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+        for conn in idle:
+            try:
+                conn.close()
+            except mysql.connector.Error:
+                pass
+
+
+def db_config_from_env():
+    """Connection settings shared by the app and the pincode service"""
+    return {
+        'host': os.getenv("DB_HOST"),
+        'user': os.getenv("DB_USER"),
+        'password': os.getenv("DB_PASSWORD"),
+        'database': os.getenv("DB_NAME"),
+        'port': int(os.getenv("DB_PORT", 3306)),
+        'auth_plugin': 'mysql_native_password',  # Important for MySQL 8+
+        'use_pure': True  # Force pure Python connector
+    }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    db_config_from_env(),
+                    pool_size=int(os.getenv("DB_POOL_SIZE", 10)),
+                    max_overflow=int(os.getenv("DB_POOL_MAX_OVERFLOW", 5)),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", 30)),
+                    pre_ping=os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+                )
+    return _pool
+
+
+def reset_after_fork():
+    """Forget the pool inherited from the parent process.
+
+    Its connections share sockets with the parent, so they are dropped
+    without closing (closing would end the parent's sessions).
+    """
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+def connection():
+    """Shortcut for ``get_pool().connection()``"""
+    return get_pool().connection()
@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from route_optimizer import haversine_matrix
+
+INDEX_FILE = 'distance_matrix.json'
+# Rows computed per step while building; bounds the temporary float64 block
+BUILD_CHUNK_ROWS = 256
+# Rewrite the matrix without removed keys once this share of rows is dead
+COMPACT_DEAD_FRACTION = 0.25
+# Coordinates closer than this (degrees) are considered unchanged
+COORD_TOLERANCE = 1e-6
+
+
+class DistanceMatrix:
+    """Persisted great-circle distance matrix between pincodes and nodal centers.
+
+    The matrix is a float32 ``.npy`` file (km) loaded with ``mmap_mode='r'``,
+    so every process maps the same pages from the OS page cache instead of
+    holding its own copy. ``distance_matrix.json`` lists the key of each row
+    (a pincode or ``center:<name>``) and its coordinates.
+
+    ``update()`` rebuilds incrementally: rows of unchanged keys are copied,
+    only new or moved keys are computed, and removed keys are left as dead
+    rows until they make up COMPACT_DEAD_FRACTION of the file. Each build
+    writes a new matrix file and then atomically replaces the index, so
+    readers never see a half-written matrix. Readers notice a replaced index
+    (from any process) within ``check_interval`` seconds and remap.
+    """
+
+    def __init__(self, directory, check_interval=1.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._checked = 0.0
+        self._state = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.last_build = None
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _index_version(self):
+        try:
+            stat = os.stat(self._path(INDEX_FILE))
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def load(self):
+        """Map the current matrix read-only; returns False when none has been built"""
+        version = self._index_version()
+        try:
+            with open(self._path(INDEX_FILE)) as f:
+                index = json.load(f)
+            matrix = np.load(self._path(index['matrix_file']), mmap_mode='r')
+        except (OSError, ValueError, KeyError):
+            return False
+
+        row_by_key = {key: row for row, key in enumerate(index['keys']) if key is not None}
+        with self._lock:
+            self._state = (matrix, row_by_key, index, version)
+        return True
+
+    def _current(self):
+        state = self._state
+        now = time.monotonic()
+        if state is None or now - self._checked >= self.check_interval:
+            # Another process may have rebuilt the matrix and replaced the index
+            self._checked = now
+            if (state is None or self._index_version() != state[3]) and self.load():
+                state = self._state
+        return state
+
+    @staticmethod
+    def _rows(state, keys):
+        if state is None:
+            return None
+        try:
+            return np.array([state[1][key] for key in keys], dtype=np.int64)
+        except KeyError:
+            return None
+
+    def rows(self, keys):
+        """Matrix rows for keys, or None if any key is not in the matrix"""
+        return self._rows(self._current(), keys)
+
+    def distance(self, a, b):
+        """Distance in km between two keys, or None if either is unknown"""
+        # Rows and matrix must come from the same snapshot; an update may swap it
+        state = self._current()
+        rows = self._rows(state, [a, b])
+        if rows is None:
+            return None
+        return float(state[0][rows[0], rows[1]])
+
+    def submatrix(self, keys):
+        """(n, n) float64 distances between keys, or None if any key is unknown.
+
+        Only the requested cells are read from the mapped file.
+        """
+        state = self._current()
+        rows = self._rows(state, keys)
+        if rows is None:
+            return None
+        return np.asarray(state[0][np.ix_(rows, rows)], dtype=np.float64)
+
+    def update(self, points):
+        """Bring the matrix in line with ``points`` (key -> (lat, lng)); returns build stats"""
+        with self._build_lock:
+            started = time.perf_counter()
+            state = self._current()
+            old_matrix = state[0] if state else None
+            keys = list(state[2]['keys']) if state else []
+            coords = [tuple(c) for c in state[2]['coords']] if state else []
+            position = {key: row for row, key in enumerate(keys) if key is not None}
+
+            added = []
+            changed = []
+            for key, (latitude, longitude) in points.items():
+                row = position.get(key)
+                if row is None:
+                    added.append(key)
+                elif (abs(coords[row][0] - latitude) > COORD_TOLERANCE
+                      or abs(coords[row][1] - longitude) > COORD_TOLERANCE):
+                    coords[row] = (latitude, longitude)
+                    changed.append(row)
+            removed = [key for key in position if key not in points]
+            for key in removed:
+                keys[position[key]] = None
+
+            stats = {'added': len(added), 'changed': len(changed), 'removed': len(removed)}
+            if not (added or changed or removed) and state:
+                stats.update(rows=len(keys), reused_rows=len(keys), build_time=0.0)
+                self.last_build = stats
+                return stats
+
+            dead = sum(1 for key in keys if key is None)
+            reuse = old_matrix is not None and dead / (len(keys) + len(added)) < COMPACT_DEAD_FRACTION
+            if reuse:
+                reused = len(keys)
+            else:
+                live = [row for row, key in enumerate(keys) if key is not None]
+                keys = [keys[row] for row in live]
+                coords = [coords[row] for row in live]
+                changed = []
+                reused = 0
+            keys += added
+            coords += [tuple(points[key]) for key in added]
+
+            n = len(keys)
+            coords_array = np.array(coords, dtype=np.float64).reshape(n, 2)
+            os.makedirs(self.directory, exist_ok=True)
+            matrix_file = f"distance_matrix.{time.time_ns()}.npy"
+            matrix = np.lib.format.open_memmap(self._path(matrix_file), mode='w+',
+                                               dtype=np.float32, shape=(n, n))
+
+            # Copy the reusable block and extend its rows with the new columns
+            for start in range(0, reused, BUILD_CHUNK_ROWS):
+                end = min(reused, start + BUILD_CHUNK_ROWS)
+                matrix[start:end, :reused] = old_matrix[start:end]
+                if n > reused:
+                    matrix[start:end, reused:] = haversine_matrix(coords_array[start:end], coords_array[reused:])
+            for start in range(reused, n, BUILD_CHUNK_ROWS):
+                end = min(n, start + BUILD_CHUNK_ROWS)
+                matrix[start:end] = haversine_matrix(coords_array[start:end], coords_array)
+            # Keys that moved get their row and column recomputed
+            for start in range(0, len(changed), BUILD_CHUNK_ROWS):
+                rows = np.array(changed[start:start + BUILD_CHUNK_ROWS])
+                distances = haversine_matrix(coords_array[rows], coords_array)
+                matrix[rows, :] = distances
+                matrix[:, rows] = distances.T
+            matrix.flush()
+            del matrix
+
+            index = {'matrix_file': matrix_file, 'keys': keys, 'coords': coords_array.tolist()}
+            temp_index = self._path(INDEX_FILE + '.tmp')
+            with open(temp_index, 'w') as f:
+                json.dump(index, f)
+            os.replace(temp_index, self._path(INDEX_FILE))
+
+            previous_file = state[2]['matrix_file'] if state else None
+            self.load()
+            if previous_file and previous_file != matrix_file:
+                # Processes still mapping the old file keep it until they unmap it
+                try:
+                    os.remove(self._path(previous_file))
+                except OSError:
+                    pass
+
+            stats.update(rows=n, reused_rows=reused, build_time=round(time.perf_counter() - started, 3))
+            self.last_build = stats
+            print(f"Distance matrix built: {stats}")
+            return stats
+
+    def stats(self):
+        state = self._state
+        return {
+            'loaded': state is not None,
+            'rows': len(state[2]['keys']) if state else 0,
+            'keys': len(state[1]) if state else 0,
+            'size_mb': round(state[0].nbytes / 2 ** 20, 1) if state else 0,
+            'building': self._build_lock.locked(),
+            'last_build': self.last_build
+        }
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Distance matrix build benchmark")
+    arg_parser.add_argument("directory", help="Where to write the matrix")
+    arg_parser.add_argument("--pincodes", type=int, default=19000, help="Number of random locations")
+    args = arg_parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    points = {str(100000 + i): (float(rng.uniform(8, 35)), float(rng.uniform(68, 97)))
+              for i in range(args.pincodes)}
+    distances = DistanceMatrix(args.directory)
+    distances.update(points)
+
+    # A typical re-import: a few new pincodes, a few moved
+    points.update({str(900000 + i): (20.0 + i / 100, 78.0) for i in range(50)})
+    points.update({str(100000 + i): (21.0, 79.0 + i / 100) for i in range(20)})
+    distances.update(points)
+
+    started = time.perf_counter()
+    reloaded = DistanceMatrix(args.directory)
+    reloaded.load()
+    sample = reloaded.submatrix([str(100000 + i) for i in range(0, 2000, 10)])
+    print(f"Loaded and read a {sample.shape[0]}x{sample.shape[1]} submatrix in "
+          f"{(time.perf_counter() - started) * 1000:.1f} ms")
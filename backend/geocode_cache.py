@@ -0,0 +1,183 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import mysql.connector
+import db_pool
+
+
+def normalize_address_key(address):
+    """Canonical cache key for an address string"""
+    key = address.lower()
+    key = re.sub(r'\s*,\s*', ', ', key)
+    key = re.sub(r'\s+', ' ', key)
+    return key.strip(' ,')
+
+
+class GeocodeCache:
+    """Two-tier geocoding cache: in-process LRU with TTL in front of a MySQL table.
+
+    A cached value of ``None`` is a negative entry (the API returned
+    ZERO_RESULTS) and expires after ``negative_ttl`` instead of ``ttl``.
+    """
+
+    def __init__(self, pool=None, max_entries=10000, ttl=86400, negative_ttl=3600):
+        self._pool = pool
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            'memory_hits': 0,
+            'db_hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'db_errors': 0
+        }
+
+    @property
+    def pool(self):
+        return self._pool or db_pool.get_pool()
+
+    def initialize_table(self):
+        """Create the persistent cache table if it doesn't exist"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS geocode_cache (
+                    key_hash CHAR(64) PRIMARY KEY,
+                    address_key TEXT,
+                    result TEXT,
+                    is_negative BOOLEAN DEFAULT FALSE,
+                    expires_at DOUBLE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    INDEX idx_expires_at (expires_at)
+                )
+            """)
+            conn.commit()
+            cursor.close()
+
+    @staticmethod
+    def _hash(key):
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _remember(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Look up a normalized key.
+
+        Returns ``(True, value)`` on a hit (value may be ``None`` for a
+        negative entry) and ``(False, None)`` on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self._counters['memory_hits'] += 1
+                    if entry[0] is None:
+                        self._counters['negative_hits'] += 1
+                    return True, entry[0]
+                del self._entries[key]
+
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT result, is_negative, expires_at FROM geocode_cache "
+                    "WHERE key_hash = %s AND expires_at > %s",
+                    (self._hash(key), now)
+                )
+                row = cursor.fetchone()
+                cursor.close()
+        except mysql.connector.Error as err:
+            print(f"Geocode cache database error: {err}")
+            self._count('db_errors')
+            row = None
+
+        if row is None:
+            self._count('misses')
+            return False, None
+
+        result, is_negative, expires_at = row
+        value = None if is_negative else json.loads(result)
+        self._remember(key, value, expires_at)
+        self._count('db_hits')
+        if value is None:
+            self._count('negative_hits')
+        return True, value
+
+    def set(self, key, value):
+        """Store a geocoding result, or ``None`` for a negative entry"""
+        expires_at = time.time() + (self.ttl if value is not None else self.negative_ttl)
+        self._remember(key, value, expires_at)
+        self._count('stores')
+
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO geocode_cache (key_hash, address_key, result, is_negative, expires_at)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE result = VALUES(result),
+                        is_negative = VALUES(is_negative), expires_at = VALUES(expires_at)
+                """, (
+                    self._hash(key),
+                    key,
+                    json.dumps(value) if value is not None else None,
+                    value is None,
+                    expires_at
+                ))
+                conn.commit()
+                cursor.close()
+        except mysql.connector.Error as err:
+            print(f"Geocode cache database error: {err}")
+            self._count('db_errors')
+
+    def invalidate(self, address=None):
+        """Drop one address (or the whole cache when address is None).
+
+        Returns the number of persistent entries removed.
+        """
+        key = normalize_address_key(address) if address else None
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            if key is None:
+                cursor.execute("DELETE FROM geocode_cache")
+            else:
+                cursor.execute("DELETE FROM geocode_cache WHERE key_hash = %s", (self._hash(key),))
+            removed = cursor.rowcount
+            conn.commit()
+            cursor.close()
+        return removed
+
+    def stats(self):
+        """Hit/miss counters and memory tier size"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_entries'] = len(self._entries)
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['db_hits']) / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,338 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from geocode_cache import normalize_address_key
+
+GOOGLE_GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+
+# API statuses and HTTP codes worth retrying with backoff
+RETRYABLE_STATUSES = {'OVER_QUERY_LIMIT', 'UNKNOWN_ERROR'}
+RETRYABLE_HTTP_CODES = {429, 500, 502, 503, 504}
+
+
+class RetryableGeocodingError(Exception):
+    """Transient failure (quota, 5xx, network) that may succeed on retry"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class GoogleGeocodeBackend:
+    """Google Geocoding API backend.
+
+    ``base_url`` can point at any server speaking the same JSON format, e.g.
+    the local stub used by ``python geocoding.py --stub``.
+    """
+
+    name = 'google'
+
+    def __init__(self, api_key, base_url=None):
+        self.api_key = api_key
+        self.base_url = base_url or GOOGLE_GEOCODE_URL
+
+    def lookup(self, session, address, timeout):
+        """Geocode one address; returns a result dict or None when not found"""
+        try:
+            response = session.get(self.base_url, params={'address': address, 'key': self.api_key},
+                                   timeout=timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            raise RetryableGeocodingError(str(e))
+
+        if response.status_code in RETRYABLE_HTTP_CODES:
+            raise RetryableGeocodingError(f"HTTP {response.status_code}",
+                                          retry_after=_retry_after(response))
+        response.raise_for_status()
+        data = response.json()
+
+        status = data.get('status')
+        if status == 'OK':
+            location = data['results'][0].get('geometry', {}).get('location', {})
+            result = data['results'][0]['address_components']
+            return {
+                'google_maps_pincode': next((c['long_name'] for c in result if 'postal_code' in c['types']), None),
+                'google_maps_city': next((c['long_name'] for c in result if 'locality' in c['types']), None),
+                'google_maps_state': next((c['long_name'] for c in result if 'administrative_area_level_1' in c['types']), None),
+                'google_maps_street': next((c['long_name'] for c in result if 'route' in c['types']), None),
+                'latitude': location.get('lat'),
+                'longitude': location.get('lng'),
+            }
+        if status == 'ZERO_RESULTS':
+            return None
+        if status in RETRYABLE_STATUSES:
+            raise RetryableGeocodingError(status)
+        raise ValueError(data.get('error_message', status))
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Blocking token-bucket rate limiter: ``rate`` tokens/sec, bursts up to ``capacity``"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class GeocodingClient:
+    """Rate-limited, retrying geocoding client with a cache in front.
+
+    One pooled ``requests.Session`` is shared by all callers. Calls pass the
+    cache, then join an identical in-flight query if there is one, then wait
+    for a rate-limiter token and a concurrency slot before hitting the
+    backend. Quota errors, 5xx responses and network failures are retried
+    with exponential backoff and jitter, honouring ``Retry-After``. No call
+    runs past its ``deadline`` (seconds): the read timeout is cut to the
+    time left and a retry that can't start in time is not attempted.
+    """
+
+    def __init__(self, backend, cache=None, rate=40.0, burst=None, max_concurrency=8,
+                 max_retries=4, backoff_base=0.5, backoff_max=8.0, timeout=(3.05, 5), deadline=8.0):
+        self.backend = backend
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._bucket = TokenBucket(rate, burst)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            'requests': 0,
+            'cache_hits': 0,
+            'deduplicated': 0,
+            'backend_calls': 0,
+            'retries': 0,
+            'failures': 0,
+            'rate_limit_wait_time': 0.0
+        }
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def geocode(self, address, max_retries=None, deadline=None):
+        """Geocode an address string; returns a result dict or None.
+
+        ``max_retries`` and ``deadline`` override the client defaults for this call.
+        """
+        key = normalize_address_key(address)
+        if not key:
+            return None
+        self._count('requests')
+
+        if self.cache is not None:
+            found, cached = self.cache.get(key)
+            if found:
+                self._count('cache_hits')
+                return dict(cached) if cached else None
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+            else:
+                self._counters['deduplicated'] += 1
+
+        if not owner:
+            result = future.result()
+            return dict(result) if result else None
+
+        try:
+            result = self._fetch(address, key,
+                                 self.max_retries if max_retries is None else max_retries,
+                                 self.deadline if deadline is None else deadline)
+            future.set_result(result)
+        except Exception as e:
+            print(f"Geocoding failed: {str(e)}")
+            self._count('failures')
+            result = None
+            future.set_result(None)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        return dict(result) if result else None
+
+    def _fetch(self, address, key, max_retries, deadline):
+        expires = time.monotonic() + deadline
+        attempt = 0
+        while True:
+            self._count('rate_limit_wait_time', self._bucket.acquire())
+            remaining = expires - time.monotonic()
+            if remaining <= 0 or not self._slots.acquire(timeout=remaining):
+                raise TimeoutError(f"Geocoding deadline of {deadline}s exceeded")
+            try:
+                self._count('backend_calls')
+                connect_timeout, read_timeout = self.timeout
+                remaining = max(0.1, expires - time.monotonic())
+                result = self.backend.lookup(self.session, address,
+                                             (min(connect_timeout, remaining), min(read_timeout, remaining)))
+            except RetryableGeocodingError as e:
+                error = e
+            else:
+                error = None
+            finally:
+                self._slots.release()
+
+            if error is not None:
+                if attempt >= max_retries:
+                    raise error
+                if error.retry_after is not None:
+                    # A server-sent Retry-After can be minutes; never hold a request thread that long
+                    delay = min(self.backoff_max, max(0.0, error.retry_after))
+                else:
+                    # Exponential backoff with jitter so retries don't arrive in lockstep
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+                if time.monotonic() + delay >= expires:
+                    # The retry could not finish before the deadline
+                    raise error
+                attempt += 1
+                self._count('retries')
+                time.sleep(delay)
+                continue
+
+            if self.cache is not None:
+                self.cache.set(key, result)
+            return result
+
+    def geocode_many(self, addresses):
+        """Geocode a batch, at most ``max_concurrency`` at a time; results keep input order"""
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            return list(executor.map(self.geocode, addresses))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['in_flight'] = len(self._in_flight)
+        stats['backend'] = self.backend.name
+        stats['rate_limit_wait_time'] = round(stats['rate_limit_wait_time'], 3)
+        return stats
+
+
+def client_from_env(api_key, cache=None):
+    """Build the application's geocoding client from GEOCODING_* settings"""
+    backend = GoogleGeocodeBackend(api_key, base_url=os.getenv("GEOCODING_BASE_URL"))
+    return GeocodingClient(
+        backend,
+        cache=cache,
+        rate=float(os.getenv("GEOCODING_RATE", 40)),
+        burst=int(os.getenv("GEOCODING_BURST", 0)) or None,
+        max_concurrency=int(os.getenv("GEOCODING_MAX_CONCURRENCY", 8)),
+        max_retries=int(os.getenv("GEOCODING_MAX_RETRIES", 4)),
+        timeout=(float(os.getenv("GEOCODING_CONNECT_TIMEOUT", 3.05)),
+                 float(os.getenv("GEOCODING_READ_TIMEOUT", 5))),
+        deadline=float(os.getenv("GEOCODING_DEADLINE", 8))
+    )
+
+
+def start_stub_server(latency=0.05, quota_error_rate=0.0, port=0):
+    """Serve Google-format geocoding responses locally for tests and benchmarks.
+
+    Returns the server; its base URL is ``http://127.0.0.1:<server_port>/``.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            address = parse_qs(urlparse(self.path).query).get('address', [''])[0]
+            time.sleep(latency)
+            if random.random() < quota_error_rate:
+                body = {'status': 'OVER_QUERY_LIMIT', 'results': []}
+            else:
+                parts = [part.strip() for part in address.split(',')]
+                body = {'status': 'OK', 'results': [{'address_components': [
+                    {'long_name': parts[0], 'types': ['route']},
+                    {'long_name': parts[1] if len(parts) > 1 else '', 'types': ['locality']},
+                    {'long_name': parts[2] if len(parts) > 2 else '', 'types': ['administrative_area_level_1']},
+                    {'long_name': parts[-1], 'types': ['postal_code']},
+                ]}]}
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Geocoding client throughput benchmark")
+    arg_parser.add_argument("--count", type=int, default=500, help="Number of distinct addresses")
+    arg_parser.add_argument("--rate", type=float, default=200, help="Requests per second")
+    arg_parser.add_argument("--concurrency", type=int, default=16, help="Concurrent backend calls")
+    arg_parser.add_argument("--stub", action="store_true", help="Benchmark against a local stub server")
+    arg_parser.add_argument("--latency", type=float, default=0.05, help="Stub response latency (seconds)")
+    arg_parser.add_argument("--quota-error-rate", type=float, default=0.05,
+                            help="Fraction of stub responses that are OVER_QUERY_LIMIT")
+    args = arg_parser.parse_args()
+
+    base_url = os.getenv("GEOCODING_BASE_URL")
+    if args.stub:
+        stub = start_stub_server(args.latency, args.quota_error_rate)
+        base_url = f"http://127.0.0.1:{stub.server_port}/"
+
+    client = GeocodingClient(
+        GoogleGeocodeBackend(os.getenv("GOOGLE_MAPS_API_KEY", "stub"), base_url=base_url),
+        rate=args.rate,
+        max_concurrency=args.concurrency,
+        backoff_base=0.05
+    )
+    # Every address twice in a row, so the second copy joins the first one in flight
+    addresses = [f"{i} MG Road, Pune, Maharashtra, {411000 + i % 100}"
+                 for i in range(args.count) for _ in range(2)]
+
+    started = time.perf_counter()
+    results = client.geocode_many(addresses)
+    elapsed = time.perf_counter() - started
+
+    print(f"Geocoded {len(addresses):,} addresses in {elapsed:.2f}s ({len(addresses) / elapsed:,.0f}/sec)")
+    print(f"Resolved: {sum(1 for r in results if r)}/{len(addresses)}")
+    print(json.dumps(client.stats(), indent=2))
@@ -0,0 +1,50 @@
+"""Gunicorn settings: gunicorn -c gunicorn.conf.py app:app
+
+The master initializes the database and in-memory indexes once before
+forking, and refuses to start if that fails; each worker then opens its own
+database connections. With OCR_PRELOAD=1 the master also loads the OCR
+model once on the CPU before forking, so every worker shares the model
+weights copy-on-write instead of loading its own copy. OCR_WARMUP=1 makes
+each worker run a warm-up recognition in the background right after it is
+forked.
+"""
+import gc
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", 2))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+
+# Import the app in the master so workers inherit it (and the model) on fork
+preload_app = True
+
+OCR_PRELOAD = os.getenv("OCR_PRELOAD", "false").lower() in ("1", "true", "yes")
+OCR_WARMUP = os.getenv("OCR_WARMUP", "false").lower() in ("1", "true", "yes")
+
+
+def on_starting(server):
+    import app
+    if not app.initialize_services(wait=True):
+        server.log.error("Service initialization failed, not starting workers")
+        raise SystemExit(1)
+
+
+def when_ready(server):
+    if OCR_PRELOAD:
+        import ocr
+        ocr.preload()
+        server.log.info(f"OCR model preloaded: {ocr.startup_metrics()}")
+    # Keep the collector from touching (and so copying) the inherited objects
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import db_pool
+    import ocr
+    # Connections opened by the master during initialization stay with it
+    db_pool.reset_after_fork()
+    ocr.after_fork()
+    if OCR_WARMUP:
+        # Safe alongside the OCR pool: its workers are spawned, not forked from this one
+        ocr.warm_up(background=True)
@@ -0,0 +1,290 @@
+import argparse
+import csv
+import difflib
+import os
+import re
+import time
+
+import cv2
+import numpy as np
+
+# Each profile lists its settings; stages with a falsy setting are skipped.
+#   max_side            first, cheap bound on the longest side (pixels)
+#   crop_roi            crop to the largest block of text
+#   deskew              straighten text rotated by up to max_skew degrees
+#   target_text_height  scale so the median character is this tall (never upscales)
+#   threshold           'adaptive', 'otsu' or None (EasyOCR copes with grayscale)
+PROFILES = {
+    # What extract_address_from_image did before profiles existed
+    'legacy': {'max_side': None, 'legacy_resize': (800, 600), 'crop_roi': False, 'deskew': False,
+               'target_text_height': None, 'threshold': 'otsu'},
+    'fast': {'max_side': 1280, 'crop_roi': True, 'deskew': False,
+             'target_text_height': 24, 'threshold': None},
+    'balanced': {'max_side': 1600, 'crop_roi': True, 'deskew': True,
+                 'target_text_height': 32, 'threshold': None},
+    'accurate': {'max_side': 2400, 'crop_roi': True, 'deskew': True,
+                 'target_text_height': 40, 'threshold': 'adaptive'},
+}
+
+MAX_SKEW_DEGREES = 15
+MIN_SKEW_DEGREES = 1.0
+MAX_SKEW_POINTS = 20000
+ADAPTIVE_BLOCK_SIZE = 31
+ADAPTIVE_C = 15
+
+
+def _scale(image, factor):
+    if factor >= 1:
+        return image
+    height, width = image.shape[:2]
+    size = (max(1, round(width * factor)), max(1, round(height * factor)))
+    # INTER_AREA averages source pixels, which keeps thin strokes when shrinking
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def _text_mask(gray):
+    """Binary mask with text pixels set (dark text on a light background assumed)"""
+    return cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)[1]
+
+
+def _character_boxes(gray):
+    """Bounding boxes (x, y, w, h) of connected components shaped like characters"""
+    count, _, stats, _ = cv2.connectedComponentsWithStats(_text_mask(gray), connectivity=8)
+    height, width = gray.shape
+    boxes = stats[1:count, :4]
+    areas = stats[1:count, 4]
+    keep = ((boxes[:, 3] >= 4) & (boxes[:, 3] < height * 0.3) & (boxes[:, 2] < width * 0.3)
+            & (areas >= 8) & (boxes[:, 2] < boxes[:, 3] * 4))
+    return boxes[keep]
+
+
+def downscale(gray, max_side):
+    """Aspect-preserving bound on the longest side"""
+    return _scale(gray, max_side / max(gray.shape[:2]))
+
+
+def crop_roi(gray, boxes=None, pad_fraction=0.04):
+    """Crop to the largest block of text; the whole image if none stands out.
+
+    Returns (image, boxes) with the character boxes shifted into the crop.
+    """
+    height, width = gray.shape
+    if boxes is None:
+        boxes = _character_boxes(gray)
+    if len(boxes) < 3:
+        return gray, boxes
+
+    text_height = max(2, int(np.median(boxes[:, 3])))
+    # Find blocks on a mask where characters are ~4 px tall; the closing is much cheaper there
+    factor = min(1.0, 4.0 / text_height)
+    small = np.zeros((max(1, int(height * factor) + 1), max(1, int(width * factor) + 1)), np.uint8)
+    for x, y, w, h in (boxes * factor).astype(np.int64):
+        small[y:y + max(1, h), x:x + max(1, w)] = 255
+    # Close gaps between letters, words and lines so each text block is one blob
+    gap = max(1, round(text_height * factor))
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (gap * 3, gap * 2))
+    blocks = cv2.morphologyEx(small, cv2.MORPH_CLOSE, kernel)
+    contours, _ = cv2.findContours(blocks, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return gray, boxes
+
+    x, y, w, h = (int(v / factor) for v in cv2.boundingRect(max(contours, key=cv2.contourArea)))
+    if w * h < 0.02 * width * height:
+        return gray, boxes
+    pad = int(pad_fraction * max(width, height)) + text_height
+    x0, y0 = max(0, x - pad), max(0, y - pad)
+    x1, y1 = min(width, x + w + pad), min(height, y + h + pad)
+
+    inside = ((boxes[:, 0] >= x0) & (boxes[:, 1] >= y0)
+              & (boxes[:, 0] + boxes[:, 2] <= x1) & (boxes[:, 1] + boxes[:, 3] <= y1))
+    return gray[y0:y1, x0:x1], boxes[inside] - np.array([x0, y0, 0, 0], dtype=boxes.dtype)
+
+
+def _text_points(gray, boxes):
+    """(x, y) of text pixels inside character boxes, subsampled to MAX_SKEW_POINTS"""
+    inside = np.zeros(gray.shape, bool)
+    for x, y, w, h in boxes:
+        inside[y:y + h, x:x + w] = True
+    ys, xs = np.nonzero(inside & (_text_mask(gray) > 0))
+    step = max(1, len(xs) // MAX_SKEW_POINTS)
+    return xs[::step].astype(np.float64), ys[::step].astype(np.float64)
+
+
+def _line_score(xs, ys, angle):
+    """How sharply text pixels fall into 1 px rows after rotating by angle"""
+    theta = np.radians(angle)
+    # y after the same rotation cv2.getRotationMatrix2D(angle) applies
+    y = xs * -np.sin(theta) + ys * np.cos(theta)
+    counts = np.bincount((y - y.min()).astype(np.int64))
+    return float(np.sum(counts.astype(np.float64) ** 2))
+
+
+def skew_angle(gray, max_skew=MAX_SKEW_DEGREES, boxes=None):
+    """Rotation in degrees that makes the text lines horizontal.
+
+    Searches the angle whose horizontal projection of the text pixels (only
+    those inside character boxes, so borders and smudges don't count) is
+    sharpest, coarse (1 degree) then fine (0.1 degree).
+    """
+    if boxes is None:
+        boxes = _character_boxes(gray)
+    if len(boxes) < 5:
+        return 0.0
+    xs, ys = _text_points(gray, boxes)
+
+    best = max(np.arange(-max_skew, max_skew + 1, 1.0), key=lambda a: _line_score(xs, ys, a))
+    best = max(np.arange(best - 1, best + 1.01, 0.1), key=lambda a: _line_score(xs, ys, a))
+    return round(float(best), 1) + 0.0  # no -0.0
+
+
+def deskew(gray, boxes=None, max_skew=MAX_SKEW_DEGREES):
+    """Rotate the text back to horizontal when it is measurably skewed.
+
+    Returns (image, boxes); boxes is None once the image has been rotated.
+    """
+    angle = skew_angle(gray, max_skew, boxes)
+    if abs(angle) < MIN_SKEW_DEGREES:
+        return gray, boxes
+    height, width = gray.shape
+    rotation = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(gray, rotation, (width, height), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_REPLICATE), None
+
+
+def scale_to_text_height(gray, target_text_height, boxes=None):
+    """Shrink so the median character height is target_text_height"""
+    if boxes is None:
+        boxes = _character_boxes(gray)
+    if len(boxes) < 3:
+        return gray
+    return _scale(gray, target_text_height / float(np.median(boxes[:, 3])))
+
+
+def threshold(gray, method):
+    if method == 'adaptive':
+        return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                                     ADAPTIVE_BLOCK_SIZE, ADAPTIVE_C)
+    if method == 'otsu':
+        return cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
+    return gray
+
+
+def preprocess(img, profile='legacy'):
+    """Run a profile's stages on a BGR or grayscale image.
+
+    Returns (image, timings) where timings maps each stage that ran to its
+    duration in milliseconds.
+    """
+    settings = PROFILES[profile] if isinstance(profile, str) else profile
+    timings = {}
+
+    def timed(name, stage, *args):
+        started = time.perf_counter()
+        result = stage(*args)
+        timings[name] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    if settings.get('legacy_resize'):
+        max_width, max_height = settings['legacy_resize']
+        img = timed('resize', lambda i: cv2.resize(i, (min(max_width, i.shape[1]), min(max_height, i.shape[0]))), img)
+    gray = timed('grayscale', lambda i: i if i.ndim == 2 else cv2.cvtColor(i, cv2.COLOR_BGR2GRAY), img)
+    if settings.get('max_side'):
+        gray = timed('downscale', downscale, gray, settings['max_side'])
+    # Character boxes are measured once and reused until a stage invalidates them
+    boxes = None
+    if settings.get('crop_roi'):
+        gray, boxes = timed('crop_roi', crop_roi, gray)
+    if settings.get('deskew'):
+        gray, boxes = timed('deskew', deskew, gray, boxes)
+    if settings.get('target_text_height'):
+        gray = timed('text_height', scale_to_text_height, gray, settings['target_text_height'], boxes)
+    if settings.get('threshold'):
+        gray = timed('threshold', threshold, gray, settings['threshold'])
+    return gray, timings
+
+
+def _normalize(text):
+    return re.sub(r'\s+', ' ', text or '').strip().lower()
+
+
+def _load_labels(directory):
+    """Labelled images: labels.csv (filename,text) or a .txt file next to each image"""
+    labels = {}
+    labels_file = os.path.join(directory, 'labels.csv')
+    if os.path.exists(labels_file):
+        with open(labels_file, newline='') as f:
+            for row in csv.reader(f):
+                if len(row) >= 2 and row[0] != 'filename':
+                    labels[row[0]] = row[1]
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() in ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff') and name not in labels:
+            text_file = os.path.join(directory, stem + '.txt')
+            if os.path.exists(text_file):
+                with open(text_file) as f:
+                    labels[name] = f.read()
+    return labels
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="OCR preprocessing accuracy/latency benchmark")
+    arg_parser.add_argument("directory", help="Images with labels.csv (filename,text) or sidecar .txt files")
+    arg_parser.add_argument("--profiles", default=','.join(PROFILES), help="Comma-separated profiles to compare")
+    arg_parser.add_argument("--tolerance", type=float, default=0.01,
+                            help="Accuracy a profile may lose against the best and still be picked")
+    arg_parser.add_argument("--no-ocr", action="store_true", help="Only time the preprocessing stages")
+    args = arg_parser.parse_args()
+
+    labels = _load_labels(args.directory)
+    if not labels:
+        raise SystemExit(f"No labelled images found in {args.directory}")
+    images = {name: cv2.imread(os.path.join(args.directory, name)) for name in labels}
+
+    reader = None
+    if not args.no_ocr:
+        import ocr
+        reader = ocr.get_reader()
+
+    results = []
+    for profile in args.profiles.split(','):
+        stage_totals = {}
+        pixels = preprocess_ms = ocr_ms = similarity = pincode_hits = 0.0
+        for name, expected in labels.items():
+            started = time.perf_counter()
+            processed, timings = preprocess(images[name], profile)
+            preprocess_ms += (time.perf_counter() - started) * 1000
+            for stage, ms in timings.items():
+                stage_totals[stage] = stage_totals.get(stage, 0.0) + ms
+            pixels += processed.size
+
+            if reader is not None:
+                started = time.perf_counter()
+                text = ' '.join(reader.readtext(processed, detail=0))
+                ocr_ms += (time.perf_counter() - started) * 1000
+                similarity += difflib.SequenceMatcher(None, _normalize(text), _normalize(expected)).ratio()
+                expected_pincode = re.search(r'\b\d{6}\b', expected)
+                pincode_hits += bool(expected_pincode and expected_pincode.group() in text)
+
+        n = len(labels)
+        results.append({
+            'profile': profile,
+            'megapixels': pixels / n / 1e6,
+            'preprocess_ms': preprocess_ms / n,
+            'ocr_ms': ocr_ms / n,
+            'similarity': similarity / n,
+            'pincode_accuracy': pincode_hits / n,
+            'stages': {stage: round(total / n, 2) for stage, total in stage_totals.items()}
+        })
+
+    print(f"{len(labels)} images")
+    print(f"{'profile':<10} {'MPix':>6} {'prep ms':>8} {'ocr ms':>8} {'total ms':>9} {'similarity':>10} {'pincode':>8}")
+    for r in results:
+        print(f"{r['profile']:<10} {r['megapixels']:>6.2f} {r['preprocess_ms']:>8.1f} {r['ocr_ms']:>8.1f} "
+              f"{r['preprocess_ms'] + r['ocr_ms']:>9.1f} {r['similarity']:>10.3f} {r['pincode_accuracy']:>8.3f}")
+        print(f"{'':<10} stages (ms): {r['stages']}")
+
+    if reader is not None:
+        best = max(r['similarity'] for r in results)
+        eligible = [r for r in results if r['similarity'] >= best - args.tolerance]
+        fastest = min(eligible, key=lambda r: r['preprocess_ms'] + r['ocr_ms'])
+        print(f"Fastest profile within {args.tolerance:.3f} of the best accuracy: {fastest['profile']}")
@@ -1,4 +1,8 @@
 import os
+import argparse
+import tempfile
+import time
+import numpy as np
 import pandas as pd
 import mysql.connector
 from mysql.connector import Error
@@ -8,13 +12,42 @@ from datetime import datetime
 # Load environment variables
 load_dotenv()
 
-def create_db_connection():
+CSV_DTYPES = {
+    'CircleName': 'str',
+    'RegionName': 'str',
+    'DivisionName': 'str',
+    'OfficeName': 'str',
+    'Pincode': 'str',
+    'OfficeType': 'str',
+    'Delivery': 'str',
+    'District': 'str',
+    'StateName': 'str',
+    'Latitude': 'object',
+    'Longitude': 'object'
+}
+
+# Database column -> maximum length
+TEXT_COLUMNS = {
+    'circle_name': 100,
+    'region_name': 100,
+    'division_name': 100,
+    'office_name': 100,
+    'pincode': 10,
+    'office_type': 10,
+    'delivery_type': 20,
+    'district': 100,
+    'state_name': 100
+}
+DB_COLUMNS = list(TEXT_COLUMNS) + ['latitude', 'longitude']
+
+def create_db_connection(allow_local_infile=False):
     try:
         conn = mysql.connector.connect(
             host=os.getenv("DB_HOST", "localhost"),
             user=os.getenv("DB_USER", "root"),
             password=os.getenv("DB_PASSWORD", ""),
-            database=os.getenv("DB_NAME", "parcelpro")
+            database=os.getenv("DB_NAME", "parcelpro"),
+            allow_local_infile=allow_local_infile
         )
         return conn
     except Error as e:
@@ -22,14 +55,14 @@ def create_db_connection():
         return None
 
 def validate_coordinate(coord, coord_type):
-    """Validate and normalize coordinates"""
+    """Validate and normalize a single coordinate (see normalize_coordinates)"""
     try:
         # Handle string representations of numbers
         if isinstance(coord, str):
             if coord.strip() in ['', 'NA', 'N/A']:
                 return None
             coord = float(coord)
-            
+
         # Check for clearly invalid values (like 4-digit numbers)
         if abs(coord) > 1000:
             # Check if it might be a decimal in wrong format (e.g., 123456 => 123.456)
@@ -39,167 +72,240 @@ def validate_coordinate(coord, coord_type):
                 coord = coord / 1000
             else:
                 return None
-                
+
         # Validate ranges
         if coord_type == 'lat' and not (-90 <= coord <= 90):
             return None
         if coord_type == 'lon' and not (-180 <= coord <= 180):
             return None
-            
+
         return round(coord, 8)
     except (ValueError, TypeError):
         return None
 
-def import_pincodes(csv_file):
+def normalize_coordinates(series, coord_type):
+    """Vectorized validate_coordinate over a whole column (NaN for invalid values)"""
+    values = pd.to_numeric(series.astype('string').str.strip(), errors='coerce').to_numpy(dtype='float64')
+    magnitude = np.abs(values)
+
+    # Decimal point lost in the source data (e.g. 1850 => 18.50, 73856 => 73.856)
+    values = np.where((magnitude > 1000) & (magnitude <= 9999), values / 100, values)
+    values = np.where((magnitude > 10000) & (magnitude <= 99999), values / 1000, values)
+    values = np.where((magnitude > 9999) & (magnitude <= 10000), np.nan, values)
+    values = np.where(magnitude > 99999, np.nan, values)
+
+    limit = 90 if coord_type == 'lat' else 180
+    values = np.where(np.abs(values) <= limit, values, np.nan)
+    return pd.Series(np.round(values, 8), index=series.index)
+
+def clean_chunk(df):
+    """Rename, normalize and coerce one chunk of the CSV; returns (clean_df, invalid_count)"""
+    df.columns = DB_COLUMNS
+
+    df['latitude'] = normalize_coordinates(df['latitude'], 'lat')
+    df['longitude'] = normalize_coordinates(df['longitude'], 'lon')
+
+    valid = df['latitude'].notna() & df['longitude'].notna()
+    invalid_count = int((~valid).sum())
+    df = df.loc[valid].copy()
+
+    for column, length in TEXT_COLUMNS.items():
+        df[column] = df[column].astype('string').str.strip().str.slice(0, length)
+    return df, invalid_count
+
+def chunk_records(df):
+    """Insert tuples for a cleaned chunk, with None for missing values"""
+    values = df[DB_COLUMNS].astype(object)
+    values = values.where(values.notna(), None)
+    return list(values.itertuples(index=False, name=None))
+
+def load_chunk_infile(cursor, df):
+    """Bulk load a cleaned chunk with LOAD DATA LOCAL INFILE"""
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as handle:
+        df[DB_COLUMNS].to_csv(handle, index=False, header=False, na_rep='\\N')
+        path = handle.name
+    try:
+        cursor.execute(f"""
+            LOAD DATA LOCAL INFILE '{path}'
+            INTO TABLE pincodes
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+            LINES TERMINATED BY '\\n'
+            ({', '.join(DB_COLUMNS)})
+        """)
+    finally:
+        os.remove(path)
+
+class StageTimer:
+    """Accumulates wall time and row counts per import stage"""
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, stage, seconds, rows):
+        total_seconds, total_rows = self.stages.get(stage, (0.0, 0))
+        self.stages[stage] = (total_seconds + seconds, total_rows + rows)
+
+    def report(self):
+        print("\n📈 Benchmark (rows/sec per stage):")
+        for stage, (seconds, rows) in self.stages.items():
+            rate = rows / seconds if seconds > 0 else float('inf')
+            print(f"  {stage:<10} {rows:>10,} rows  {seconds:8.2f}s  {rate:>12,.0f} rows/sec")
+
+def import_pincodes(csv_file, chunk_size=50000, batch_size=5000, use_infile=False,
+                    benchmark=False, dry_run=False):
     start_time = datetime.now()
     print(f"Import started at: {start_time}")
-    
-    print("\nLoading and validating CSV file...")
+    timer = StageTimer()
+
+    conn = None
+    cursor = None
+    if not dry_run:
+        # Connect to database
+        print("\nConnecting to MySQL database...")
+        conn = create_db_connection(allow_local_infile=use_infile)
+        if not conn:
+            return
+        cursor = conn.cursor()
+
+    insert_query = f"""
+    INSERT INTO pincodes ({', '.join(DB_COLUMNS)})
+    VALUES ({', '.join(['%s'] * len(DB_COLUMNS))})
+    """
+
+    total_records = 0
+    invalid_coords = 0
+    inserted_rows = 0
+
     try:
-        # Load CSV with proper handling
-        df = pd.read_csv(
+        if cursor:
+            # Create table with extended precision
+            cursor.execute("""
+            CREATE TABLE IF NOT EXISTS pincodes (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                circle_name VARCHAR(100),
+                region_name VARCHAR(100),
+                division_name VARCHAR(100),
+                office_name VARCHAR(100),
+                pincode VARCHAR(10),
+                office_type VARCHAR(10),
+                delivery_type VARCHAR(20),
+                district VARCHAR(100),
+                state_name VARCHAR(100),
+                latitude DECIMAL(12, 8),  -- Increased precision
+                longitude DECIMAL(13, 8),  -- Increased precision
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_pincode (pincode),
+                INDEX idx_location (latitude, longitude)
+            )
+            """)
+
+        print("\nLoading, validating and importing CSV in chunks...")
+        reader = pd.read_csv(
             csv_file,
-            dtype={
-                'CircleName': 'str',
-                'RegionName': 'str',
-                'DivisionName': 'str',
-                'OfficeName': 'str',
-                'Pincode': 'str',
-                'OfficeType': 'str',
-                'Delivery': 'str',
-                'District': 'str',
-                'StateName': 'str',
-                'Latitude': 'object',
-                'Longitude': 'object'
-            },
+            dtype=CSV_DTYPES,
             na_values=['NA', 'N/A', ''],
-            keep_default_na=False
+            keep_default_na=False,
+            chunksize=chunk_size
         )
-        
-        # Rename columns to match database
-        df.columns = [
-            'circle_name', 'region_name', 'division_name', 'office_name',
-            'pincode', 'office_type', 'delivery_type', 'district',
-            'state_name', 'latitude', 'longitude'
-        ]
-        
-        # Clean and validate coordinates
-        df['latitude'] = df['latitude'].apply(lambda x: validate_coordinate(x, 'lat'))
-        df['longitude'] = df['longitude'].apply(lambda x: validate_coordinate(x, 'lon'))
-        
-        # Count invalid coordinates
-        invalid_coords = df[(df['latitude'].isna()) | (df['longitude'].isna())].shape[0]
-        print(f"✅ Loaded {len(df)} records ({invalid_coords} with invalid coordinates)")
-        
-        # Remove records with invalid coordinates
-        df = df.dropna(subset=['latitude', 'longitude'])
-        print(f"📊 Proceeding with {len(df)} valid records")
-        
-        # Show sample of cleaned data
-        print("\nSample of cleaned data:")
-        print(df.head(3).to_string(index=False))
-        
-    except Exception as e:
-        print(f"❌ Error loading CSV: {e}")
-        return
 
-    # Connect to database
-    print("\nConnecting to MySQL database...")
-    conn = create_db_connection()
-    if not conn:
-        return
+        chunk_index = 0
+        while True:
+            stage_start = time.perf_counter()
+            try:
+                chunk = next(reader)
+            except StopIteration:
+                break
+            timer.add('read', time.perf_counter() - stage_start, len(chunk))
 
-    cursor = conn.cursor()
+            stage_start = time.perf_counter()
+            rows_in_chunk = len(chunk)
+            chunk, invalid = clean_chunk(chunk)
+            timer.add('clean', time.perf_counter() - stage_start, rows_in_chunk)
+            total_records += len(chunk)
+            invalid_coords += invalid
 
-    try:
-        # Create table with extended precision
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS pincodes (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            circle_name VARCHAR(100),
-            region_name VARCHAR(100),
-            division_name VARCHAR(100),
-            office_name VARCHAR(100),
-            pincode VARCHAR(10),
-            office_type VARCHAR(10),
-            delivery_type VARCHAR(20),
-            district VARCHAR(100),
-            state_name VARCHAR(100),
-            latitude DECIMAL(12, 8),  -- Increased precision
-            longitude DECIMAL(13, 8),  -- Increased precision
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            INDEX idx_pincode (pincode),
-            INDEX idx_location (latitude, longitude)
-        )
-        """)
+            if chunk_index == 0:
+                # Show sample of cleaned data
+                print("\nSample of cleaned data:")
+                print(chunk.head(3).to_string(index=False))
+            chunk_index += 1
 
-        # Prepare insert query
-        insert_query = """
-        INSERT INTO pincodes (
-            circle_name, region_name, division_name, office_name,
-            pincode, office_type, delivery_type, district,
-            state_name, latitude, longitude
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-
-        # Batch processing
-        batch_size = 1000
-        total_records = len(df)
-        inserted_rows = 0
-        
-        print(f"\nStarting import of {total_records:,} valid records...")
-
-        for i in range(0, total_records, batch_size):
-            batch = df.iloc[i:i + batch_size]
-            
-            # Convert to list of tuples with proper data types
-            records = []
-            for _, row in batch.iterrows():
-                records.append((
-                    str(row['circle_name'])[:100],
-                    str(row['region_name'])[:100],
-                    str(row['division_name'])[:100],
-                    str(row['office_name'])[:100],
-                    str(row['pincode'])[:10],
-                    str(row['office_type'])[:10],
-                    str(row['delivery_type'])[:20],
-                    str(row['district'])[:100],
-                    str(row['state_name'])[:100],
-                    float(row['latitude']),
-                    float(row['longitude'])
-                ))
-            
-            try:
-                cursor.executemany(insert_query, records)
-                conn.commit()
-                inserted_rows += len(records)
-                print(f"Processed {min(i + batch_size, total_records):,}/{total_records:,} records", end='\r')
-            except Error as e:
-                print(f"\n⚠️ Batch failed at row {i}: {e}")
-                # Save failed batch for inspection
-                batch.to_csv(f"failed_batch_{i}.csv", index=False)
-                conn.rollback()
+            if use_infile:
+                batches = [chunk]
+            else:
+                stage_start = time.perf_counter()
+                records = chunk_records(chunk)
+                timer.add('convert', time.perf_counter() - stage_start, len(records))
+                batches = [records[i:i + batch_size] for i in range(0, len(records), batch_size)]
+
+            if dry_run:
                 continue
 
+            stage_start = time.perf_counter()
+            loaded = 0
+            for batch in batches:
+                try:
+                    if use_infile:
+                        load_chunk_infile(cursor, batch)
+                    else:
+                        cursor.executemany(insert_query, batch)
+                    conn.commit()
+                    loaded += len(batch)
+                except Error as e:
+                    print(f"\n⚠️ Batch failed near row {total_records - len(chunk) + loaded}: {e}")
+                    # Save failed batch for inspection
+                    failed = batch if use_infile else pd.DataFrame(batch, columns=DB_COLUMNS)
+                    failed.to_csv(f"failed_batch_{total_records - len(chunk) + loaded}.csv", index=False)
+                    conn.rollback()
+            inserted_rows += loaded
+            timer.add('insert', time.perf_counter() - stage_start, loaded)
+            print(f"Processed {total_records:,} valid records", end='\r')
+
         # Final report
         duration = datetime.now() - start_time
-        print(f"\n\n✅ Successfully imported {inserted_rows:,} out of {total_records:,} valid records")
+        if dry_run:
+            print(f"\n\n✅ Dry run: validated {total_records:,} records (nothing written)")
+        else:
+            print(f"\n\n✅ Successfully imported {inserted_rows:,} out of {total_records:,} valid records")
         print(f"⏱️  Total time: {duration.total_seconds():.2f} seconds")
         if inserted_rows > 0:
             print(f"🚀 Speed: {inserted_rows/duration.total_seconds():.1f} records/second")
-        
+
         # Show summary of invalid records
         if invalid_coords > 0:
             print(f"\n⚠️ Note: {invalid_coords:,} records were skipped due to invalid coordinates")
             print("Check the original CSV for rows with these issues:")
 
+        if benchmark:
+            timer.report()
+
     except Error as e:
         print(f"\n❌ Database error: {e}")
         conn.rollback()
+    except Exception as e:
+        print(f"❌ Error loading CSV: {e}")
     finally:
-        cursor.close()
-        conn.close()
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
 
 if __name__ == "__main__":
-    csv_file = "pincode.csv"  # Update path if needed
-    import_pincodes(csv_file)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Import the India Post pincode directory into MySQL")
+    parser.add_argument("csv_file", nargs="?", default="pincode.csv", help="Path to the pincode CSV")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Rows read and cleaned per chunk")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per multi-row INSERT")
+    parser.add_argument("--load-data", action="store_true",
+                        help="Bulk load with LOAD DATA LOCAL INFILE (server must allow local_infile)")
+    parser.add_argument("--benchmark", action="store_true", help="Report rows/sec for each stage")
+    parser.add_argument("--dry-run", action="store_true", help="Read and clean only, skip the database")
+    args = parser.parse_args()
+
+    import_pincodes(
+        args.csv_file,
+        chunk_size=args.chunk_size,
+        batch_size=args.batch_size,
+        use_infile=args.load_data,
+        benchmark=args.benchmark,
+        dry_run=args.dry_run
+    )
@@ -0,0 +1,224 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds the maximum number of pending jobs"""
+
+
+class JobQueue:
+    """Local job queue backed by an SQLite table and a pool of worker threads.
+
+    ``handler`` is called with the job payload and must return a
+    ``(result, status_code)`` tuple, the same shape the synchronous endpoints
+    produce. The table lives in a file so every app process on the host shares
+    the same queue and job ids.
+    """
+
+    def __init__(self, db_path, handler, workers=2, max_depth=100,
+                 poll_interval=1.0, retention=86400, stale_after=600):
+        self.db_path = db_path
+        self.handler = handler
+        self.workers = workers
+        self.max_depth = max_depth
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.stale_after = stale_after
+
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._last_purge = 0.0
+
+        self._init_table()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_table(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload TEXT,
+                    result TEXT,
+                    status_code INTEGER,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+            # Jobs left running by a crashed process go back to the queue
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running' AND started_at < ?",
+                (time.time() - self.stale_after,)
+            )
+        finally:
+            conn.close()
+
+    def start(self):
+        """Start the worker threads (idempotent)"""
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping = False
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        """Ask the worker threads to exit once their current job is done"""
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join()
+
+    def depth(self):
+        """Number of jobs waiting or in progress"""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def submit(self, payload):
+        """Queue a job and return its id, or raise QueueFullError"""
+        self.start()
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            depth = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+            if depth >= self.max_depth:
+                conn.execute("ROLLBACK")
+                raise QueueFullError(f"Job queue is full ({depth} pending jobs)")
+            conn.execute(
+                "INSERT INTO jobs (id, status, payload, created_at) VALUES (?, 'queued', ?, ?)",
+                (job_id, json.dumps(payload), time.time())
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        """Return the job status and result, or None for an unknown id"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT id, status, result, status_code, error, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+
+        if row is None:
+            return None
+        return {
+            'job_id': row['id'],
+            'status': row['status'],
+            'result': json.loads(row['result']) if row['result'] else None,
+            'status_code': row['status_code'],
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at']
+        }
+
+    def _claim(self):
+        """Atomically move the oldest queued job to running"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, payload FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                (time.time(), row['id'])
+            )
+            conn.execute("COMMIT")
+            return row['id'], json.loads(row['payload'])
+        finally:
+            conn.close()
+
+    def _finish(self, job_id, status, result=None, status_code=None, error=None):
+        conn = self._connect()
+        try:
+            # Drop the payload once processed, images are large
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, status_code = ?, error = ?, "
+                "payload = NULL, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None,
+                 status_code, error, time.time(), job_id)
+            )
+        finally:
+            conn.close()
+
+    def _purge(self):
+        """Delete finished jobs older than the retention period"""
+        now = time.time()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        conn = self._connect()
+        try:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (now - self.retention,)
+            )
+        finally:
+            conn.close()
+
+    def _work(self):
+        while not self._stopping:
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                print(f"Job queue error: {e}")
+                job = None
+
+            if job is None:
+                with self._wakeup:
+                    if not self._stopping:
+                        self._wakeup.wait(self.poll_interval)
+                continue
+
+            job_id, payload = job
+            try:
+                result, status_code = self.handler(payload)
+                self._finish(job_id, 'done', result, status_code)
+            except Exception as e:
+                print(f"Job {job_id} failed: {str(e)}")
+                self._finish(job_id, 'failed', status_code=500, error=str(e))
+
+            try:
+                self._purge()
+            except sqlite3.Error as e:
+                print(f"Job queue purge error: {e}")
@@ -0,0 +1,182 @@
+import threading
+
+import mysql.connector
+import db_pool
+from address_parser import OFFICE_SUFFIX_RE, display_name, tokenize
+
+# How precisely a local result was placed, best first
+OFFICE, PINCODE, DISTRICT = 'office', 'pincode', 'district'
+
+
+def normalize_name(name):
+    return ' '.join(tokenize(name or ''))
+
+
+def _centroid(points):
+    return (round(sum(p[0] for p in points) / len(points), 6),
+            round(sum(p[1] for p in points) / len(points), 6))
+
+
+class _Directory:
+    """Immutable geocoding tables built from the pincodes table"""
+
+    def __init__(self, rows):
+        offices_by_pincode = {}
+        points_by_pincode = {}
+        points_by_district = {}
+        district_names = {}
+        details_by_pincode = {}
+        pincodes_by_office = {}
+        for pincode, office_name, district, state_name, latitude, longitude in rows:
+            if not pincode:
+                continue
+            details_by_pincode.setdefault(pincode, (district, state_name))
+            if latitude is None or longitude is None or (not latitude and not longitude):
+                continue
+            point = (float(latitude), float(longitude))
+            points_by_pincode.setdefault(pincode, []).append(point)
+            if district:
+                key = (normalize_name(district), normalize_name(state_name))
+                points_by_district.setdefault(key, []).append(point)
+                district_names.setdefault(key, (district, state_name))
+            office = normalize_name(OFFICE_SUFFIX_RE.sub('', office_name or ''))
+            if office:
+                offices_by_pincode.setdefault(pincode, []).append((office, office_name, point))
+                pincodes_by_office.setdefault(office, set()).add(pincode)
+
+        self.details_by_pincode = details_by_pincode
+        self.offices_by_pincode = offices_by_pincode
+        self.pincodes_by_office = pincodes_by_office
+        self.center_by_pincode = {p: _centroid(points) for p, points in points_by_pincode.items()}
+        self.center_by_district = {k: _centroid(points) for k, points in points_by_district.items()}
+        self.district_names = district_names
+        # District name alone -> the states it occurs in
+        self.states_by_district = {}
+        for district, state in self.center_by_district:
+            self.states_by_district.setdefault(district, []).append(state)
+
+
+class LocalGeocoder:
+    """Offline geocoder backed by the post office directory.
+
+    Resolves a parsed address to coordinates without any network call:
+    a known pincode places it at the matching post office (when the street
+    or city names one) or at the centroid of the pincode's offices; without
+    a usable pincode, a post office or district name in the city field is
+    used instead. Results use the same ``google_maps_*`` keys as the Google
+    backend plus ``latitude``/``longitude`` and the match precision.
+    """
+
+    def __init__(self, pool=None):
+        self._pool = pool
+        self._directory = None
+        self._lock = threading.Lock()
+        self._counters = {OFFICE: 0, PINCODE: 0, DISTRICT: 0, 'misses': 0}
+
+    @property
+    def pool(self):
+        return self._pool or db_pool.get_pool()
+
+    def rebuild(self):
+        """Reload the directory and swap in fresh tables"""
+        rows = []
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT pincode, office_name, district, state_name, latitude, longitude FROM pincodes"
+                )
+                rows = cursor.fetchall()
+                cursor.close()
+        except mysql.connector.Error as err:
+            print(f"Failed to load pincode directory for local geocoding: {err}")
+
+        directory = _Directory(rows)
+        with self._lock:
+            self._directory = directory
+        print(f"Local geocoder built with {len(directory.center_by_pincode)} pincodes")
+        return directory
+
+    def directory(self):
+        directory = self._directory
+        if directory is None:
+            with self._lock:
+                directory = self._directory
+            if directory is None:
+                directory = self.rebuild()
+        return directory
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    @staticmethod
+    def _result(pincode, district, state_name, street, point, precision):
+        return {
+            'google_maps_pincode': pincode,
+            'google_maps_city': display_name(district) if district else None,
+            'google_maps_state': display_name(state_name) if state_name else None,
+            'google_maps_street': street,
+            'latitude': point[0],
+            'longitude': point[1],
+            'geocoding_source': 'local',
+            'geocoding_precision': precision
+        }
+
+    def geocode(self, address_data):
+        """Geocode a parsed address dict; returns a result dict or None"""
+        directory = self.directory()
+        pincode = (address_data.get('pincode') or '').strip()
+        city = normalize_name(address_data.get('city'))
+        state = normalize_name(address_data.get('state'))
+
+        if pincode in directory.center_by_pincode:
+            district, state_name = directory.details_by_pincode[pincode]
+            # Longest office name of this pincode mentioned in the street, else
+            # in the city (head offices are often named after the city)
+            best = None
+            offices = directory.offices_by_pincode.get(pincode, ())
+            for field in ('street', 'city'):
+                text = f" {normalize_name(address_data.get(field))} "
+                for office, office_name, point in offices:
+                    if f" {office} " in text and (best is None or len(office) > len(best[0])):
+                        best = (office, office_name, point)
+                if best:
+                    break
+            if best:
+                self._count(OFFICE)
+                return self._result(pincode, district, state_name, display_name(best[1]), best[2], OFFICE)
+            self._count(PINCODE)
+            return self._result(pincode, district, state_name, None, directory.center_by_pincode[pincode],
+                                PINCODE)
+
+        if city:
+            # A post office name that identifies a single pincode
+            pincodes = directory.pincodes_by_office.get(city, ())
+            if state:
+                pincodes = [p for p in pincodes
+                            if normalize_name(directory.details_by_pincode[p][1]) == state]
+            if len(pincodes) == 1:
+                match = next(iter(pincodes))
+                district, state_name = directory.details_by_pincode[match]
+                office_name, point = next((name, point) for office, name, point
+                                          in directory.offices_by_pincode[match] if office == city)
+                self._count(OFFICE)
+                return self._result(match, district, state_name, display_name(office_name), point, OFFICE)
+
+            states = directory.states_by_district.get(city, ())
+            if state in states or len(states) == 1:
+                key = (city, state if state in states else states[0])
+                district, state_name = directory.district_names[key]
+                self._count(DISTRICT)
+                return self._result(None, district, state_name, None, directory.center_by_district[key], DISTRICT)
+
+        self._count('misses')
+        return None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        directory = self._directory
+        stats['pincodes'] = len(directory.center_by_pincode) if directory else 0
+        return stats
@@ -0,0 +1,186 @@
+import math
+import threading
+import time
+
+import numpy as np
+import mysql.connector
+import db_pool
+from route_optimizer import haversine_matrix
+
+KM_PER_DEGREE = 111.195
+ASSIGNMENT_BATCH_SIZE = 5000
+
+
+class CenterGrid:
+    """Uniform lat/lng grid over nodal center locations for k-nearest queries.
+
+    A query scans rings of cells around its own cell and stops once the k-th
+    best distance is within the guaranteed minimum distance to every cell
+    not scanned yet, so results are exact while only nearby centers are
+    measured. By default cells are sized so there are about as many cells
+    as centers over their bounding box.
+    """
+
+    def __init__(self, locations, cell_size=None):
+        self.names = list(locations)
+        self.coords = np.array([locations[name] for name in self.names], dtype=np.float64).reshape(-1, 2)
+        if cell_size is None:
+            if len(self.coords):
+                spans = self.coords.max(axis=0) - self.coords.min(axis=0)
+                cell_size = math.sqrt(max(spans[0], 1.0) * max(spans[1], 1.0) / len(self.coords))
+            cell_size = max(cell_size or 0.5, 0.01)
+        self.cell_size = cell_size
+        self.cells = {}
+        for index, (latitude, longitude) in enumerate(self.coords):
+            self.cells.setdefault(self._cell(latitude, longitude), []).append(index)
+        self.max_abs_latitude = float(np.abs(self.coords[:, 0]).max()) if len(self.coords) else 0.0
+
+    def _cell(self, latitude, longitude):
+        return math.floor(latitude / self.cell_size), math.floor(longitude / self.cell_size)
+
+    def _ring(self, row, col, radius):
+        if radius == 0:
+            yield row, col
+            return
+        for c in range(col - radius, col + radius + 1):
+            yield row - radius, c
+            yield row + radius, c
+        for r in range(row - radius + 1, row + radius):
+            yield r, col - radius
+            yield r, col + radius
+
+    def nearest(self, latitude, longitude, k=1):
+        """The k nearest centers as [(name, distance_km)], nearest first"""
+        if not self.names:
+            return []
+        k = min(k, len(self.names))
+        row, col = self._cell(latitude, longitude)
+        max_radius = max(max(abs(r - row), abs(c - col)) for r, c in self.cells)
+
+        query = [(latitude, longitude)]
+        candidates = []
+        distances = []
+        radius = 0
+        while radius <= max_radius:
+            found = [index for cell in self._ring(row, col, radius) for index in self.cells.get(cell, ())]
+            if found:
+                candidates.extend(found)
+                distances.extend(haversine_matrix(query, self.coords[found])[0].tolist())
+            if len(candidates) == len(self.names):
+                break
+            if len(candidates) >= k:
+                kth = sorted(distances)[k - 1]
+                # Unscanned cells are more than radius cells away in latitude or longitude
+                widest = min(89.0, max(abs(latitude), self.max_abs_latitude) + (radius + 1) * self.cell_size)
+                bound = radius * self.cell_size * KM_PER_DEGREE * math.cos(math.radians(widest))
+                if kth <= bound:
+                    break
+            radius += 1
+
+        best = sorted(range(len(candidates)), key=lambda i: (distances[i], candidates[i]))[:k]
+        return [(self.names[candidates[i]], distances[i]) for i in best]
+
+
+class NodalAssignment:
+    """Assigns every pincode to its closest nodal center.
+
+    ``rebuild()`` measures each pincode centroid against the center grid and
+    stores the result in the ``pincode_nodal_assignment`` table; ``load()``
+    reads that table back into memory so lookups are dict hits.
+    """
+
+    def __init__(self, pool=None, cell_size=None):
+        self._pool = pool
+        self.cell_size = cell_size
+        self._grid = None
+        self._assignments = {}
+        self._lock = threading.Lock()
+        self.last_build = None
+
+    @property
+    def pool(self):
+        return self._pool or db_pool.get_pool()
+
+    def initialize_table(self):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS pincode_nodal_assignment (
+                    pincode VARCHAR(10) PRIMARY KEY,
+                    nodal_center VARCHAR(255),
+                    distance_km FLOAT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                    INDEX idx_nodal_center (nodal_center)
+                )
+            """)
+            conn.commit()
+            cursor.close()
+
+    def set_centers(self, locations):
+        """Replace the center grid; locations maps center name -> (lat, lng)"""
+        grid = CenterGrid(locations, self.cell_size)
+        with self._lock:
+            self._grid = grid
+        return grid
+
+    def load(self):
+        """Read the stored assignments into memory"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT pincode, nodal_center FROM pincode_nodal_assignment")
+                assignments = dict(cursor.fetchall())
+                cursor.close()
+        except mysql.connector.Error as err:
+            print(f"Failed to load nodal assignments: {err}")
+            return False
+
+        with self._lock:
+            self._assignments = assignments
+        return True
+
+    def rebuild(self, locations, pincode_points):
+        """Assign each pincode in pincode_points (pincode -> (lat, lng)) and store the table"""
+        started = time.perf_counter()
+        grid = self.set_centers(locations)
+        rows = []
+        for pincode, (latitude, longitude) in pincode_points.items():
+            nearest = grid.nearest(latitude, longitude, 1)
+            if nearest:
+                rows.append((pincode, nearest[0][0], round(nearest[0][1], 3)))
+
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM pincode_nodal_assignment")
+            for start in range(0, len(rows), ASSIGNMENT_BATCH_SIZE):
+                cursor.executemany(
+                    "INSERT INTO pincode_nodal_assignment (pincode, nodal_center, distance_km) VALUES (%s, %s, %s)",
+                    rows[start:start + ASSIGNMENT_BATCH_SIZE]
+                )
+            # Readers see the old assignments until this commit
+            conn.commit()
+            cursor.close()
+
+        with self._lock:
+            self._assignments = {pincode: center for pincode, center, _ in rows}
+        self.last_build = {'pincodes': len(rows), 'centers': len(grid.names),
+                           'build_time': round(time.perf_counter() - started, 3)}
+        print(f"Nodal assignments built: {self.last_build}")
+        return self.last_build
+
+    def center_for(self, pincode):
+        """Closest nodal center for a pincode, or None"""
+        return self._assignments.get(pincode)
+
+    def nearest(self, latitude, longitude, k=1):
+        """The k nearest nodal centers to a coordinate as [(name, distance_km)]"""
+        grid = self._grid
+        return grid.nearest(latitude, longitude, k) if grid else []
+
+    def stats(self):
+        grid = self._grid
+        return {
+            'assigned_pincodes': len(self._assignments),
+            'centers': len(grid.names) if grid else 0,
+            'last_build': self.last_build
+        }
@@ -0,0 +1,236 @@
+import threading
+import time
+
+import mysql.connector
+import db_pool
+
+# Seed data for a fresh database (and the fallback when it is unreachable)
+DEFAULT_NODAL_CENTERS = {
+    "Pune Main Nodal Center": ["411001", "411002", "411003", "411004", "411005"],
+    "Mumbai Central Nodal Center": ["400001", "400016", "400020", "400021", "400022"],
+    "Nagpur Regional Nodal Center": ["440001", "440002", "440003", "440004", "440005"],
+    "Solapur Distribution Hub": ["413001", "413002", "413003", "413004", "413005"],
+    "Aurangabad Logistics Park": ["431001", "431002", "431003", "431004", "431005"],
+    "Kolhapur Delivery Center": ["416001", "416002", "416003", "416004", "416005"],
+    "Thane West Sorting Office": ["400601", "400602", "400603", "400604", "400605"],
+    "Nashik Main Post Office": ["422001", "422002", "422003", "422004", "422005"],
+    "Amravati Camp Hub": ["444601", "444602", "444603", "444604", "444605"],
+    "Akola City Dispatch": ["444001", "444002", "444003", "444004", "444005"],
+    "Latur City Post Office": ["413512", "413513", "413514", "413515", "413516"],
+    "Jalgaon City Delivery": ["425001", "425002", "425003", "425004", "425005"],
+    "Parbhani City Post": ["431401", "431402", "431403", "431404", "431405"],
+    "New Delhi Central Hub": ["110001", "110002", "110003", "110004", "110006"],
+    "Bangalore MG Road Center": ["560001", "560002", "560003", "560004", "560005"],
+    "Kolkata Park Street Hub": ["700001", "700016", "700017", "700018", "700019"],
+    "Jaipur JLN Marg Center": ["302001", "302002", "302003", "302004", "302005"],
+    "Ahmedabad MG Road Hub": ["380001", "380002", "380003", "380009", "380010"],
+    "Hyderabad Sarojini Devi Hub": ["500001", "500002", "500003", "500004", "500005"]
+}
+
+
+class NodalCenterSnapshot:
+    """Immutable view of the nodal centers at one version"""
+
+    def __init__(self, version, centers, locations):
+        self.version = version
+        # name -> list of covered pincodes
+        self.centers = centers
+        # name -> (lat, lng) for centers with a configured location
+        self.locations = locations
+
+    @property
+    def etag(self):
+        return f'"nodal-centers-{self.version}"'
+
+
+class NodalCenterRegistry:
+    """Nodal centers and their pincode coverage, stored in MySQL.
+
+    Each worker keeps an in-memory snapshot. At most every
+    ``check_interval`` seconds, ``snapshot()`` starts a background check of
+    the single-row version counter, which reloads when another worker has
+    changed the centers; callers keep getting the current snapshot until the
+    new one is swapped in. Listeners registered with ``on_change`` are called
+    with every new snapshot (on that background thread) so dependent indexes
+    can be rebuilt.
+    """
+
+    def __init__(self, pool=None, check_interval=30):
+        self._pool = pool
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    @property
+    def pool(self):
+        return self._pool or db_pool.get_pool()
+
+    def on_change(self, listener):
+        self._listeners.append(listener)
+
+    def initialize_tables(self, seed=DEFAULT_NODAL_CENTERS):
+        """Create the tables and seed them when empty"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS nodal_centers (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    name VARCHAR(255) NOT NULL,
+                    latitude DECIMAL(10, 8),
+                    longitude DECIMAL(11, 8),
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                    UNIQUE KEY idx_name (name)
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS nodal_center_pincodes (
+                    center_id INT NOT NULL,
+                    pincode VARCHAR(10) NOT NULL,
+                    PRIMARY KEY (center_id, pincode),
+                    INDEX idx_pincode (pincode),
+                    FOREIGN KEY (center_id) REFERENCES nodal_centers(id) ON DELETE CASCADE
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS nodal_centers_version (
+                    id TINYINT PRIMARY KEY,
+                    version BIGINT NOT NULL
+                )
+            """)
+            cursor.execute("INSERT IGNORE INTO nodal_centers_version (id, version) VALUES (1, 0)")
+
+            cursor.execute("SELECT COUNT(*) FROM nodal_centers")
+            if cursor.fetchone()[0] == 0 and seed:
+                for name, pincodes in seed.items():
+                    self._write_center(cursor, name, pincodes)
+                self._bump(cursor)
+                print(f"Seeded {len(seed)} nodal centers")
+
+            conn.commit()
+            cursor.close()
+
+    @staticmethod
+    def _write_center(cursor, name, pincodes, latitude=None, longitude=None):
+        cursor.execute("""
+            INSERT INTO nodal_centers (name, latitude, longitude) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id),
+                latitude = VALUES(latitude), longitude = VALUES(longitude)
+        """, (name, latitude, longitude))
+        center_id = cursor.lastrowid
+        cursor.execute("DELETE FROM nodal_center_pincodes WHERE center_id = %s", (center_id,))
+        cursor.executemany(
+            "INSERT IGNORE INTO nodal_center_pincodes (center_id, pincode) VALUES (%s, %s)",
+            [(center_id, pincode) for pincode in pincodes]
+        )
+
+    @staticmethod
+    def _bump(cursor):
+        cursor.execute("UPDATE nodal_centers_version SET version = version + 1 WHERE id = 1")
+
+    def _read_version(self):
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT version FROM nodal_centers_version WHERE id = 1")
+            row = cursor.fetchone()
+            cursor.close()
+        return row[0] if row else 0
+
+    def reload(self):
+        """Load a fresh snapshot and notify listeners; keeps the old one on DB errors"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                # Read the version first so a concurrent change is seen on the next check
+                cursor.execute("SELECT version FROM nodal_centers_version WHERE id = 1")
+                row = cursor.fetchone()
+                version = row[0] if row else 0
+                cursor.execute("""
+                    SELECT c.name, c.latitude, c.longitude, p.pincode
+                    FROM nodal_centers c
+                    LEFT JOIN nodal_center_pincodes p ON p.center_id = c.id
+                    ORDER BY c.id, p.pincode
+                """)
+                centers = {}
+                locations = {}
+                for name, latitude, longitude, pincode in cursor:
+                    pincodes = centers.setdefault(name, [])
+                    if pincode:
+                        pincodes.append(pincode)
+                    if latitude is not None and longitude is not None:
+                        locations[name] = (float(latitude), float(longitude))
+                cursor.close()
+            snapshot = NodalCenterSnapshot(version, centers, locations)
+        except mysql.connector.Error as err:
+            print(f"Failed to load nodal centers: {err}")
+            if self._snapshot is not None:
+                self._checked_at = time.time()
+                return self._snapshot
+            snapshot = NodalCenterSnapshot(0, dict(DEFAULT_NODAL_CENTERS), {})
+
+        with self._lock:
+            self._snapshot = snapshot
+            self._checked_at = time.time()
+        for listener in self._listeners:
+            listener(snapshot)
+        return snapshot
+
+    def snapshot(self):
+        """Current snapshot; a stale one is refreshed in the background, not in this call"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.reload()
+        if time.time() - self._checked_at >= self.check_interval:
+            self._refresh_in_background()
+        return snapshot
+
+    def _refresh_in_background(self):
+        with self._lock:
+            # Only one refresh per interval, however many requests notice it
+            if self._refreshing or time.time() - self._checked_at < self.check_interval:
+                return
+            self._refreshing = True
+            self._checked_at = time.time()
+        threading.Thread(target=self._refresh, name='nodal-centers-refresh', daemon=True).start()
+
+    def _refresh(self):
+        try:
+            if self._read_version() != self._snapshot.version:
+                self.reload()
+        except mysql.connector.Error as err:
+            print(f"Failed to check nodal centers version: {err}")
+        except Exception as e:
+            print(f"Failed to refresh nodal centers: {str(e)}")
+        finally:
+            self._refreshing = False
+
+    def upsert_center(self, name, pincodes, latitude=None, longitude=None):
+        """Create or replace a center and its coverage, publishing a new version"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            self._write_center(cursor, name, pincodes, latitude, longitude)
+            self._bump(cursor)
+            conn.commit()
+            cursor.close()
+
+    def delete_center(self, name):
+        """Remove a center; returns False if it did not exist"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM nodal_centers WHERE name = %s", (name,))
+            deleted = cursor.rowcount > 0
+            if deleted:
+                self._bump(cursor)
+            conn.commit()
+            cursor.close()
+        return deleted
+
+    def bump_version(self):
+        """Make every worker reload, e.g. after derived data (assignments) changed"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            self._bump(cursor)
+            conn.commit()
+            cursor.close()
@@ -0,0 +1,253 @@
+import base64
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+import image_preprocessing
+from ocr_batcher import OCRBatcher
+
+# Preprocessing profile from image_preprocessing.PROFILES applied before recognition.
+# Stays 'legacy' until a labelled benchmark run shows another profile reads as well.
+OCR_PROFILE = os.getenv("OCR_PROFILE", "legacy")
+
+# Concurrent requests share batched recognition calls unless OCR_MAX_BATCH_SIZE is 1
+OCR_MAX_BATCH_SIZE = int(os.getenv("OCR_MAX_BATCH_SIZE", 8))
+OCR_MAX_BATCH_WAIT_MS = float(os.getenv("OCR_MAX_BATCH_WAIT_MS", 10))
+
+# Process-local EasyOCR reader (each OCR worker process gets its own)
+_reader = None
+_reader_lock = threading.Lock()
+
+# Model load / warm-up timings for this process
+_startup = {
+    'pid': os.getpid(),
+    'loaded': False,
+    'device': None,
+    'load_seconds': None,
+    'warm_up_seconds': None,
+    # True when the reader was inherited from a preloading parent process
+    'inherited': False
+}
+
+# Pool of OCR worker processes used for batch capture
+_executor = None
+_executor_lock = threading.Lock()
+
+# Micro-batching front of the reader for request threads
+_batcher = OCRBatcher(lambda: get_reader(), OCR_MAX_BATCH_SIZE, OCR_MAX_BATCH_WAIT_MS / 1000)
+
+# Set in OCR pool workers, which handle one image at a time and skip the batcher
+_in_pool_worker = False
+
+# Accumulated preprocessing stage timings (ms) for this process
+_stage_totals = {}
+_images_preprocessed = 0
+_stats_lock = threading.Lock()
+
+
+def load_reader(gpu=True):
+    """Create an EasyOCR reader, preferring the GPU when one is available"""
+    # easyocr pulls in torch, so it is only imported once OCR is actually needed
+    import easyocr
+
+    if gpu:
+        try:
+            reader = easyocr.Reader(['en'], gpu=True)
+            print("EasyOCR initialized with GPU support")
+            return reader
+        except Exception as e:
+            print(f"GPU not available, falling back to CPU: {str(e)}")
+    return easyocr.Reader(['en'], gpu=False)
+
+
+def get_reader(gpu=True):
+    """Return the process-wide EasyOCR reader, loading it on first use"""
+    global _reader
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None:
+                started = time.perf_counter()
+                reader = load_reader(gpu)
+                _startup.update(loaded=True, device=str(getattr(reader, 'device', 'cpu')),
+                                load_seconds=round(time.perf_counter() - started, 3))
+                print(f"OCR model loaded in {_startup['load_seconds']}s")
+                _reader = reader
+    return _reader
+
+
+def preload():
+    """Load the model on the CPU before forking workers.
+
+    Workers forked afterwards share the weights copy-on-write. A CUDA
+    context does not survive a fork, and running inference here would start
+    torch thread pools that forked children cannot use, so this only loads.
+    """
+    get_reader(gpu=False)
+
+
+def after_fork():
+    """Reset per-process state in a freshly forked worker.
+
+    The OCR pool is never inherited: it belongs to the parent, and this
+    worker spawns its own (see get_executor), so warming up or batching in
+    this worker first is safe.
+    """
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+    _startup.update(pid=os.getpid(), inherited=_reader is not None)
+
+
+def warm_up(background=False):
+    """Load the reader and run one tiny recognition so the first request doesn't pay for it"""
+    if background:
+        threading.Thread(target=warm_up, name='ocr-warm-up', daemon=True).start()
+        return None
+
+    started = time.perf_counter()
+    try:
+        reader = get_reader()
+        reader.readtext(np.full((32, 96), 255, dtype=np.uint8), detail=0)
+    except Exception as e:
+        print(f"OCR warm-up failed: {str(e)}")
+        return None
+    _startup['warm_up_seconds'] = round(time.perf_counter() - started, 3)
+    print(f"OCR warmed up in {_startup['warm_up_seconds']}s")
+    return _startup['warm_up_seconds']
+
+
+def startup_metrics():
+    """Model load and warm-up timings for this process"""
+    return dict(_startup)
+
+
+def image_bytes(image_data):
+    """Encoded image bytes from a base64 data URL (or raw bytes)"""
+    if isinstance(image_data, (bytes, bytearray)):
+        return bytes(image_data)
+
+    if not image_data or not isinstance(image_data, str):
+        raise ValueError("Invalid image data format")
+
+    if not image_data.startswith('data:image'):
+        raise ValueError("Invalid image format, expected base64 encoded image")
+
+    try:
+        header, encoded = image_data.split(',', 1)
+        return base64.b64decode(encoded)
+    except Exception as e:
+        raise ValueError(f"Invalid base64 encoding: {str(e)}")
+
+
+def decode_image(image_data):
+    """Decode a base64 data URL (or raw encoded bytes) into a BGR image; decoded images pass through"""
+    if isinstance(image_data, np.ndarray):
+        return image_data
+
+    nparr = np.frombuffer(image_bytes(image_data), np.uint8)
+    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+    if img is None:
+        raise ValueError("Failed to decode image")
+    return img
+
+
+def extract_address_from_image(image_data):
+    """Extracts address text from base64 image data using EasyOCR."""
+    try:
+        img = decode_image(image_data)
+        gray = preprocess_image(img)
+
+        # Perform OCR
+        try:
+            results = recognize(gray)
+            address_text = ' '.join(results).strip()
+
+            if not address_text:
+                raise ValueError("No text detected in image")
+
+            return address_text
+        except Exception as e:
+            raise ValueError(f"OCR processing failed: {str(e)}")
+
+    except Exception as e:
+        print(f"Error during EasyOCR: {str(e)}")
+        raise
+
+
+def recognize(gray):
+    """Text lines in a preprocessed image, batched with concurrent callers when enabled"""
+    if OCR_MAX_BATCH_SIZE > 1 and not _in_pool_worker:
+        return _batcher.readtext(gray)
+    return get_reader().readtext(gray, detail=0)
+
+
+def batching_stats():
+    return _batcher.stats()
+
+
+def preprocess_image(img, profile=None):
+    """Apply the OCR preprocessing profile and record its stage timings"""
+    global _images_preprocessed
+    gray, timings = image_preprocessing.preprocess(img, profile or OCR_PROFILE)
+    with _stats_lock:
+        _images_preprocessed += 1
+        for stage, ms in timings.items():
+            _stage_totals[stage] = _stage_totals.get(stage, 0.0) + ms
+    return gray
+
+
+def preprocessing_stats():
+    """Average milliseconds per preprocessing stage in this process"""
+    with _stats_lock:
+        count = _images_preprocessed
+        return {
+            'profile': OCR_PROFILE,
+            'images': count,
+            'stage_ms': {stage: round(total / count, 2) for stage, total in _stage_totals.items()} if count else {}
+        }
+
+
+def _init_worker():
+    """Process pool initializer: load this worker's own CPU reader"""
+    global _in_pool_worker
+    _in_pool_worker = True
+    get_reader(gpu=False)
+
+
+def pool_size():
+    """OCR_WORKERS, or this gunicorn worker's share of the cores"""
+    configured = int(os.getenv("OCR_WORKERS", 0))
+    if configured:
+        return configured
+    # Every gunicorn worker starts its own pool, each process with its own model
+    return max(1, (os.cpu_count() or 1) // int(os.getenv("GUNICORN_WORKERS", 1)))
+
+
+def get_executor():
+    """Return the shared OCR process pool, starting it on first use.
+
+    Workers are spawned rather than forked: this process may already have
+    run torch inference (warm-up, the batcher), and forked children cannot
+    use the torch thread pools they would inherit.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=pool_size(), initializer=_init_worker,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def shutdown_executor():
+    """Stop the OCR process pool, if one was started"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+
+
+class OCRBatcher:
+    """Micro-batches recognition requests from concurrent callers.
+
+    ``submit()`` queues a preprocessed image and returns a Future. One
+    inference thread takes up to ``max_batch_size`` queued images, waiting
+    at most ``max_wait`` seconds after the first one arrived for others to
+    join, pads them to a common size and runs a single ``readtext_batched``
+    call. A lone image goes through plain ``readtext`` without padding.
+    """
+
+    def __init__(self, get_reader, max_batch_size=8, max_wait=0.01, pad_value=255):
+        self.get_reader = get_reader
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.pad_value = pad_value
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self._started_at = None
+        self._counters = {
+            'images': 0,
+            'batches': 0,
+            'errors': 0,
+            'queue_wait_seconds': 0.0,
+            'inference_seconds': 0.0,
+            'pixels': 0,
+            'padded_pixels': 0
+        }
+        self._batch_sizes = {}
+
+    def _ensure_thread(self):
+        # Started on first use, and again in a forked worker
+        if self._thread is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._queue.clear()
+            self._started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name='ocr-batcher', daemon=True)
+            self._thread.start()
+
+    def submit(self, image):
+        """Queue a grayscale or BGR image; the Future resolves to the list of text strings"""
+        future = Future()
+        with self._cond:
+            self._ensure_thread()
+            self._queue.append((image, future, time.perf_counter()))
+            self._cond.notify()
+        return future
+
+    def readtext(self, image):
+        return self.submit(image).result()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return [self._queue.popleft() for _ in range(min(self.max_batch_size, len(self._queue)))]
+
+    def _pad(self, images):
+        """Pad every image (bottom/right) to the largest height and width in the batch"""
+        height = max(image.shape[0] for image in images)
+        width = max(image.shape[1] for image in images)
+        padded = []
+        for image in images:
+            canvas = np.full((height, width) + image.shape[2:], self.pad_value, dtype=image.dtype)
+            canvas[:image.shape[0], :image.shape[1]] = image
+            padded.append(canvas)
+        return padded, height * width * len(images)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            images = [image for image, _, _ in batch]
+            # Grayscale and colour images cannot share one padded batch
+            if len(images) > 1 and len({image.ndim for image in images}) > 1:
+                images = [image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) for image in images]
+            pixels = sum(image.shape[0] * image.shape[1] for image in images)
+            try:
+                reader = self.get_reader()
+                if len(images) == 1:
+                    results = [reader.readtext(images[0], detail=0)]
+                    padded_pixels = pixels
+                else:
+                    padded, padded_pixels = self._pad(images)
+                    results = reader.readtext_batched(padded, detail=0, batch_size=len(padded))
+                    if len(results) != len(batch):
+                        raise ValueError(f"Expected {len(batch)} OCR results, got {len(results)}")
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+                error = False
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                error = True
+                padded_pixels = pixels
+
+            finished = time.perf_counter()
+            with self._cond:
+                counters = self._counters
+                counters['images'] += len(batch)
+                counters['batches'] += 1
+                counters['errors'] += error
+                counters['queue_wait_seconds'] += sum(started - queued for _, _, queued in batch)
+                counters['inference_seconds'] += finished - started
+                counters['pixels'] += pixels
+                counters['padded_pixels'] += padded_pixels
+                self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+
+    def stats(self):
+        with self._cond:
+            counters = dict(self._counters)
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+            queued = len(self._queue)
+        images = counters['images']
+        batches = counters['batches']
+        uptime = time.time() - self._started_at if self._started_at else 0
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': round(self.max_wait * 1000, 1),
+            'queued': queued,
+            'images': images,
+            'batches': batches,
+            'errors': counters['errors'],
+            'batch_sizes': batch_sizes,
+            'mean_batch_size': round(images / batches, 2) if batches else 0,
+            'mean_queue_wait_ms': round(counters['queue_wait_seconds'] / images * 1000, 1) if images else 0,
+            'mean_batch_inference_ms': round(counters['inference_seconds'] / batches * 1000, 1) if batches else 0,
+            'images_per_inference_second': round(images / counters['inference_seconds'], 2)
+            if counters['inference_seconds'] else 0,
+            'images_per_second': round(images / uptime, 2) if uptime else 0,
+            'padding_overhead': round(counters['padded_pixels'] / counters['pixels'] - 1, 3)
+            if counters['pixels'] else 0
+        }
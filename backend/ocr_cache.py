@@ -0,0 +1,313 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+import mysql.connector
+import db_pool
+
+# dHash is split into this many 16-bit bands; two hashes within
+# MAX_NEAR_DISTANCE bits of each other share at least one band exactly
+HASH_BANDS = 4
+MAX_NEAR_DISTANCE = HASH_BANDS - 1
+
+
+def content_hash(raw):
+    """sha256 of the encoded image bytes"""
+    return hashlib.sha256(raw).hexdigest()
+
+
+def perceptual_hash(img):
+    """64-bit difference hash: brightness gradients of a 9x8 thumbnail"""
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    thumb = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (thumb[:, 1:] > thumb[:, :-1]).flatten()
+    return int(sum(1 << i for i, bit in enumerate(bits) if bit))
+
+
+def _bands(dhash):
+    return [(dhash >> (16 * i)) & 0xFFFF for i in range(HASH_BANDS)]
+
+
+class OCRCache:
+    """Two-tier cache of OCR results keyed by image content.
+
+    Entries (extracted text and parsed address) are stored under the
+    sha256 of the uploaded image bytes, in an in-process LRU in front of
+    the ``ocr_cache`` table. With ``near_distance`` > 0 an image whose
+    perceptual hash is within that many bits of a cached one also counts
+    as a hit (re-encoded or slightly recompressed photos of the same
+    label); candidates are found through exact matches on hash bands.
+    """
+
+    def __init__(self, pool=None, max_entries=5000, ttl=7 * 86400, near_distance=0):
+        self._pool = pool
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.near_distance = min(max(near_distance, 0), MAX_NEAR_DISTANCE)
+
+        self._entries = OrderedDict()
+        self._by_band = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            'memory_hits': 0,
+            'db_hits': 0,
+            'near_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'db_errors': 0
+        }
+
+    @property
+    def pool(self):
+        return self._pool or db_pool.get_pool()
+
+    def initialize_table(self):
+        """Create the persistent cache table if it doesn't exist"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS ocr_cache (
+                    content_hash CHAR(64) PRIMARY KEY,
+                    dhash BIGINT UNSIGNED,
+                    band0 SMALLINT UNSIGNED,
+                    band1 SMALLINT UNSIGNED,
+                    band2 SMALLINT UNSIGNED,
+                    band3 SMALLINT UNSIGNED,
+                    address_text TEXT,
+                    parsed_address TEXT,
+                    expires_at DOUBLE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    INDEX idx_band0 (band0),
+                    INDEX idx_band1 (band1),
+                    INDEX idx_band2 (band2),
+                    INDEX idx_band3 (band3),
+                    INDEX idx_expires_at (expires_at)
+                )
+            """)
+            conn.commit()
+            cursor.close()
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _forget(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry[2] is not None:
+            for band in enumerate(_bands(entry[2])):
+                keys = self._by_band.get(band)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._by_band[band]
+
+    def _remember(self, key, value, expires_at, dhash):
+        with self._lock:
+            if dhash is None and key in self._entries:
+                # Re-storing an exact hit keeps its near-duplicate bands
+                dhash = self._entries[key][2]
+            self._forget(key)
+            self._entries[key] = (value, expires_at, dhash)
+            if dhash is not None and self.near_distance:
+                for band in enumerate(_bands(dhash)):
+                    self._by_band.setdefault(band, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._forget(next(iter(self._entries)))
+
+    def _memory_get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                self._forget(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _memory_near(self, dhash, now):
+        with self._lock:
+            candidates = set()
+            for band in enumerate(_bands(dhash)):
+                candidates |= self._by_band.get(band, set())
+            best = None
+            for key in candidates:
+                value, expires_at, other = self._entries[key]
+                distance = bin(dhash ^ other).count('1')
+                if expires_at > now and distance <= self.near_distance and (best is None or distance < best[2]):
+                    best = (key, value, distance, expires_at)
+            return best
+
+    @staticmethod
+    def _entry(address_text, parsed_address):
+        return {
+            'address_text': address_text,
+            'parsed_address': json.loads(parsed_address) if parsed_address else None
+        }
+
+    def get(self, key, compute_dhash=None):
+        """Look up an image by content hash, then (when enabled) by perceptual hash.
+
+        ``compute_dhash`` is only called after an exact miss, so exact hits
+        never decode the image. Returns ``(entry, info)``: entry is None on a
+        miss, and info describes the lookup: whether it hit, the tier
+        ('memory' or 'database'), whether it was a near-duplicate match and
+        the perceptual hash (to pass to ``set()`` after a miss).
+        """
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None:
+            self._count('memory_hits')
+            return value, {'hit': True, 'tier': 'memory', 'near_duplicate': False}
+
+        row = self._db_get(key, now)
+        if row is not None:
+            address_text, parsed_address, expires_at, dhash = row
+            value = self._entry(address_text, parsed_address)
+            self._remember(key, value, expires_at, dhash)
+            self._count('db_hits')
+            return value, {'hit': True, 'tier': 'database', 'near_duplicate': False}
+
+        dhash = compute_dhash() if compute_dhash is not None and self.near_distance else None
+        if dhash is not None:
+            near = self._memory_near(dhash, now)
+            if near is not None:
+                # Resubmissions of this exact image then hit without decoding
+                self._remember(key, near[1], near[3], dhash)
+                self._count('near_hits')
+                return near[1], {'hit': True, 'tier': 'memory', 'near_duplicate': True,
+                                 'distance': near[2], 'dhash': dhash}
+
+            row = self._db_near(dhash, now)
+            if row is not None:
+                address_text, parsed_address, expires_at, distance = row
+                value = self._entry(address_text, parsed_address)
+                self._remember(key, value, expires_at, dhash)
+                self._count('near_hits')
+                return value, {'hit': True, 'tier': 'database', 'near_duplicate': True,
+                               'distance': int(distance), 'dhash': dhash}
+
+        self._count('misses')
+        return None, {'hit': False, 'dhash': dhash}
+
+    def _db_get(self, key, now):
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT address_text, parsed_address, expires_at, dhash FROM ocr_cache "
+                    "WHERE content_hash = %s AND expires_at > %s",
+                    (key, now)
+                )
+                row = cursor.fetchone()
+                cursor.close()
+            return row
+        except mysql.connector.Error as err:
+            print(f"OCR cache database error: {err}")
+            self._count('db_errors')
+            return None
+
+    def _db_near(self, dhash, now):
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                # Any hash within MAX_NEAR_DISTANCE bits shares at least one band
+                cursor.execute("""
+                    SELECT address_text, parsed_address, expires_at, BIT_COUNT(dhash ^ %s) AS distance
+                    FROM ocr_cache
+                    WHERE (band0 = %s OR band1 = %s OR band2 = %s OR band3 = %s)
+                      AND expires_at > %s
+                    HAVING distance <= %s
+                    ORDER BY distance
+                    LIMIT 1
+                """, (dhash, *_bands(dhash), now, self.near_distance))
+                row = cursor.fetchone()
+                cursor.close()
+            return row
+        except mysql.connector.Error as err:
+            print(f"OCR cache database error: {err}")
+            self._count('db_errors')
+            return None
+
+    def set(self, key, address_text, parsed_address=None, dhash=None):
+        """Store the OCR text (and parsed address) for an image"""
+        expires_at = time.time() + self.ttl
+        parsed_json = json.dumps(parsed_address) if parsed_address else None
+        self._remember(key, self._entry(address_text, parsed_json), expires_at, dhash)
+        self._count('stores')
+
+        bands = _bands(dhash) if dhash is not None else [None] * HASH_BANDS
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO ocr_cache (content_hash, dhash, band0, band1, band2, band3,
+                                           address_text, parsed_address, expires_at)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE address_text = VALUES(address_text),
+                        parsed_address = VALUES(parsed_address), expires_at = VALUES(expires_at)
+                """, (
+                    key,
+                    dhash,
+                    *bands,
+                    address_text,
+                    parsed_json,
+                    expires_at
+                ))
+                conn.commit()
+                cursor.close()
+        except mysql.connector.Error as err:
+            print(f"OCR cache database error: {err}")
+            self._count('db_errors')
+
+    def clear_parsed(self, persistent=True):
+        """Forget cached parsed addresses but keep the OCR text.
+
+        Parsing depends on the pincode directory, so this runs after an
+        import; hits then re-parse their text. With ``persistent`` the
+        ``ocr_cache`` table is cleared too, otherwise only this process's
+        memory tier. Returns the number of persistent entries changed.
+        """
+        with self._lock:
+            for key, (value, expires_at, dhash) in self._entries.items():
+                if value['parsed_address'] is not None:
+                    self._entries[key] = (dict(value, parsed_address=None), expires_at, dhash)
+
+        if not persistent:
+            return 0
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE ocr_cache SET parsed_address = NULL WHERE parsed_address IS NOT NULL")
+            changed = cursor.rowcount
+            conn.commit()
+            cursor.close()
+        return changed
+
+    def invalidate(self):
+        """Drop every entry; returns the number of persistent entries removed"""
+        with self._lock:
+            self._entries.clear()
+            self._by_band.clear()
+
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM ocr_cache")
+            removed = cursor.rowcount
+            conn.commit()
+            cursor.close()
+        return removed
+
+    def stats(self):
+        """Hit/miss counters and memory tier size"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_entries'] = len(self._entries)
+        stats['near_distance'] = self.near_distance
+        hits = stats['memory_hits'] + stats['db_hits'] + stats['near_hits']
+        lookups = hits + stats['misses']
+        stats['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        return stats
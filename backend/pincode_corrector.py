@@ -0,0 +1,158 @@
+from itertools import combinations
+
+# Substitution costs for digit pairs OCR commonly confuses (symmetric)
+OCR_CONFUSIONS = {
+    ('1', '7'): 0.3,
+    ('0', '8'): 0.3,
+    ('3', '8'): 0.4,
+    ('5', '6'): 0.4,
+    ('6', '8'): 0.4,
+    ('0', '6'): 0.5,
+    ('0', '9'): 0.5,
+    ('2', '7'): 0.5,
+    ('4', '9'): 0.5,
+    ('5', '8'): 0.5,
+    ('1', '4'): 0.6,
+}
+# Letters OCR returns in place of digits
+OCR_LETTER_DIGITS = str.maketrans({'O': '0', 'o': '0', 'D': '0', 'I': '1', 'l': '1', 'i': '1',
+                                   'Z': '2', 'S': '5', 's': '5', 'G': '6', 'B': '8', 'g': '9'})
+TRANSPOSITION_COST = 0.6
+INDEL_COST = 1.0
+
+
+def substitution_cost(a, b):
+    """Cost of reading digit b where a was written"""
+    if a == b:
+        return 0.0
+    return OCR_CONFUSIONS.get((a, b)) or OCR_CONFUSIONS.get((b, a)) or 1.0
+
+
+# Precomputed for every character pair seen in the inner loop
+_SUBSTITUTION_COSTS = {(a, b): substitution_cost(a, b) for a in '0123456789' for b in '0123456789'}
+
+
+def weighted_distance(source, target):
+    """Damerau-Levenshtein (optimal string alignment) distance with OCR-weighted substitutions"""
+    costs = _SUBSTITUTION_COSTS
+    previous2 = None
+    previous = [j * INDEL_COST for j in range(len(target) + 1)]
+    for i, s in enumerate(source, 1):
+        current = [i * INDEL_COST]
+        for j, t in enumerate(target, 1):
+            cost = previous[j - 1] + costs.get((s, t), 0.0 if s == t else 1.0)
+            if previous[j] + INDEL_COST < cost:
+                cost = previous[j] + INDEL_COST
+            if current[j - 1] + INDEL_COST < cost:
+                cost = current[j - 1] + INDEL_COST
+            if (previous2 is not None and j > 1 and s == target[j - 2] and source[i - 2] == t
+                    and s != t and previous2[j - 2] + TRANSPOSITION_COST < cost):
+                cost = previous2[j - 2] + TRANSPOSITION_COST
+            current.append(cost)
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def aligned_distance(source, target):
+    """Weighted distance between equal-length strings using only substitutions and transpositions"""
+    costs = _SUBSTITUTION_COSTS
+    previous2 = 0.0
+    previous = 0.0
+    for i in range(len(source)):
+        s = source[i]
+        t = target[i]
+        cost = previous + costs.get((s, t), 0.0 if s == t else 1.0)
+        if (i > 0 and s != t and s == target[i - 1] and source[i - 1] == t
+                and previous2 + TRANSPOSITION_COST < cost):
+            cost = previous2 + TRANSPOSITION_COST
+        previous2, previous = previous, cost
+    return previous
+
+
+def delete_variants(value, max_edits):
+    """All strings obtained by deleting up to max_edits characters"""
+    variants = {value}
+    for n in range(1, min(max_edits, len(value)) + 1):
+        for positions in combinations(range(len(value)), n):
+            variants.add(''.join(c for i, c in enumerate(value) if i not in positions))
+    return variants
+
+
+class PincodeCorrector:
+    """Nearest-neighbour pincode correction using a symmetric-delete index.
+
+    Every known pincode is indexed under each string reachable by deleting up
+    to ``max_edits`` digits. A query generates its own delete variants and
+    looks them up, which yields every pincode within ``max_edits`` insertions,
+    deletions, substitutions or transpositions in a few dozen dict hits,
+    independent of the directory size. Candidates are then ranked by the
+    OCR-weighted distance.
+    """
+
+    def __init__(self, pincodes, details=None, max_edits=2):
+        self.max_edits = max_edits
+        self.details = details or {}
+        self._deletes = {}
+        for pincode in pincodes:
+            for variant in delete_variants(pincode, max_edits):
+                self._deletes.setdefault(variant, []).append(pincode)
+
+    def _matches_region(self, pincode, state, district):
+        details = self.details.get(pincode)
+        if not details:
+            return False
+        pincode_district, pincode_state = details
+        if state and (pincode_state or '').lower() != state.lower():
+            return False
+        if district and (pincode_district or '').lower() != district.lower():
+            return False
+        return True
+
+    def suggest(self, pincode, k=5, state=None, district=None):
+        """Top-k (pincode, score) candidates, best first.
+
+        Scores are 1 minus the weighted distance normalized by length. When a
+        state/district is given, candidates in that region are preferred; if
+        none match, the unconstrained candidates are returned.
+        """
+        if not pincode:
+            return []
+        original = pincode
+        pincode = pincode.strip().translate(OCR_LETTER_DIGITS)
+
+        candidates = set()
+        for variant in delete_variants(pincode, self.max_edits):
+            candidates.update(self._deletes.get(variant, ()))
+        candidates.discard(original)
+
+        # Equal-length strings aligned with indels cost at least one deletion
+        # plus one insertion, so the linear substitution/transposition pass is
+        # exact below that; above it, within two edits only a pure shift
+        # (same string after one deletion on each side) can still match.
+        shift_cost = 2 * INDEL_COST
+        query_shifts = delete_variants(pincode, 1)
+        scored = []
+        for candidate in candidates:
+            if len(candidate) != len(pincode) or self.max_edits > shift_cost:
+                cost = weighted_distance(pincode, candidate)
+            else:
+                cost = aligned_distance(pincode, candidate)
+                if cost > shift_cost and not query_shifts.isdisjoint(delete_variants(candidate, 1)):
+                    cost = shift_cost
+            if cost <= self.max_edits:
+                if candidate == pincode:
+                    # Only letter-for-digit misreads separate it from the input
+                    cost = 0.1
+                score = 1 - cost / max(len(pincode), len(candidate))
+                scored.append((round(score, 4), candidate))
+
+        if state or district:
+            regional = [s for s in scored if self._matches_region(s[1], state, district)]
+            if not regional and state and district:
+                # District names vary a lot in OCR'd text, retry with the state alone
+                regional = [s for s in scored if self._matches_region(s[1], state, None)]
+            if regional:
+                scored = regional
+
+        scored.sort(key=lambda s: (-s[0], s[1]))
+        return [(candidate, score) for score, candidate in scored[:k]]
@@ -0,0 +1,113 @@
+import threading
+from bisect import bisect_left
+
+import mysql.connector
+import db_pool
+from pincode_corrector import PincodeCorrector
+
+
+class _Snapshot:
+    """Immutable lookup tables; replaced wholesale on rebuild"""
+
+    def __init__(self, center_by_pincode, details_by_pincode, previous=None):
+        self.center_by_pincode = center_by_pincode
+        self.details_by_pincode = details_by_pincode
+        self.sorted_pincodes = sorted(set(details_by_pincode) | set(center_by_pincode))
+        if previous is not None and previous.sorted_pincodes == self.sorted_pincodes:
+            # Same pincode set, the correction index still applies
+            self.corrector = previous.corrector
+        else:
+            self.corrector = PincodeCorrector(self.sorted_pincodes, details_by_pincode)
+
+
+class PincodeIndex:
+    """In-memory pincode lookups built from the pincodes table.
+
+    Maps every known pincode to its nodal center (if any) and its
+    district/state, and keeps a sorted pincode list for prefix queries.
+    Lookups are dict hits or bisections; the tables are built once on first
+    use and rebuilt by ``rebuild()`` whenever the pincode data changes.
+    """
+
+    def __init__(self, nodal_centers, pool=None):
+        self.nodal_centers = nodal_centers
+        self._pool = pool
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        return self._pool or db_pool.get_pool()
+
+    def _load_directory(self):
+        details = {}
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT DISTINCT pincode, district, state_name FROM pincodes")
+                for pincode, district, state_name in cursor:
+                    if pincode and pincode not in details:
+                        details[pincode] = (district, state_name)
+                cursor.close()
+        except mysql.connector.Error as err:
+            print(f"Failed to load pincode directory, using nodal center pincodes only: {err}")
+        return details
+
+    def _center_map(self):
+        center_by_pincode = {}
+        for center, pincode_list in self.nodal_centers.items():
+            for pincode in pincode_list:
+                center_by_pincode.setdefault(pincode, center)
+        return center_by_pincode
+
+    def set_nodal_centers(self, nodal_centers):
+        """Swap in new center coverage, reusing the loaded directory"""
+        self.nodal_centers = nodal_centers
+        with self._lock:
+            previous = self._snapshot
+            if previous is not None:
+                self._snapshot = _Snapshot(self._center_map(), previous.details_by_pincode, previous)
+
+    def rebuild(self):
+        """Reload the directory and swap in fresh lookup tables"""
+        snapshot = _Snapshot(self._center_map(), self._load_directory())
+        with self._lock:
+            self._snapshot = snapshot
+        print(f"Pincode index built with {len(snapshot.sorted_pincodes)} pincodes")
+        return snapshot
+
+    def snapshot(self):
+        """Current lookup tables, building them on first use"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshot
+            if snapshot is None:
+                snapshot = self.rebuild()
+        return snapshot
+
+    def center_for(self, pincode):
+        """Nodal center serving a pincode, or None"""
+        return self.snapshot().center_by_pincode.get(pincode)
+
+    def is_known(self, pincode):
+        """Whether the pincode exists in the directory or a center's coverage"""
+        snapshot = self.snapshot()
+        return pincode in snapshot.details_by_pincode or pincode in snapshot.center_by_pincode
+
+    def details(self, pincode):
+        """(district, state_name) for a pincode, or None"""
+        return self.snapshot().details_by_pincode.get(pincode)
+
+    def with_prefix(self, prefix, limit=None):
+        """Known pincodes starting with prefix, in sorted order"""
+        pincodes = self.snapshot().sorted_pincodes
+        start = bisect_left(pincodes, prefix)
+        end = bisect_left(pincodes, prefix + '\uffff', start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return pincodes[start:end]
+
+    def suggest(self, pincode, k=5, state=None, district=None):
+        """Closest known pincodes to a misread one, as (pincode, score) pairs"""
+        return self.snapshot().corrector.suggest(pincode, k=k, state=state, district=district)
@@ -0,0 +1,238 @@
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+import mysql.connector
+import db_pool
+
+# Match ranks, best first
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING = range(4)
+
+
+def normalize_query(text):
+    """Lower-case and collapse whitespace"""
+    return re.sub(r'\s+', ' ', (text or '').strip().lower())
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def prefix_range(sorted_keys, prefix):
+    """Slice bounds of the entries in sorted_keys that start with prefix"""
+    start = bisect_left(sorted_keys, prefix)
+    end = bisect_left(sorted_keys, prefix + '\uffff', start)
+    return start, end
+
+
+class _NameIndex:
+    """Exact, prefix, word-prefix and trigram-substring lookups over names.
+
+    Each distinct name maps to the list of record ids carrying it.
+    """
+
+    def __init__(self, ids_by_name):
+        self.ids_by_name = ids_by_name
+        self.names = sorted(ids_by_name)
+
+        words = []
+        grams = {}
+        for position, name in enumerate(self.names):
+            for word in set(name.split(' ')[1:]):
+                words.append((word, position))
+            for gram in trigrams(name):
+                grams.setdefault(gram, array('i')).append(position)
+        words.sort()
+        self.words = [word for word, _ in words]
+        self.word_names = array('i', (position for _, position in words))
+        self.grams = grams
+
+    def matches(self, query):
+        """Yield (rank, name) pairs, best ranks first"""
+        seen = set()
+        if query in self.ids_by_name:
+            seen.add(query)
+            yield EXACT, query
+
+        start, end = prefix_range(self.names, query)
+        for name in self.names[start:end]:
+            if name not in seen:
+                seen.add(name)
+                yield PREFIX, name
+
+        start, end = prefix_range(self.words, query)
+        for position in sorted(set(self.word_names[start:end])):
+            name = self.names[position]
+            if name not in seen:
+                seen.add(name)
+                yield WORD_PREFIX, name
+
+        if len(query) >= 3:
+            postings = sorted((self.grams.get(gram, ()) for gram in trigrams(query)), key=len)
+            if postings and postings[0]:
+                candidates = set(postings[0])
+                for posting in postings[1:]:
+                    candidates.intersection_update(posting)
+                    if not candidates:
+                        break
+                for position in sorted(candidates):
+                    name = self.names[position]
+                    if name not in seen and query in name:
+                        seen.add(name)
+                        yield SUBSTRING, name
+
+
+class PincodeSearchIndex:
+    """In-memory search over the pincodes directory.
+
+    Numeric queries are pincode prefix lookups over a sorted list; text
+    queries look up office and district names by exact match, name prefix,
+    word prefix and trigram-filtered substring, ranked in that order.
+    Recent results are kept in a small LRU so repeated keystrokes from the
+    typeahead box are served without touching the index.
+    """
+
+    def __init__(self, pool=None, cache_size=2048, cache_ttl=60):
+        self._pool = pool
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._state = None
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        return self._pool or db_pool.get_pool()
+
+    def rebuild(self):
+        """Reload the directory and swap in a fresh index"""
+        records = {}
+        pincode_keys = []
+        offices = {}
+        districts = {}
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT id, pincode, office_name, district, state_name, office_type FROM pincodes"
+                )
+                for row in cursor:
+                    record_id, pincode, office_name, district, state_name, office_type = row
+                    records[record_id] = (
+                        pincode,
+                        office_name,
+                        district and district.strip(),
+                        state_name and state_name.strip(),
+                        office_type
+                    )
+                    if pincode:
+                        pincode_keys.append((pincode, record_id))
+                    if office_name:
+                        offices.setdefault(normalize_query(office_name), []).append(record_id)
+                    if district:
+                        districts.setdefault(normalize_query(district), []).append(record_id)
+                cursor.close()
+        except mysql.connector.Error as err:
+            print(f"Failed to build pincode search index: {err}")
+            raise
+
+        pincode_keys.sort()
+        state = {
+            'records': records,
+            'pincodes': [pincode for pincode, _ in pincode_keys],
+            'pincode_ids': array('i', (record_id for _, record_id in pincode_keys)),
+            'offices': _NameIndex(offices),
+            'districts': _NameIndex(districts)
+        }
+        with self._lock:
+            self._state = state
+        with self._cache_lock:
+            self._cache.clear()
+        print(f"Pincode search index built with {len(records)} records")
+        return state
+
+    def _current(self):
+        state = self._state
+        if state is None:
+            with self._lock:
+                state = self._state
+            if state is None:
+                state = self.rebuild()
+        return state
+
+    def search(self, query, limit=10):
+        """Ranked record ids matching query"""
+        query = normalize_query(query)
+        if not query:
+            return []
+
+        key = (query, limit)
+        now = time.time()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached and cached[1] > now:
+                self._cache.move_to_end(key)
+                return cached[0]
+
+        state = self._current()
+        if query.isdigit():
+            ids = self._search_pincodes(state, query, limit)
+        else:
+            ids = self._search_names(state, query, limit)
+
+        with self._cache_lock:
+            self._cache[key] = (ids, now + self.cache_ttl)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return ids
+
+    def records(self, ids):
+        """Compact records for ids from the in-memory directory"""
+        records = self._current()['records']
+        results = []
+        for record_id in ids:
+            pincode, office_name, district, state_name, office_type = records[record_id]
+            results.append({
+                'id': record_id,
+                'pincode': pincode,
+                'office_name': office_name,
+                'district': district,
+                'state_name': state_name,
+                'office_type': office_type
+            })
+        return results
+
+    @staticmethod
+    def _search_pincodes(state, query, limit):
+        # Exact matches sort first within the prefix range already
+        start, end = prefix_range(state['pincodes'], query)
+        return list(state['pincode_ids'][start:min(end, start + limit)])
+
+    @staticmethod
+    def _search_names(state, query, limit):
+        """Merge office and district matches by rank"""
+        ranked = []
+        for rank_offset, index in ((0, state['offices']), (0.5, state['districts'])):
+            collected = 0
+            for rank, name in index.matches(query):
+                ids = index.ids_by_name[name]
+                ranked.append((rank + rank_offset, name, ids))
+                collected += len(ids)
+                if collected >= limit and rank > EXACT:
+                    break
+        ranked.sort(key=lambda r: (r[0], r[1]))
+
+        results = []
+        seen = set()
+        for _, _, ids in ranked:
+            for record_id in ids:
+                if record_id not in seen:
+                    seen.add(record_id)
+                    results.append(record_id)
+                    if len(results) >= limit:
+                        return results
+        return results
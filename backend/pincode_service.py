@@ -1,159 +1,356 @@
-import mysql.connector
 import csv
+import codecs
+import base64
+import threading
+import json
+import time
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+import db_pool
+from pincode_search import PincodeSearchIndex
 
 load_dotenv()
 
+# Keyset columns for each supported sort order (always ending in the unique id)
+PAGINATION_SORTS = {
+    'id': ('id',),
+    'state': ('state_name', 'pincode', 'id')
+}
+# Nullable keyset columns are compared as '' so rows with NULLs sort first
+# instead of dropping out of the row comparison
+NULLABLE_KEYS = {'state_name', 'pincode'}
+# MySQL 8.0.13+ functional index matching the 'state' sort expressions
+STATE_PINCODE_INDEX = "idx_state_pincode ((COALESCE(state_name, '')), (COALESCE(pincode, '')), id)"
+
+def keyset_expression(column):
+    return f"COALESCE({column}, '')" if column in NULLABLE_KEYS else column
+
+def keyset_value(column, value):
+    return '' if value is None and column in NULLABLE_KEYS else value
+
+def encode_cursor(sort, values):
+    """Opaque cursor pointing just past the given keyset values"""
+    payload = json.dumps({'s': sort, 'k': values}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor, sort):
+    """Keyset values from a cursor created for the same sort order"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        values = payload['k']
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if payload.get('s') != sort or len(values) != len(PAGINATION_SORTS[sort]):
+        raise ValueError("Cursor does not match the requested sort")
+    return values
+
+# Columns expected in India Post directory CSV uploads
+IMPORT_COLUMNS = (
+    'CircleName', 'RegionName', 'DivisionName', 'OfficeName', 'Pincode',
+    'OfficeType', 'Delivery', 'District', 'StateName', 'Latitude', 'Longitude'
+)
+IMPORT_BATCH_SIZE = int(os.getenv("PINCODE_IMPORT_BATCH_SIZE", 5000))
+IMPORT_MAX_REPORTED_REJECTS = 100
+
 class PincodeService:
-    def __init__(self):
-        self.db_config = {
-            'host': os.getenv("DB_HOST"),
-            'user': os.getenv("DB_USER"),
-            'password': os.getenv("DB_PASSWORD"),
-            'database': os.getenv("DB_NAME")
-        }
+    def __init__(self, pool=None):
+        self._pool = pool
+        self.count_ttl = int(os.getenv("PINCODE_COUNT_TTL", 300))
+        self._count_cache = {}
+        self._import_lock = threading.Lock()
+        self.import_progress = None
+        self.search_index = PincodeSearchIndex(
+            pool,
+            cache_size=int(os.getenv("PINCODE_SEARCH_CACHE_SIZE", 2048)),
+            cache_ttl=int(os.getenv("PINCODE_SEARCH_CACHE_TTL", 60))
+        )
+
+    @property
+    def pool(self):
+        """Connection pool, defaulting to the process-wide shared pool"""
+        return self._pool or db_pool.get_pool()
 
     def initialize_pincodes_table(self):
         """Initialize the pincodes table if it doesn't exist"""
-        conn = mysql.connector.connect(**self.db_config)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS pincodes (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                circle_name VARCHAR(100),
-                region_name VARCHAR(100),
-                division_name VARCHAR(100),
-                office_name VARCHAR(100),
-                pincode VARCHAR(10),
-                office_type VARCHAR(10),
-                delivery_type VARCHAR(20),
-                district VARCHAR(100),
-                state_name VARCHAR(100),
-                latitude DECIMAL(10, 8),
-                longitude DECIMAL(11, 8),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX idx_pincode (pincode),
-                INDEX idx_office_name (office_name),
-                INDEX idx_district (district)
-            )
-        """)
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS pincodes (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    circle_name VARCHAR(100),
+                    region_name VARCHAR(100),
+                    division_name VARCHAR(100),
+                    office_name VARCHAR(100),
+                    pincode VARCHAR(10),
+                    office_type VARCHAR(10),
+                    delivery_type VARCHAR(20),
+                    district VARCHAR(100),
+                    state_name VARCHAR(100),
+                    latitude DECIMAL(10, 8),
+                    longitude DECIMAL(11, 8),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    INDEX idx_pincode (pincode),
+                    INDEX idx_office_name (office_name),
+                    INDEX idx_district (district),
+                    INDEX {STATE_PINCODE_INDEX}
+                )
+            """)
+
+            # Tables created before the keyset index existed, or with the
+            # earlier plain-column version of it
+            cursor.execute("""
+                SELECT COUNT(*), COUNT(expression) FROM information_schema.statistics
+                WHERE table_schema = DATABASE() AND table_name = 'pincodes'
+                  AND index_name = 'idx_state_pincode'
+            """)
+            parts, expressions = cursor.fetchone()
+            if parts == 0:
+                cursor.execute(f"ALTER TABLE pincodes ADD INDEX {STATE_PINCODE_INDEX}")
+            elif expressions == 0:
+                cursor.execute(f"ALTER TABLE pincodes DROP INDEX idx_state_pincode, ADD INDEX {STATE_PINCODE_INDEX}")
+
+            conn.commit()
+            cursor.close()
+
+    def _parse_import_row(self, row):
+        """Validate one CSV row, returning (values, None) or (None, reason)"""
+        pincode = (row.get('Pincode') or '').strip()
+        if not (pincode.isdigit() and len(pincode) == 6):
+            return None, f"invalid pincode '{pincode}'"
+        if not (row.get('OfficeName') or '').strip():
+            return None, "missing office name"
+
+        coordinates = []
+        for column, limit in (('Latitude', 90), ('Longitude', 180)):
+            value = (row.get(column) or '').strip()
+            try:
+                value = float(value) if value and value.upper() not in ('NA', 'N/A') else None
+            except ValueError:
+                value = None
+            coordinates.append(value if value is not None and -limit <= value <= limit else None)
+
+        def text(column, length):
+            return (row.get(column) or '').strip()[:length] or None
+
+        return (
+            text('CircleName', 100),
+            text('RegionName', 100),
+            text('DivisionName', 100),
+            text('OfficeName', 100),
+            pincode,
+            text('OfficeType', 10),
+            text('Delivery', 20),
+            text('District', 100),
+            text('StateName', 100),
+            coordinates[0],
+            coordinates[1]
+        ), None
 
     def import_from_csv(self, file):
-        """Import pincode data from CSV file"""
+        """Stream a pincode CSV upload into a staging table and swap it in.
+
+        Rows are read and validated incrementally, loaded in large multi-row
+        inserts into ``pincodes_staging`` and the table is replaced with one
+        atomic ``RENAME TABLE``, so readers never see an empty or partial
+        table. Returns (success, message, report) where report holds row
+        counts and the first rejected rows.
+        """
+        if not self._import_lock.acquire(blocking=False):
+            return False, "Another pincode import is already running", None
+
+        report = {
+            'status': 'running',
+            'rows_read': 0,
+            'rows_loaded': 0,
+            'rows_rejected': 0,
+            'rejects': [],
+            'started_at': datetime.now().isoformat(),
+            'finished_at': None
+        }
+        self.import_progress = report
         try:
-            csv_data = csv.DictReader(file.read().decode('utf-8').splitlines())
-            
-            conn = mysql.connector.connect(**self.db_config)
-            cursor = conn.cursor()
-            
-            # Clear existing data
-            cursor.execute("TRUNCATE TABLE pincodes")
-            
-            # Batch insert for better performance
-            batch_size = 1000
-            batch = []
-            
-            for row in csv_data:
-                batch.append((
-                    row['CircleName'],
-                    row['RegionName'],
-                    row['DivisionName'],
-                    row['OfficeName'],
-                    row['Pincode'],
-                    row['OfficeType'],
-                    row['Delivery'],
-                    row['District'],
-                    row['StateName'],
-                    float(row['Latitude']) if row['Latitude'] else None,
-                    float(row['Longitude']) if row['Longitude'] else None
-                ))
-                
-                if len(batch) >= batch_size:
-                    cursor.executemany("""
-                        INSERT INTO pincodes (
-                            circle_name, region_name, division_name, office_name,
-                            pincode, office_type, delivery_type, district,
-                            state_name, latitude, longitude
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """, batch)
-                    conn.commit()
-                    batch = []
-            
-            # Insert remaining records
-            if batch:
-                cursor.executemany("""
-                    INSERT INTO pincodes (
+            lines = codecs.iterdecode(file.stream, 'utf-8-sig')
+            csv_data = csv.DictReader(lines)
+            missing = [c for c in IMPORT_COLUMNS if c not in (csv_data.fieldnames or [])]
+            if missing:
+                raise ValueError(f"Missing CSV columns: {', '.join(missing)}")
+
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute("DROP TABLE IF EXISTS pincodes_staging")
+                cursor.execute("CREATE TABLE pincodes_staging LIKE pincodes")
+
+                insert_query = """
+                    INSERT INTO pincodes_staging (
                         circle_name, region_name, division_name, office_name,
                         pincode, office_type, delivery_type, district,
                         state_name, latitude, longitude
                     ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, batch)
-                conn.commit()
-            
-            cursor.close()
-            conn.close()
-            
-            return True, "Pincodes imported successfully"
-        
+                """
+                batch = []
+                # Header is line 1
+                for line_number, row in enumerate(csv_data, start=2):
+                    report['rows_read'] += 1
+                    values, reason = self._parse_import_row(row)
+                    if reason:
+                        report['rows_rejected'] += 1
+                        if len(report['rejects']) < IMPORT_MAX_REPORTED_REJECTS:
+                            report['rejects'].append({'line': line_number, 'reason': reason})
+                        continue
+
+                    batch.append(values)
+                    if len(batch) >= IMPORT_BATCH_SIZE:
+                        # executemany() sends this as one multi-row INSERT
+                        cursor.executemany(insert_query, batch)
+                        conn.commit()
+                        report['rows_loaded'] += len(batch)
+                        batch = []
+                        print(f"Pincode import: {report['rows_loaded']:,} rows loaded")
+
+                if batch:
+                    cursor.executemany(insert_query, batch)
+                    conn.commit()
+                    report['rows_loaded'] += len(batch)
+
+                if report['rows_loaded'] == 0:
+                    cursor.execute("DROP TABLE pincodes_staging")
+                    raise ValueError("No valid rows in upload")
+
+                # Atomic swap, then drop the previous data
+                cursor.execute("DROP TABLE IF EXISTS pincodes_old")
+                cursor.execute("RENAME TABLE pincodes TO pincodes_old, pincodes_staging TO pincodes")
+                cursor.execute("DROP TABLE pincodes_old")
+
+                cursor.close()
+
+            self._count_cache.clear()
+            self.search_index.rebuild()
+
+            report['status'] = 'completed'
+            return True, (f"Imported {report['rows_loaded']:,} pincodes "
+                          f"({report['rows_rejected']:,} rows rejected)"), report
+
         except Exception as e:
-            return False, str(e)
+            report['status'] = 'failed'
+            report['error'] = str(e)
+            return False, str(e), report
+
+        finally:
+            report['finished_at'] = datetime.now().isoformat()
+            self._import_lock.release()
+
+    def _count_pincodes(self, cursor, where, params):
+        """Row count for a filter, cached for PINCODE_COUNT_TTL seconds"""
+        key = (where, tuple(params))
+        cached = self._count_cache.get(key)
+        if cached and cached[1] > time.time():
+            return cached[0]
 
-    def get_pincodes(self, page=1, per_page=50):
-        """Get paginated list of pincodes"""
+        cursor.execute(f"SELECT COUNT(*) as total FROM pincodes {where}", params)
+        total = cursor.fetchone()['total']
+        if len(self._count_cache) >= 1000:
+            self._count_cache.clear()
+        self._count_cache[key] = (total, time.time() + self.count_ttl)
+        return total
+
+    def get_pincodes(self, page=None, per_page=50, cursor=None, sort='id', state=None, district=None):
+        """Get a page of pincodes using keyset pagination.
+
+        Pages are addressed by the opaque ``next_cursor`` of the previous
+        page, so deep pages are index range scans instead of OFFSET scans.
+        ``page`` is still accepted for old clients when no cursor is given.
+        """
         try:
-            offset = (page - 1) * per_page
-            
-            conn = mysql.connector.connect(**self.db_config)
-            cursor = conn.cursor(dictionary=True)
-            
-            # Get total count
-            cursor.execute("SELECT COUNT(*) as total FROM pincodes")
-            total = cursor.fetchone()['total']
-            
-            # Get paginated data
-            cursor.execute("""
-                SELECT * FROM pincodes
-                LIMIT %s OFFSET %s
-            """, (per_page, offset))
-            pincodes = cursor.fetchall()
-            
-            cursor.close()
-            conn.close()
-            
-            return {
+            if sort not in PAGINATION_SORTS:
+                raise ValueError(f"Unsupported sort '{sort}'")
+            columns = PAGINATION_SORTS[sort]
+            expressions = [keyset_expression(column) for column in columns]
+
+            conditions = []
+            params = []
+            if state:
+                # Same expression as the keyset index, so the filter uses it too
+                conditions.append(f"{keyset_expression('state_name')} = %s")
+                params.append(state)
+            if district:
+                conditions.append("district = %s")
+                params.append(district)
+            filter_where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+            page_conditions = list(conditions)
+            page_params = list(params)
+            offset = 0
+            if cursor:
+                position = decode_cursor(cursor, sort)
+                placeholders = ', '.join(['%s'] * len(columns))
+                page_conditions.append(f"({', '.join(expressions)}) > ({placeholders})")
+                page_params.extend(keyset_value(column, value) for column, value in zip(columns, position))
+            elif page:
+                offset = (page - 1) * per_page
+            page_where = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
+
+            with self.pool.connection() as conn:
+                db_cursor = conn.cursor(dictionary=True)
+
+                total = self._count_pincodes(db_cursor, filter_where, params)
+
+                # Fetch one extra row to know whether another page exists
+                db_cursor.execute(f"""
+                    SELECT * FROM pincodes
+                    {page_where}
+                    ORDER BY {', '.join(expressions)}
+                    LIMIT %s OFFSET %s
+                """, page_params + [per_page + 1, offset])
+                pincodes = db_cursor.fetchall()
+
+                db_cursor.close()
+
+            has_more = len(pincodes) > per_page
+            pincodes = pincodes[:per_page]
+            next_cursor = None
+            if has_more:
+                next_cursor = encode_cursor(sort, [keyset_value(column, pincodes[-1][column]) for column in columns])
+
+            result = {
                 'data': pincodes,
-                'total': total,
-                'page': page,
+                'next_cursor': next_cursor,
+                'has_more': has_more,
+                'sort': sort,
                 'per_page': per_page,
+                'total': total,
                 'total_pages': (total + per_page - 1) // per_page
             }
-        
+            if page and not cursor:
+                result['page'] = page
+            return result
+
         except Exception as e:
             raise Exception(f"Failed to fetch pincodes: {str(e)}")
 
-    def search_pincodes(self, query, limit=10):
-        """Search pincodes by pincode, office name or district"""
+    def search_pincodes(self, query, limit=10, typeahead=False):
+        """Search pincodes by pincode, office name or district.
+
+        Results are ranked exact > prefix > substring by the in-memory search
+        index. Typeahead mode answers from the index alone; otherwise the
+        full rows are fetched by primary key.
+        """
         try:
-            conn = mysql.connector.connect(**self.db_config)
-            cursor = conn.cursor(dictionary=True)
-            
-            cursor.execute("""
-                SELECT * FROM pincodes
-                WHERE pincode LIKE %s OR office_name LIKE %s OR district LIKE %s
-                LIMIT %s
-            """, (f'%{query}%', f'%{query}%', f'%{query}%', limit))
-            
-            results = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            
-            return results
-        
+            ids = self.search_index.search(query, limit)
+            if typeahead or not ids:
+                return self.search_index.records(ids)
+
+            with self.pool.connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+
+                placeholders = ', '.join(['%s'] * len(ids))
+                cursor.execute(f"SELECT * FROM pincodes WHERE id IN ({placeholders})", ids)
+                rows = {row['id']: row for row in cursor.fetchall()}
+                cursor.close()
+
+            return [rows[record_id] for record_id in ids if record_id in rows]
+
         except Exception as e:
-            raise Exception(f"Failed to search pincodes: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Failed to search pincodes: {str(e)}")
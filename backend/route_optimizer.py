@@ -0,0 +1,329 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+# ETA model: straight-line distance stretched to road distance, average van speed
+# and a fixed handover time per stop
+ROAD_DETOUR_FACTOR = float(os.getenv("ROUTE_DETOUR_FACTOR", 1.3))
+AVERAGE_SPEED_KMH = float(os.getenv("ROUTE_AVERAGE_SPEED_KMH", 25))
+SERVICE_MINUTES_PER_STOP = float(os.getenv("ROUTE_SERVICE_MINUTES", 3))
+
+# Worker processes for solving vehicle routes in parallel
+ROUTE_WORKERS = int(os.getenv("ROUTE_WORKERS", 0)) or os.cpu_count() or 1
+
+# Moves must beat this to count, so float noise can't cause endless swapping
+IMPROVEMENT_EPSILON = 1e-9
+
+
+def haversine_matrix(coords, other=None):
+    """Great-circle distances in km between (n, 2) arrays of (lat, lng) degrees.
+
+    Returns the (n, n) pairwise matrix, or (n, m) distances to ``other``.
+    """
+    radians = np.radians(np.asarray(coords, dtype=np.float64))
+    other = radians if other is None else np.radians(np.asarray(other, dtype=np.float64))
+    lat = radians[:, 0][:, None]
+    lng = radians[:, 1][:, None]
+    other_lat = other[:, 0][None, :]
+    other_lng = other[:, 1][None, :]
+    a = (np.sin((lat - other_lat) / 2) ** 2
+         + np.cos(lat) * np.cos(other_lat) * np.sin((lng - other_lng) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def route_length(route, dist):
+    route = np.asarray(route)
+    return float(dist[route[:-1], route[1:]].sum())
+
+
+def nearest_neighbour(dist, start=0):
+    """Greedy tour from start visiting every node once (start not repeated)"""
+    n = len(dist)
+    visited = np.zeros(n, dtype=bool)
+    route = [start]
+    visited[start] = True
+    current = start
+    for _ in range(n - 1):
+        candidates = np.where(visited, np.inf, dist[current])
+        current = int(np.argmin(candidates))
+        visited[current] = True
+        route.append(current)
+    return route
+
+
+def two_opt(route, dist, deadline):
+    """Reverse segments while that shortens the route; the first and last nodes stay fixed.
+
+    For each cut point the gains of every possible second cut are computed in
+    one vectorized step and the best one is applied.
+    """
+    route = np.array(route)
+    improved = True
+    moves = 0
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(1, len(route) - 2):
+            a, b = route[i - 1], route[i]
+            c = route[i + 1:-1]
+            d = route[i + 2:]
+            gains = dist[a, b] + dist[c, d] - dist[a, c] - dist[b, d]
+            j = int(np.argmax(gains))
+            if gains[j] > IMPROVEMENT_EPSILON:
+                j += i + 1
+                route[i:j + 1] = route[i:j + 1][::-1]
+                improved = True
+                moves += 1
+            if time.perf_counter() >= deadline:
+                break
+    return route, moves
+
+
+def or_opt(route, dist, deadline, max_segment=3):
+    """Move runs of 1..max_segment stops (optionally reversed) to their best position"""
+    route = np.array(route)
+    improved = True
+    moves = 0
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for length in range(1, max_segment + 1):
+            i = 1
+            while i + length < len(route):
+                segment = route[i:i + length]
+                prev, nxt = route[i - 1], route[i + length]
+                first, last = segment[0], segment[-1]
+                removal_gain = dist[prev, first] + dist[last, nxt] - dist[prev, nxt]
+
+                rest = np.concatenate((route[:i], route[i + length:]))
+                u, v = rest[:-1], rest[1:]
+                forward = dist[u, first] + dist[last, v] - dist[u, v]
+                backward = dist[u, last] + dist[first, v] - dist[u, v]
+                # Re-inserting where it came from is not a move
+                forward[i - 1] = backward[i - 1] = np.inf
+
+                k_forward = int(np.argmin(forward))
+                k_backward = int(np.argmin(backward))
+                if forward[k_forward] <= backward[k_backward]:
+                    k, cost, insert = k_forward, forward[k_forward], segment
+                else:
+                    k, cost, insert = k_backward, backward[k_backward], segment[::-1]
+
+                if removal_gain - cost > IMPROVEMENT_EPSILON:
+                    route = np.concatenate((rest[:k + 1], insert, rest[k + 1:]))
+                    improved = True
+                    moves += 1
+                else:
+                    i += 1
+                if time.perf_counter() >= deadline:
+                    return route, moves
+    return route, moves
+
+
+def solve_route(coords, return_to_start=True, time_budget=2.0, dist=None):
+    """Order stops for one vehicle starting at coords[0].
+
+    Builds a nearest-neighbour tour and improves it with 2-opt and Or-opt
+    until no move helps or ``time_budget`` seconds have passed. Returns a
+    dict with ``order`` (indices into coords, start excluded), the route
+    length in km and solver statistics. ``dist`` may supply the distance
+    matrix between coords (e.g. from the persisted DistanceMatrix).
+    """
+    started = time.perf_counter()
+    deadline = started + time_budget
+    n = len(coords)
+    if n <= 1:
+        return {'order': [], 'distance_km': 0.0, 'initial_distance_km': 0.0,
+                'moves': 0, 'solve_time': 0.0}
+
+    if dist is None:
+        dist = haversine_matrix(coords)
+    route = nearest_neighbour(dist)
+    if return_to_start:
+        route.append(0)
+    else:
+        # Open route: a dummy end node at zero distance from everything
+        dist = np.pad(dist, ((0, 1), (0, 1)))
+        route.append(n)
+    initial = route_length(route, dist)
+
+    moves = 0
+    while time.perf_counter() < deadline:
+        route, two_opt_moves = two_opt(route, dist, deadline)
+        route, or_opt_moves = or_opt(route, dist, deadline)
+        moves += two_opt_moves + or_opt_moves
+        if not or_opt_moves:
+            break
+
+    return {
+        'order': [int(node) for node in route[1:-1]],
+        'distance_km': route_length(route, dist),
+        'initial_distance_km': initial,
+        'moves': moves,
+        'solve_time': time.perf_counter() - started
+    }
+
+
+def sweep_clusters(depot, coords, capacities):
+    """Split stops among vehicles by polar angle around the depot.
+
+    Stops are swept counter-clockwise starting after the widest angular gap,
+    and the sweep is cut into consecutive sectors whose sizes spread the load as
+    evenly as the vehicle capacities allow. Returns one index list per
+    vehicle plus the indices that did not fit in any vehicle.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    n = len(coords)
+    if n == 0:
+        return [[] for _ in capacities], []
+
+    # Longitude degrees shrink with latitude; scale so angles are true bearings
+    dlat = coords[:, 0] - depot[0]
+    dlng = (coords[:, 1] - depot[1]) * np.cos(np.radians(depot[0]))
+    angles = np.arctan2(dlat, dlng)
+    order = np.argsort(angles, kind='stable')
+    gaps = np.diff(np.concatenate((angles[order], [angles[order][0] + 2 * np.pi])))
+    order = np.roll(order, -int((np.argmax(gaps) + 1) % n))
+
+    # Water-fill: hand out stops one at a time to vehicles with spare capacity
+    sizes = [0] * len(capacities)
+    assignable = min(n, sum(capacities))
+    vehicle = 0
+    for _ in range(assignable):
+        while sizes[vehicle] >= capacities[vehicle]:
+            vehicle = (vehicle + 1) % len(capacities)
+        sizes[vehicle] += 1
+        vehicle = (vehicle + 1) % len(capacities)
+
+    clusters = []
+    position = 0
+    for size in sizes:
+        clusters.append([int(index) for index in order[position:position + size]])
+        position += size
+    return clusters, [int(index) for index in order[position:]]
+
+
+# Distance matrices mapped by this process, by directory
+_matrices = {}
+
+
+def _mapped_matrix(directory):
+    from distance_matrix import DistanceMatrix
+
+    matrix = _matrices.get(directory)
+    if matrix is None:
+        matrix = _matrices[directory] = DistanceMatrix(directory)
+    return matrix
+
+
+def solve_cluster(depot, coords, return_to_start=True, time_budget=2.0,
+                  keys=None, depot_key=None, matrix_dir=None):
+    """Solve one vehicle's route over its stops; stops sharing a location are visited together.
+
+    When ``keys`` (one per stop) and ``depot_key`` name rows of the distance
+    matrix in ``matrix_dir``, distances are read from the mapped file
+    instead of being recomputed. Returns the same dict as solve_route, with
+    ``order`` indexing coords.
+    """
+    if not len(coords):
+        return solve_route([depot], return_to_start, time_budget)
+
+    locations, inverse = np.unique(np.asarray(coords, dtype=np.float64), axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    dist = None
+    if keys is not None and depot_key and matrix_dir:
+        location_keys = [None] * len(locations)
+        for index, location in enumerate(inverse):
+            location_keys[location] = keys[index]
+        dist = _mapped_matrix(matrix_dir).submatrix([depot_key] + location_keys)
+
+    solution = solve_route(np.vstack(([depot], locations)), return_to_start, time_budget, dist=dist)
+
+    stops_at = {}
+    for index, location in enumerate(inverse):
+        stops_at.setdefault(int(location), []).append(index)
+    solution['order'] = [index for location in solution['order'] for index in stops_at[location - 1]]
+    return solution
+
+
+# Pool of solver processes used for multi-vehicle routing
+_executor = None
+
+
+def get_executor():
+    """Return the shared solver process pool, starting it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=ROUTE_WORKERS)
+    return _executor
+
+
+def solve_vrp(depot, coords, capacities, return_to_start=True, time_budget=2.0, executor=None,
+              keys=None, depot_key=None, matrix_dir=None):
+    """Capacitated multi-vehicle routing from one depot.
+
+    Stops are clustered with ``sweep_clusters`` and every vehicle's route is
+    solved on the process pool in parallel (see solve_cluster for ``keys``,
+    ``depot_key`` and ``matrix_dir``). Returns ``(routes, unassigned)``
+    where each route is a solve_cluster result with ``order`` indexing coords.
+    """
+    clusters, unassigned = sweep_clusters(depot, coords, capacities)
+    coords = np.asarray(coords, dtype=np.float64)
+    executor = executor or get_executor()
+    futures = [executor.submit(solve_cluster, tuple(depot), coords[cluster], return_to_start, time_budget,
+                               [keys[index] for index in cluster] if keys is not None else None,
+                               depot_key, matrix_dir)
+               for cluster in clusters]
+
+    routes = []
+    for cluster, future in zip(clusters, futures):
+        solution = future.result()
+        solution['order'] = [cluster[index] for index in solution['order']]
+        routes.append(solution)
+    return routes, unassigned
+
+
+def estimate_minutes(distance_km, stops):
+    """Driving time over the road-adjusted distance plus handover time at each stop"""
+    driving = distance_km * ROAD_DETOUR_FACTOR / AVERAGE_SPEED_KMH * 60
+    return driving + stops * SERVICE_MINUTES_PER_STOP
+
+
+def format_duration(minutes):
+    hours, minutes = divmod(int(round(minutes)), 60)
+    if hours:
+        return f"{hours} hour{'s' if hours != 1 else ''} {minutes} minutes"
+    return f"{minutes} minutes"
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Single-vehicle route solver benchmark")
+    arg_parser.add_argument("--stops", type=int, default=300, help="Number of random stops")
+    arg_parser.add_argument("--time-budget", type=float, default=2.0, help="Solver time budget (seconds)")
+    arg_parser.add_argument("--vehicles", type=int, default=1, help="Solve a capacitated multi-vehicle plan")
+    arg_parser.add_argument("--capacity", type=int, default=0, help="Parcels per vehicle (default: even split)")
+    args = arg_parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    # Random stops within ~15 km of central Pune
+    points = np.column_stack((18.52 + rng.uniform(-0.13, 0.13, args.stops + 1),
+                              73.85 + rng.uniform(-0.13, 0.13, args.stops + 1)))
+    if args.vehicles > 1:
+        capacity = args.capacity or -(-args.stops // args.vehicles)
+        started = time.perf_counter()
+        routes, unassigned = solve_vrp(points[0], points[1:], [capacity] * args.vehicles,
+                                       time_budget=args.time_budget)
+        elapsed = time.perf_counter() - started
+        for vehicle, route in enumerate(routes, 1):
+            print(f"Vehicle {vehicle}: {len(route['order'])} stops, {route['distance_km']:.1f} km")
+        print(f"{args.stops} stops on {args.vehicles} vehicles in {elapsed:.2f}s "
+              f"({len(unassigned)} unassigned)")
+    else:
+        solution = solve_route(points, time_budget=args.time_budget)
+        print(f"{args.stops} stops: {solution['initial_distance_km']:.1f} km nearest-neighbour -> "
+              f"{solution['distance_km']:.1f} km after {solution['moves']} moves "
+              f"in {solution['solve_time']:.2f}s")
@@ -1,25 +1,4 @@
-nodal_centers = {
-    "Pune Main Nodal Center": ["411001", "411002", "411003", "411004", "411005"], #Example list.
-    "Mumbai Central Nodal Center": ["400001", "400016", "400020", "400021", "400022"], #Example list.
-    "Nagpur Regional Nodal Center": ["440001", "440002", "440003", "440004", "440005"], #Example list.
-    "Solapur Distribution Hub": ["413001", "413002", "413003", "413004", "413005"], #Example list.
-    "Aurangabad Logistics Park": ["431001", "431002", "431003", "431004", "431005"], #Example list.
-    "Kolhapur Delivery Center": ["416001", "416002", "416003", "416004", "416005"], #Example list.
-    "Thane West Sorting Office": ["400601", "400602", "400603", "400604", "400605"], #Example list.
-    "Nashik Main Post Office": ["422001", "422002", "422003", "422004", "422005"], #Example list.
-    "Amravati Camp Hub": ["444601", "444602", "444603", "444604", "444605"], #Example list.
-    "Akola City Dispatch": ["444001", "444002", "444003", "444004", "444005"], #Example list.
-    "Latur City Post Office": ["413512", "413513", "413514", "413515", "413516"], #Example list.
-    "Jalgaon City Delivery": ["425001", "425002", "425003", "425004", "425005"], #Example list.
-    "Parbhani City Post": ["431401", "431402", "431403", "431404", "431405"], #Example list.
-    "New Delhi Central Hub": ["110001", "110002", "110003", "110004", "110006"], #Example list.
-    "Bangalore MG Road Center": ["560001", "560002", "560003", "560004", "560005"], #Example list.
-    "Kolkata Park Street Hub": ["700001", "700016", "700017", "700018", "700019"], #Example list.
-    "Jaipur JLN Marg Center": ["302001", "302002", "302003", "302004", "302005"], #Example list.
-    "Ahmedabad MG Road Hub": ["380001", "380002", "380003", "380009", "380010"], #Example list.
-    "Hyderabad Sarojini Devi Hub": ["500001", "500002", "500003", "500004", "500005"], #Example list.
-    # Add more mappings as needed
-}
+from nodal_centers import DEFAULT_NODAL_CENTERS as nodal_centers
 
 def get_nodal_center(pincode):
     """Retrieves the nodal delivery center based on the pincode."""
@@ -28,11 +7,6 @@ def get_nodal_center(pincode):
             return center
     return "Nodal Center Not Found"
 
-
-
-
-
-
 synthetic_data = [
     {
         "address_text": "123 Ganesh Peth, Pune, Maharashtra 411002",
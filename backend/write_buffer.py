@@ -0,0 +1,309 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+
+import mysql.connector
+import db_pool
+
+# Errors that say nothing about the rows themselves: the batch is kept for a later retry
+TRANSIENT_ERRORS = (mysql.connector.errors.InterfaceError, mysql.connector.errors.OperationalError,
+                    mysql.connector.errors.PoolError, OSError)
+
+
+def _spool_pid(path):
+    """pid of the process that writes a write_spool.<pid>.jsonl file"""
+    try:
+        return int(os.path.basename(path).split('.')[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class WriteBuffer:
+    """Write-behind buffer that groups single-row INSERTs per worker.
+
+    ``add()`` queues a row for a registered statement and returns at once. A
+    background thread flushes the queue as one multi-row ``executemany`` per
+    statement, in a single transaction, whenever ``max_rows`` rows are
+    waiting or the oldest row has waited ``max_delay`` seconds.
+
+    When the database is unreachable the rows are appended to a JSON-lines
+    spool file, which the flusher replays every ``replay_interval`` seconds
+    (and ``replay_spool()`` on demand). When the database rejects a batch,
+    it is retried row by row and only the rejected rows go to a dead-letter
+    file. ``close()`` (registered with atexit) flushes what is left.
+    """
+
+    def __init__(self, pool=None, max_rows=500, max_delay=0.2, spool_dir=None, replay_interval=60):
+        self._pool = pool
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.spool_dir = spool_dir
+        self.replay_interval = replay_interval
+        self._statements = {}
+        self._pending = []
+        self._oldest = None
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self._counters = {'queued': 0, 'written': 0, 'flushes': 0, 'spooled': 0, 'replayed': 0,
+                          'dead_lettered': 0}
+        atexit.register(self.close)
+
+    @property
+    def pool(self):
+        return self._pool or db_pool.get_pool()
+
+    def register(self, name, query):
+        """Name an INSERT statement that rows can be queued for"""
+        self._statements[name] = query
+
+    def _ensure_thread(self):
+        # Started on first use, again in a forked worker, and if it died
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='write-buffer', daemon=True)
+            self._thread.start()
+
+    def add(self, name, values):
+        """Queue one row for the named statement"""
+        if name not in self._statements:
+            raise KeyError(f"Unknown statement: {name}")
+        with self._cond:
+            self._ensure_thread()
+            first = not self._pending
+            if first:
+                self._oldest = time.monotonic()
+            self._pending.append((name, tuple(values)))
+            self._counters['queued'] += 1
+            # Wake the flusher to start the max_delay clock, or when a batch is full
+            if first or len(self._pending) >= self.max_rows:
+                self._cond.notify()
+            closed = self._closed
+        if closed:
+            # Shutting down: nothing will flush in the background any more
+            self.flush()
+
+    def _run(self):
+        replays = bool(self.spool_dir and self.replay_interval)
+        next_replay = time.monotonic() + self.replay_interval if replays else None
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if len(self._pending) >= self.max_rows:
+                        break
+                    now = time.monotonic()
+                    remaining = None
+                    if self._pending:
+                        remaining = self._oldest + self.max_delay - now
+                        if remaining <= 0:
+                            break
+                    if replays:
+                        if next_replay <= now:
+                            break
+                        remaining = min(remaining, next_replay - now) if remaining is not None else next_replay - now
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+                if replays and time.monotonic() >= next_replay:
+                    next_replay = time.monotonic() + self.replay_interval
+                    self.replay_spool()
+            except Exception as e:
+                # flush() already spools failed rows; keep the flusher alive regardless
+                print(f"Write buffer flusher error: {str(e)}")
+
+    def _take(self):
+        with self._cond:
+            rows = self._pending[:self.max_rows]
+            self._pending = self._pending[self.max_rows:]
+            self._oldest = time.monotonic() if self._pending else None
+            return rows
+
+    def _write(self, rows):
+        grouped = {}
+        for name, values in rows:
+            grouped.setdefault(name, []).append(values)
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                for name, values in grouped.items():
+                    cursor.executemany(self._statements[name], values)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def _write_or_split(self, rows):
+        """Write rows, one at a time if the database rejects the batch.
+
+        Returns (written, rejected, unwritten): rejected pairs each row the
+        database refused on its own with the error; unwritten rows met a
+        transient error and should be retried later.
+        """
+        try:
+            self._write(rows)
+            return len(rows), [], []
+        except TRANSIENT_ERRORS as e:
+            print(f"Write buffer could not reach the database ({len(rows)} rows): {str(e)}")
+            return 0, [], rows
+        except Exception as e:
+            print(f"Write buffer batch of {len(rows)} rows rejected, retrying row by row: {str(e)}")
+
+        written = 0
+        rejected = []
+        for position, row in enumerate(rows):
+            try:
+                self._write([row])
+                written += 1
+            except TRANSIENT_ERRORS as e:
+                print(f"Write buffer could not reach the database: {str(e)}")
+                return written, rejected, rows[position:]
+            except Exception as e:
+                rejected.append((row, str(e)))
+        return written, rejected, []
+
+    def flush(self):
+        """Write every queued row; rows that fail are spooled or dead-lettered. Returns rows written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                rows = self._take()
+                if not rows:
+                    break
+                count, rejected, unwritten = self._write_or_split(rows)
+                written += count
+                with self._cond:
+                    self._counters['written'] += count
+                    self._counters['flushes'] += 1
+                if rejected:
+                    self._dead_letter(rejected)
+                if unwritten:
+                    self._spool(unwritten)
+        return written
+
+    def _spool_path(self):
+        return os.path.join(self.spool_dir, f"write_spool.{os.getpid()}.jsonl")
+
+    def _append(self, filename, entries):
+        """Append JSON lines to a file in the spool directory; False if they could not be kept"""
+        if not self.spool_dir:
+            print(f"No spool directory configured, dropped {len(entries)} rows")
+            return False
+        # Dates and decimals are written as strings, which MySQL accepts back
+        lines = [json.dumps(entry, default=str) + '\n' for entry in entries]
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            with open(os.path.join(self.spool_dir, filename), 'a') as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            print(f"Could not write {len(entries)} rows to {filename}, dropped: {str(e)}")
+            return False
+        return True
+
+    def _dead_letter(self, rejected):
+        """Keep rows the database refused, with the error, out of the replayed spool"""
+        entries = [{'statement': name, 'values': list(values), 'error': error}
+                   for (name, values), error in rejected]
+        if self._append(f"write_deadletter.{os.getpid()}.jsonl", entries):
+            print(f"Dead-lettered {len(entries)} rejected rows")
+            with self._cond:
+                self._counters['dead_lettered'] += len(entries)
+
+    def _spool(self, rows, count=True):
+        entries = [{'statement': name, 'values': list(values)} for name, values in rows]
+        if not self._append(os.path.basename(self._spool_path()), entries):
+            return
+        if count:
+            with self._cond:
+                self._counters['spooled'] += len(rows)
+
+    def _replay_file(self, path):
+        """Write one spool file's rows; returns (rows replayed, whether some failed)"""
+        # Renaming claims the file so concurrent workers don't replay it twice
+        claimed = f"{path}.replay.{os.getpid()}"
+        try:
+            os.rename(path, claimed)
+        except OSError:
+            return 0, False
+        with open(claimed) as f:
+            rows = [(entry['statement'], tuple(entry['values']))
+                    for entry in map(json.loads, filter(str.strip, f))]
+        rows = [row for row in rows if row[0] in self._statements]
+        replayed = 0
+        failed = None
+        for start in range(0, len(rows), self.max_rows):
+            count, rejected, unwritten = self._write_or_split(rows[start:start + self.max_rows])
+            replayed += count
+            if rejected:
+                self._dead_letter(rejected)
+            if unwritten:
+                failed = unwritten + rows[start + self.max_rows:]
+                print(f"Spool replay stopped, keeping {len(failed)} rows")
+                break
+        if failed:
+            # Only rows not written yet go back, so nothing is inserted twice
+            self._spool(failed, count=False)
+        os.remove(claimed)
+        return replayed, bool(failed)
+
+    def replay_spool(self):
+        """Insert rows spooled by this process or by workers that have exited.
+
+        Spool files of other live processes are left alone: their flusher may
+        be appending to them. Files that still fail are kept.
+        """
+        if not self.spool_dir:
+            return 0
+        replayed = 0
+        for path in glob.glob(os.path.join(self.spool_dir, 'write_spool.*.jsonl')):
+            pid = _spool_pid(path)
+            if pid is None:
+                continue
+            if pid == os.getpid():
+                # Our own flusher can't append while we hold the flush lock
+                with self._flush_lock:
+                    count, failed = self._replay_file(path)
+            elif _pid_alive(pid):
+                continue
+            else:
+                count, failed = self._replay_file(path)
+            replayed += count
+            if failed:
+                break
+        if replayed:
+            print(f"Replayed {replayed} spooled rows")
+            with self._cond:
+                self._counters['replayed'] += replayed
+        return replayed
+
+    def close(self):
+        """Flush the queue and stop the background thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self.flush()
+
+    def stats(self):
+        with self._cond:
+            return dict(self._counters, pending=len(self._pending),
+                        max_rows=self.max_rows, max_delay=self.max_delay)
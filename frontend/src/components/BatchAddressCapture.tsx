@@ -20,6 +20,7 @@ const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:5000
 const BatchAddressCapture: React.FC<BatchAddressCaptureProps> = ({ onBack }) => {
   const videoRef = useRef<HTMLVideoElement>(null);
   const [capturedAddresses, setCapturedAddresses] = useState<number>(0);
+  const [frames, setFrames] = useState<string[]>([]);
   const [addresses, setAddresses] = useState<AddressData[]>([]);
   const [error, setError] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
@@ -56,13 +57,70 @@ const BatchAddressCapture: React.FC<BatchAddressCaptureProps> = ({ onBack }) =>
     };
   }, []);
 
-  const handleCapture = async () => {
+  const processBatch = async (images: string[]) => {
     try {
-      if (capturedAddresses >= 3) return;
-      
       setLoading(true);
       setError(null);
-      
+
+      // Send every captured frame in one request; results stream back as NDJSON
+      const response = await fetch(`${API_BASE_URL}/capture_and_process/batch`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ images }),
+      });
+
+      if (!response.ok || !response.body) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.error || 'Failed to process addresses');
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      const failures: string[] = [];
+      let buffer = '';
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop() || '';
+
+        for (const line of lines) {
+          if (!line.trim()) continue;
+          const item = JSON.parse(line);
+          if (item.summary) continue;
+          if (item.success) {
+            setAddresses(prev => {
+              const next = [...prev];
+              next[item.index] = item;
+              return next;
+            });
+          } else {
+            failures.push(`Address ${item.index + 1}: ${item.error}`);
+          }
+        }
+      }
+
+      if (failures.length > 0) {
+        setError(failures.join('; '));
+      }
+    } catch (err) {
+      const errorMessage = err instanceof Error ? err.message : 'Failed to process addresses';
+      setError(errorMessage);
+      console.error('Error:', err);
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const handleCapture = () => {
+    try {
+      if (capturedAddresses >= 3) return;
+
       if (!videoRef.current) {
         throw new Error('Video stream not available');
       }
@@ -80,33 +138,23 @@ const BatchAddressCapture: React.FC<BatchAddressCaptureProps> = ({ onBack }) =>
       ctx.drawImage(videoRef.current, 0, 0, canvas.width, canvas.height);
       const imageData = canvas.toDataURL('image/jpeg', 0.8); // 80% quality
 
-      // Send to Flask backend
-      const response = await fetch(`${API_BASE_URL}/capture_and_process`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ image: imageData }),
-      });
+      const nextFrames = [...frames, imageData];
+      setFrames(nextFrames);
+      setCapturedAddresses(nextFrames.length);
 
-      const data = await response.json();
-      
-      if (!response.ok) {
-        throw new Error(data.error || 'Failed to process address');
+      // Process the whole batch once the last frame is captured
+      if (nextFrames.length === 3) {
+        processBatch(nextFrames);
       }
-
-      setAddresses(prev => [...prev, data]);
-      setCapturedAddresses(prev => Math.min(prev + 1, 3));
     } catch (err) {
-      const errorMessage = err instanceof Error ? err.message : 'Failed to process address';
+      const errorMessage = err instanceof Error ? err.message : 'Failed to capture image';
       setError(errorMessage);
       console.error('Error:', err);
-    } finally {
-      setLoading(false);
     }
   };
 
   const resetCapture = () => {
+    setFrames([]);
     setAddresses([]);
     setCapturedAddresses(0);
     setError(null);
@@ -215,7 +263,9 @@ const BatchAddressCapture: React.FC<BatchAddressCaptureProps> = ({ onBack }) =>
                           </p>
                         </>
                       ) : (
-                        <p className="text-slate-400">Address {i} not yet captured</p>
+                        <p className="text-slate-400">
+                          {frames[i-1] ? `Address ${i} captured, awaiting results` : `Address ${i} not yet captured`}
+                        </p>
                       )}
                     </div>
                   </div>
@@ -226,11 +276,13 @@ const BatchAddressCapture: React.FC<BatchAddressCaptureProps> = ({ onBack }) =>
                 <div className="p-6 bg-emerald-50 border-t border-emerald-100">
                   <div className="flex items-center text-emerald-700">
                     <CheckCircle size={20} className="mr-2" />
-                    <p className="font-medium">All addresses captured successfully!</p>
+                    <p className="font-medium">
+                      {loading ? 'Processing captured addresses...' : 'All addresses captured successfully!'}
+                    </p>
                   </div>
                   <div className="mt-4">
                     <p className="text-sm text-emerald-600">
-                      Delivery centers: {addresses.map(a => a.nodal_delivery_center).join(', ')}
+                      Delivery centers: {addresses.filter(Boolean).map(a => a.nodal_delivery_center).join(', ')}
                     </p>
                   </div>
                 </div>
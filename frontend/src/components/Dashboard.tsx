@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { 
   Package, 
   Truck, 
@@ -70,6 +70,7 @@ const Dashboard: React.FC<DashboardProps> = ({ onAddSingle, onAddBatch, onViewPi
   const [recentParcels, setRecentParcels] = useState<Parcel[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const etagRef = useRef<string | null>(null);
 
   const updateParcelStatus = async (id: number, newStatus: Parcel['status']) => {
     try {
@@ -105,13 +106,21 @@ const Dashboard: React.FC<DashboardProps> = ({ onAddSingle, onAddBatch, onViewPi
       setLoading(true);
       setError(null);
       
-      const response = await fetch(`${API_BASE_URL}/dashboard_data`);
-      
+      const response = await fetch(`${API_BASE_URL}/dashboard_data`, {
+        headers: etagRef.current ? { 'If-None-Match': etagRef.current } : {}
+      });
+
+      // Unchanged since the last poll
+      if (response.status === 304) {
+        return;
+      }
+
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
 
       const data: DashboardStats = await response.json();
+      etagRef.current = response.headers.get('ETag');
       
       // Calculate statistics
       const total = data.total_addresses || 0;
@@ -11,8 +11,9 @@ interface Pincode {
 
 interface ApiResponse {
   data: Pincode[];
+  next_cursor: string | null;
+  has_more: boolean;
   total?: number;
-  page?: number;
 }
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:5000/api';
@@ -22,29 +23,49 @@ const PincodeTable: React.FC = () => {
   const [loading, setLoading] = useState<boolean>(true);
   const [searchTerm, setSearchTerm] = useState<string>("");
   const [searchResults, setSearchResults] = useState<Pincode[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [total, setTotal] = useState<number | undefined>(undefined);
 
-  useEffect(() => {
-    const fetchPincodes = async () => {
-      try {
-        const response = await fetch(
-          `${API_BASE_URL}/pincodes?page=1&per_page=50`
-        );
-        const data: ApiResponse = await response.json();
-        setPincodes(data.data);
-        setLoading(false);
-      } catch (error) {
-        console.error("Error fetching pincodes:", error);
-        setLoading(false);
+  const fetchPincodes = async (cursor: string | null = null) => {
+    try {
+      const params = new URLSearchParams({ per_page: "50" });
+      if (cursor) {
+        params.set("cursor", cursor);
       }
-    };
+      const response = await fetch(`${API_BASE_URL}/pincodes?${params}`);
+      const data: ApiResponse = await response.json();
+      setPincodes(prev => (cursor ? [...prev, ...data.data] : data.data));
+      setNextCursor(data.next_cursor);
+      setTotal(data.total);
+      setLoading(false);
+    } catch (error) {
+      console.error("Error fetching pincodes:", error);
+      setLoading(false);
+    }
+  };
 
+  useEffect(() => {
     fetchPincodes();
   }, []);
 
-  const handleSearch = async () => {
+  // Typeahead: query the in-memory index once typing pauses
+  useEffect(() => {
+    if (!searchTerm.trim()) {
+      setSearchResults([]);
+      return;
+    }
+    const timer = setTimeout(() => handleSearch(true), 250);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
+  const handleSearch = async (typeahead = false) => {
     try {
+      const params = new URLSearchParams({ q: searchTerm });
+      if (typeahead) {
+        params.set("typeahead", "1");
+      }
       const response = await fetch(
-        `${API_BASE_URL}/pincodes/search?q=${searchTerm}`
+        `${API_BASE_URL}/pincodes/search?${params}`
       );
       const data: Pincode[] = await response.json();
       setSearchResults(data);
@@ -71,7 +92,7 @@ const PincodeTable: React.FC = () => {
           onKeyPress={handleKeyPress}
         />
         <button
-          onClick={handleSearch}
+          onClick={() => handleSearch()}
           className="ml-2 px-4 py-2 bg-blue-500 text-white rounded"
         >
           Search
@@ -104,6 +125,21 @@ const PincodeTable: React.FC = () => {
               ))}
             </tbody>
           </table>
+          {!searchTerm && nextCursor && (
+            <div className="mt-4 flex items-center">
+              <button
+                onClick={() => fetchPincodes(nextCursor)}
+                className="px-4 py-2 bg-blue-500 text-white rounded"
+              >
+                Load more
+              </button>
+              {total !== undefined && (
+                <span className="ml-4 text-sm text-gray-500">
+                  Showing {pincodes.length} of {total}
+                </span>
+              )}
+            </div>
+          )}
         </div>
       )}
     </div>